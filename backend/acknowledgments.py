@@ -0,0 +1,113 @@
+"""
+Pre-rendered acknowledgment clips for slow tool routes.
+
+Web search and location lookups add one or more third-party HTTP round trips after the LLM has
+picked the route, so the user waits in silence for the answer. RouteAnnouncer
+(backend.custom_components) reports the route as soon as the router input is known, and
+POST /process_audio/stream sends a short filler clip ("Let me check that for you…") right away,
+ahead of the answer.
+
+The clips are synthesized once per distinct voice and audio format during warmup and kept in
+ACKNOWLEDGMENT_CACHE_DIR across restarts (the file name includes a hash of the text, so editing
+ACKNOWLEDGMENT_TEXT renders new ones). Serving a clip never calls ElevenLabs: a voice or format
+without a cached clip gets no acknowledgment.
+"""
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token
+from typing import Callable, Dict, Optional, Tuple
+
+from backend.config.elevenlabs_voice_config import (
+    ACKNOWLEDGMENT_CACHE_DIR,
+    ACKNOWLEDGMENT_TEXT,
+    ACKNOWLEDGMENTS_ENABLED,
+    AUDIO_FORMATS,
+    ELEVENLABS_VOICE_IDs,
+    TONE_SETTINGS,
+)
+
+# Concurrent ElevenLabs requests while rendering missing clips at warmup
+_RENDER_CONCURRENCY = 4
+
+# Called with the route name (e.g. "web_search") from the pipeline thread of the current request
+_route_listener: ContextVar[Optional[Callable[[str], None]]] = ContextVar("route_listener", default=None)
+
+# (voice ID, audio format) -> clip bytes; clips are a few KB each
+_clips: Dict[Tuple[str, str], bytes] = {}
+
+
+def set_route_listener(callback: Callable[[str], None]) -> Token:
+    """Receive the slow routes chosen within the current context (and the tasks and threads it starts)."""
+    return _route_listener.set(callback)
+
+
+def reset_route_listener(token: Token) -> None:
+    _route_listener.reset(token)
+
+
+def announce_route(route: str) -> None:
+    """Tell the current request's listener, if any, that a slow route was chosen."""
+    callback = _route_listener.get()
+    if callback is not None:
+        callback(route)
+
+
+def clip_path(voice_id: str, audio_format: str) -> str:
+    output_format, extension, _ = AUDIO_FORMATS[audio_format]
+    text_hash = hashlib.sha256(ACKNOWLEDGMENT_TEXT.encode()).hexdigest()[:12]
+    return os.path.join(ACKNOWLEDGMENT_CACHE_DIR, f"{voice_id}-{output_format}-{text_hash}.{extension}")
+
+
+def get_clip(voice_name: str, audio_format: str) -> Optional[bytes]:
+    """The cached acknowledgment for a voice, or None if it was never rendered."""
+    voice_id = ELEVENLABS_VOICE_IDs.get(voice_name)
+    if voice_id is None or audio_format not in AUDIO_FORMATS:
+        return None
+    key = (voice_id, audio_format)
+    if key not in _clips:
+        try:
+            with open(clip_path(voice_id, audio_format), "rb") as f:
+                _clips[key] = f.read()
+        except FileNotFoundError:
+            return None
+    return _clips[key]
+
+
+def _render(voice_id: str, audio_format: str) -> None:
+    from backend.services import _synthesize
+
+    path = clip_path(voice_id, audio_format)
+    rendered = _synthesize(ACKNOWLEDGMENT_TEXT, voice_id, TONE_SETTINGS["neutral"], audio_format)
+    # Written in the audio store, then moved into place, so a half-written clip is never served
+    shutil.move(rendered, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def render_clips() -> int:
+    """
+    Synthesize every missing clip (each distinct voice in every audio format) and load all of them.
+    Returns how many were missing. Workers starting together wait on one lock instead of
+    rendering the same clips.
+    """
+    if not ACKNOWLEDGMENTS_ENABLED or not os.getenv("ELEVEN_LABS_API_KEY"):
+        return 0
+    from filelock import FileLock
+
+    os.makedirs(ACKNOWLEDGMENT_CACHE_DIR, exist_ok=True)
+    wanted = [(voice_id, audio_format) for voice_id in set(ELEVENLABS_VOICE_IDs.values()) for audio_format in AUDIO_FORMATS]
+    with FileLock(os.path.join(ACKNOWLEDGMENT_CACHE_DIR, ".render.lock")):
+        missing = [clip for clip in wanted if not os.path.exists(clip_path(*clip))]
+        if missing:
+            with ThreadPoolExecutor(max_workers=_RENDER_CONCURRENCY) as pool:
+                for clip, future in [(clip, pool.submit(_render, *clip)) for clip in missing]:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # A missing clip only means no acknowledgment for that voice
+                        print(f"Could not render acknowledgment for voice {clip[0]} ({clip[1]}): {e}")
+    for name in ELEVENLABS_VOICE_IDs:
+        for audio_format in AUDIO_FORMATS:
+            get_clip(name, audio_format)
+    return len(missing)
@@ -0,0 +1,103 @@
+"""
+Short-lived on-disk store for synthesized audio, served by GET /audio/{audio_id}.
+
+Files live in a shared directory rather than in process memory, so any worker can serve
+an ID produced by another one. Expired files are swept opportunistically on writes.
+"""
+import os
+import re
+import secrets
+import time
+from typing import Iterator, Optional, Tuple
+
+from backend.config.elevenlabs_voice_config import AUDIO_FORMATS
+
+AUDIO_CACHE_DIR = "data/audio_cache"
+AUDIO_TTL_SECONDS = int(os.getenv("AUDIO_TTL_SECONDS", "300"))
+_SWEEP_INTERVAL_SECONDS = 60
+_AUDIO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+_MEDIA_TYPES = {extension: media_type for _, extension, media_type in AUDIO_FORMATS.values()}
+
+_last_sweep = 0.0
+
+
+def new_audio_path(extension: str) -> str:
+    """Reserve a path for a new clip; its file name (without extension) is the audio ID."""
+    _sweep_expired()
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    return os.path.join(AUDIO_CACHE_DIR, f"{secrets.token_urlsafe(16)}.{extension}")
+
+
+def audio_id_for(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def find_audio(audio_id: str) -> Optional[Tuple[str, str]]:
+    """Return (path, media type) of a live clip, or None if unknown or expired."""
+    if not _AUDIO_ID_PATTERN.match(audio_id):
+        return None
+    for extension, media_type in _MEDIA_TYPES.items():
+        path = os.path.join(AUDIO_CACHE_DIR, f"{audio_id}.{extension}")
+        try:
+            if time.time() - os.path.getmtime(path) <= AUDIO_TTL_SECONDS:
+                return path, media_type
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "bytes=start-end" header into an inclusive (start, end).
+    Returns None when there is no usable range (serve the whole file); raises ValueError when unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    suffix = start_text == ""
+    # Syntactically invalid ranges, including last < first, are ignored (RFC 7233 §3.1)
+    if suffix:
+        if not end_text.isdigit():
+            return None
+    elif not start_text.isdigit() or (end_text and (not end_text.isdigit() or int(end_text) < int(start_text))):
+        return None
+    # Valid ranges without a byte of the file to serve are errors (416)
+    if suffix:
+        length = int(end_text)
+        if length == 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def iter_file(path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Yield the inclusive byte range [start, end] of a file in chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = (end - start + 1) if end is not None else None
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def _sweep_expired() -> None:
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < _SWEEP_INTERVAL_SECONDS or not os.path.isdir(AUDIO_CACHE_DIR):
+        return
+    _last_sweep = now
+    for name in os.listdir(AUDIO_CACHE_DIR):
+        path = os.path.join(AUDIO_CACHE_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > AUDIO_TTL_SECONDS:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
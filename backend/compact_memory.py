@@ -0,0 +1,110 @@
+"""
+One-off deduplication of stored memories.
+
+    python -m backend.compact_memory
+    python -m backend.compact_memory --user alice --threshold 0.93
+    python -m backend.compact_memory --all-users --dry-run
+
+Statements saved before write-time deduplication (backend/memory_dedup.py) existed, or saved
+with a different MEMORY_DEDUP_SIMILARITY, can repeat each other. This walks a collection's
+statements oldest first and merges each one into the earlier statement it repeats, the way
+save_conversation would have: the newest wording is kept, with the first timestamp and the
+repeat count of the whole group. Facts and summaries are not touched.
+
+Runs under the collection's summarization lock, and workers rebuild their indexes afterwards.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+from typing import List
+
+import numpy as np
+
+from backend.memory_dedup import DEDUPLICATED_TYPE, merged_metadata
+from backend.rag_config import MEMORY_DEDUP_SIMILARITY
+from backend.tenancy import collection_name_for, known_user_ids, validate_user_id
+from backend.vector_store import get_or_create_collection
+from backend.workers import collection_replaced_marker, summarization_lock
+
+
+class _Group:
+    """Statements found to repeat each other; the newest one is kept."""
+
+    def __init__(self, doc_id: str, meta: dict):
+        self.doc_id = doc_id
+        self.meta = meta
+        self.replaced: List[str] = []
+
+    def merge(self, doc_id: str, meta: dict) -> None:
+        self.replaced.append(self.doc_id)
+        self.doc_id = doc_id
+        self.meta = merged_metadata(self.meta, meta)
+
+
+def compact_collection(collection_name: str, threshold: float = MEMORY_DEDUP_SIMILARITY, dry_run: bool = False) -> None:
+    collection = get_or_create_collection(collection_name)
+    with summarization_lock(collection_name) as acquired:
+        if not acquired:
+            print(f"Summarization is running on '{collection_name}'; skipped")
+            return
+
+        stored = collection.get(where={"type": DEDUPLICATED_TYPE}, include=["embeddings", "metadatas"])
+        if not len(stored["ids"]):
+            print(f"'{collection_name}': no statements")
+            return
+        order = sorted(range(len(stored["ids"])), key=lambda i: (stored["metadatas"][i] or {}).get("timestamp", ""))
+        vectors = np.asarray(stored["embeddings"], dtype=np.float32)[order]
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        # Each statement is compared with the latest (kept) statement of every group so far
+        groups: List[_Group] = []
+        kept = np.empty_like(vectors)
+        for row, i in enumerate(order):
+            doc_id, meta = stored["ids"][i], stored["metadatas"][i] or {}
+            if groups:
+                similarities = kept[: len(groups)] @ vectors[row]
+                best = int(np.argmax(similarities))
+                if similarities[best] >= threshold:
+                    groups[best].merge(doc_id, meta)
+                    kept[best] = vectors[row]
+                    continue
+            kept[len(groups)] = vectors[row]
+            groups.append(_Group(doc_id, meta))
+
+        merged = [group for group in groups if group.replaced]
+        removed = sum(len(group.replaced) for group in merged)
+        print(
+            f"'{collection_name}': {len(order)} statements, {removed} repeats merged into {len(merged)} "
+            f"(dedup ratio {removed / len(order):.1%})"
+        )
+        if dry_run or not merged:
+            return
+
+        collection.update(ids=[group.doc_id for group in merged], metadatas=[group.meta for group in merged])
+        collection.delete(ids=[doc_id for group in merged for doc_id in group.replaced])
+        collection_replaced_marker(collection_name).bump()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--user", help="Compact this user's collection (default: the default user's)")
+    target.add_argument("--all-users", action="store_true", help="Compact the collection of every user with a database")
+    parser.add_argument("--threshold", type=float, default=MEMORY_DEDUP_SIMILARITY, help="Cosine similarity from which statements are merged")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be merged without changing anything")
+    args = parser.parse_args()
+
+    if not 0 < args.threshold <= 1:
+        parser.error("--threshold must be in (0, 1]")
+    try:
+        user_ids = known_user_ids() if args.all_users else [validate_user_id(args.user)]
+    except ValueError as e:
+        parser.error(str(e))
+    for user_id in user_ids:
+        compact_collection(collection_name_for(user_id), args.threshold, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import os
+
 ELEVENLABS_VOICE_IDs = {
          "Rachel": "21m00Tcm4TlvDq8ikWAM",
          "Domi": "AZnzlk1XvdvUeBnXmlld",
@@ -22,4 +24,18 @@ TONE_SETTINGS = {
             "serious": {"stability": 0.7, "similarity_boost": 0.65},
             "empathetic": {"stability": 0.4, "similarity_boost": 0.85},
             "sad": {"stability": 0.6, "similarity_boost": 0.8}
-}
\ No newline at end of file
+}
+
+# Selectable output codecs: name -> (ElevenLabs output_format, file extension, media type)
+AUDIO_FORMATS = {
+            "mp3": ("mp3_44100_128", "mp3", "audio/mpeg"),
+            "mp3_low": ("mp3_22050_32", "mp3", "audio/mpeg"),
+            "opus": ("opus_48000_32", "ogg", "audio/ogg; codecs=opus"),
+}
+DEFAULT_AUDIO_FORMAT = "mp3"
+
+# Filler clip streamed while a slow tool route runs (see backend/acknowledgments.py): one per voice,
+# synthesized at warmup and kept on disk, so requests never pay for it
+ACKNOWLEDGMENTS_ENABLED = os.getenv("ACKNOWLEDGMENTS_ENABLED", "true").lower() == "true"
+ACKNOWLEDGMENT_TEXT = "Let me check that for you…"
+ACKNOWLEDGMENT_CACHE_DIR = "data/acknowledgments"
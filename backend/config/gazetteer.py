@@ -0,0 +1,307 @@
+# Offline gazetteer for DateTimeRetriever: place names and aliases -> IANA time zone.
+# Matching is case- and accent-insensitive on whole words (backend/places.py), so aliases only
+# need other spellings, abbreviations and native names. Names that are also common English
+# words ("Nice", "Reading", "Mobile") are left out: they would turn ordinary questions into places.
+
+# City, country, IANA time zone, aliases
+CITIES = [
+    # Africa
+    ("Cairo", "Egypt", "Africa/Cairo", ["al qahirah"]),
+    ("Alexandria", "Egypt", "Africa/Cairo", []),
+    ("Giza", "Egypt", "Africa/Cairo", []),
+    ("Luxor", "Egypt", "Africa/Cairo", []),
+    ("Aswan", "Egypt", "Africa/Cairo", []),
+    ("Hurghada", "Egypt", "Africa/Cairo", []),
+    ("Sharm El Sheikh", "Egypt", "Africa/Cairo", ["sharm"]),
+    ("Casablanca", "Morocco", "Africa/Casablanca", []),
+    ("Marrakesh", "Morocco", "Africa/Casablanca", ["marrakech"]),
+    ("Rabat", "Morocco", "Africa/Casablanca", []),
+    ("Tunis", "Tunisia", "Africa/Tunis", []),
+    ("Algiers", "Algeria", "Africa/Algiers", []),
+    ("Tripoli", "Libya", "Africa/Tripoli", []),
+    ("Khartoum", "Sudan", "Africa/Khartoum", []),
+    ("Addis Ababa", "Ethiopia", "Africa/Addis_Ababa", []),
+    ("Nairobi", "Kenya", "Africa/Nairobi", []),
+    ("Mombasa", "Kenya", "Africa/Nairobi", []),
+    ("Dar es Salaam", "Tanzania", "Africa/Dar_es_Salaam", []),
+    ("Kampala", "Uganda", "Africa/Kampala", []),
+    ("Kigali", "Rwanda", "Africa/Kigali", []),
+    ("Lagos", "Nigeria", "Africa/Lagos", []),
+    ("Abuja", "Nigeria", "Africa/Lagos", []),
+    ("Accra", "Ghana", "Africa/Accra", []),
+    ("Dakar", "Senegal", "Africa/Dakar", []),
+    ("Abidjan", "Ivory Coast", "Africa/Abidjan", []),
+    ("Kinshasa", "DR Congo", "Africa/Kinshasa", []),
+    ("Luanda", "Angola", "Africa/Luanda", []),
+    ("Johannesburg", "South Africa", "Africa/Johannesburg", ["joburg", "jo'burg"]),
+    ("Cape Town", "South Africa", "Africa/Johannesburg", []),
+    ("Durban", "South Africa", "Africa/Johannesburg", []),
+    ("Pretoria", "South Africa", "Africa/Johannesburg", []),
+    ("Harare", "Zimbabwe", "Africa/Harare", []),
+    ("Lusaka", "Zambia", "Africa/Lusaka", []),
+    ("Maputo", "Mozambique", "Africa/Maputo", []),
+    ("Antananarivo", "Madagascar", "Indian/Antananarivo", []),
+    ("Port Louis", "Mauritius", "Indian/Mauritius", []),
+    # Middle East
+    ("Dubai", "United Arab Emirates", "Asia/Dubai", []),
+    ("Abu Dhabi", "United Arab Emirates", "Asia/Dubai", []),
+    ("Doha", "Qatar", "Asia/Qatar", []),
+    ("Riyadh", "Saudi Arabia", "Asia/Riyadh", []),
+    ("Jeddah", "Saudi Arabia", "Asia/Riyadh", ["jiddah"]),
+    ("Mecca", "Saudi Arabia", "Asia/Riyadh", ["makkah"]),
+    ("Medina", "Saudi Arabia", "Asia/Riyadh", []),
+    ("Kuwait City", "Kuwait", "Asia/Kuwait", []),
+    ("Manama", "Bahrain", "Asia/Bahrain", []),
+    ("Muscat", "Oman", "Asia/Muscat", []),
+    ("Amman", "Jordan", "Asia/Amman", []),
+    ("Beirut", "Lebanon", "Asia/Beirut", []),
+    ("Damascus", "Syria", "Asia/Damascus", []),
+    ("Baghdad", "Iraq", "Asia/Baghdad", []),
+    ("Tehran", "Iran", "Asia/Tehran", []),
+    ("Jerusalem", "Israel", "Asia/Jerusalem", []),
+    ("Tel Aviv", "Israel", "Asia/Jerusalem", []),
+    ("Gaza", "Palestine", "Asia/Gaza", []),
+    ("Istanbul", "Turkey", "Europe/Istanbul", []),
+    ("Ankara", "Turkey", "Europe/Istanbul", []),
+    ("Antalya", "Turkey", "Europe/Istanbul", []),
+    # Europe
+    ("London", "United Kingdom", "Europe/London", []),
+    ("Manchester", "United Kingdom", "Europe/London", []),
+    ("Liverpool", "United Kingdom", "Europe/London", []),
+    ("Birmingham", "United Kingdom", "Europe/London", []),
+    ("Edinburgh", "United Kingdom", "Europe/London", []),
+    ("Glasgow", "United Kingdom", "Europe/London", []),
+    ("Dublin", "Ireland", "Europe/Dublin", []),
+    ("Paris", "France", "Europe/Paris", []),
+    ("Lyon", "France", "Europe/Paris", []),
+    ("Marseille", "France", "Europe/Paris", ["marseilles"]),
+    ("Bordeaux", "France", "Europe/Paris", []),
+    ("Brussels", "Belgium", "Europe/Brussels", ["bruxelles"]),
+    ("Amsterdam", "Netherlands", "Europe/Amsterdam", []),
+    ("Rotterdam", "Netherlands", "Europe/Amsterdam", []),
+    ("Luxembourg", "Luxembourg", "Europe/Luxembourg", []),
+    ("Berlin", "Germany", "Europe/Berlin", []),
+    ("Munich", "Germany", "Europe/Berlin", ["münchen"]),
+    ("Hamburg", "Germany", "Europe/Berlin", []),
+    ("Frankfurt", "Germany", "Europe/Berlin", []),
+    ("Cologne", "Germany", "Europe/Berlin", ["köln"]),
+    ("Zurich", "Switzerland", "Europe/Zurich", ["zürich"]),
+    ("Geneva", "Switzerland", "Europe/Zurich", ["genève"]),
+    ("Vienna", "Austria", "Europe/Vienna", ["wien"]),
+    ("Prague", "Czech Republic", "Europe/Prague", ["praha"]),
+    ("Warsaw", "Poland", "Europe/Warsaw", ["warszawa"]),
+    ("Krakow", "Poland", "Europe/Warsaw", ["kraków", "cracow"]),
+    ("Budapest", "Hungary", "Europe/Budapest", []),
+    ("Bucharest", "Romania", "Europe/Bucharest", []),
+    ("Sofia", "Bulgaria", "Europe/Sofia", []),
+    ("Belgrade", "Serbia", "Europe/Belgrade", []),
+    ("Zagreb", "Croatia", "Europe/Zagreb", []),
+    ("Athens", "Greece", "Europe/Athens", []),
+    ("Rome", "Italy", "Europe/Rome", ["roma"]),
+    ("Milan", "Italy", "Europe/Rome", ["milano"]),
+    ("Venice", "Italy", "Europe/Rome", ["venezia"]),
+    ("Florence", "Italy", "Europe/Rome", ["firenze"]),
+    ("Naples", "Italy", "Europe/Rome", ["napoli"]),
+    ("Madrid", "Spain", "Europe/Madrid", []),
+    ("Barcelona", "Spain", "Europe/Madrid", []),
+    ("Valencia", "Spain", "Europe/Madrid", []),
+    ("Seville", "Spain", "Europe/Madrid", ["sevilla"]),
+    ("Lisbon", "Portugal", "Europe/Lisbon", ["lisboa"]),
+    ("Porto", "Portugal", "Europe/Lisbon", []),
+    ("Copenhagen", "Denmark", "Europe/Copenhagen", []),
+    ("Stockholm", "Sweden", "Europe/Stockholm", []),
+    ("Oslo", "Norway", "Europe/Oslo", []),
+    ("Helsinki", "Finland", "Europe/Helsinki", []),
+    ("Reykjavik", "Iceland", "Atlantic/Reykjavik", []),
+    ("Tallinn", "Estonia", "Europe/Tallinn", []),
+    ("Riga", "Latvia", "Europe/Riga", []),
+    ("Vilnius", "Lithuania", "Europe/Vilnius", []),
+    ("Kyiv", "Ukraine", "Europe/Kyiv", ["kiev"]),
+    ("Moscow", "Russia", "Europe/Moscow", []),
+    ("Saint Petersburg", "Russia", "Europe/Moscow", ["st petersburg", "st. petersburg"]),
+    # Asia and Oceania
+    ("Tokyo", "Japan", "Asia/Tokyo", []),
+    ("Osaka", "Japan", "Asia/Tokyo", []),
+    ("Kyoto", "Japan", "Asia/Tokyo", []),
+    ("Seoul", "South Korea", "Asia/Seoul", []),
+    ("Beijing", "China", "Asia/Shanghai", ["peking"]),
+    ("Shanghai", "China", "Asia/Shanghai", []),
+    ("Shenzhen", "China", "Asia/Shanghai", []),
+    ("Guangzhou", "China", "Asia/Shanghai", []),
+    ("Hong Kong", "Hong Kong", "Asia/Hong_Kong", []),
+    ("Taipei", "Taiwan", "Asia/Taipei", []),
+    ("Manila", "Philippines", "Asia/Manila", []),
+    ("Bangkok", "Thailand", "Asia/Bangkok", []),
+    ("Phuket", "Thailand", "Asia/Bangkok", []),
+    ("Hanoi", "Vietnam", "Asia/Ho_Chi_Minh", []),
+    ("Ho Chi Minh City", "Vietnam", "Asia/Ho_Chi_Minh", ["saigon"]),
+    ("Kuala Lumpur", "Malaysia", "Asia/Kuala_Lumpur", []),
+    ("Singapore", "Singapore", "Asia/Singapore", []),
+    ("Jakarta", "Indonesia", "Asia/Jakarta", []),
+    ("Bali", "Indonesia", "Asia/Makassar", ["denpasar"]),
+    ("Delhi", "India", "Asia/Kolkata", ["new delhi"]),
+    ("Mumbai", "India", "Asia/Kolkata", ["bombay"]),
+    ("Bangalore", "India", "Asia/Kolkata", ["bengaluru"]),
+    ("Kolkata", "India", "Asia/Kolkata", ["calcutta"]),
+    ("Chennai", "India", "Asia/Kolkata", ["madras"]),
+    ("Karachi", "Pakistan", "Asia/Karachi", []),
+    ("Lahore", "Pakistan", "Asia/Karachi", []),
+    ("Islamabad", "Pakistan", "Asia/Karachi", []),
+    ("Dhaka", "Bangladesh", "Asia/Dhaka", []),
+    ("Kathmandu", "Nepal", "Asia/Kathmandu", []),
+    ("Colombo", "Sri Lanka", "Asia/Colombo", []),
+    ("Tashkent", "Uzbekistan", "Asia/Tashkent", []),
+    ("Almaty", "Kazakhstan", "Asia/Almaty", []),
+    ("Sydney", "Australia", "Australia/Sydney", []),
+    ("Melbourne", "Australia", "Australia/Melbourne", []),
+    ("Brisbane", "Australia", "Australia/Brisbane", []),
+    ("Perth", "Australia", "Australia/Perth", []),
+    ("Adelaide", "Australia", "Australia/Adelaide", []),
+    ("Canberra", "Australia", "Australia/Sydney", []),
+    ("Auckland", "New Zealand", "Pacific/Auckland", []),
+    ("Wellington", "New Zealand", "Pacific/Auckland", []),
+    ("Honolulu", "United States", "Pacific/Honolulu", []),
+    # Americas
+    ("New York", "United States", "America/New_York", ["nyc", "new york city"]),
+    ("Washington", "United States", "America/New_York", ["washington dc", "washington d.c."]),
+    ("Boston", "United States", "America/New_York", []),
+    ("Philadelphia", "United States", "America/New_York", []),
+    ("Miami", "United States", "America/New_York", []),
+    ("Atlanta", "United States", "America/New_York", []),
+    ("Orlando", "United States", "America/New_York", []),
+    ("Detroit", "United States", "America/Detroit", []),
+    ("Chicago", "United States", "America/Chicago", []),
+    ("Houston", "United States", "America/Chicago", []),
+    ("Dallas", "United States", "America/Chicago", []),
+    ("Austin", "United States", "America/Chicago", []),
+    ("New Orleans", "United States", "America/Chicago", []),
+    ("Denver", "United States", "America/Denver", []),
+    ("Phoenix", "United States", "America/Phoenix", []),
+    ("Las Vegas", "United States", "America/Los_Angeles", ["vegas"]),
+    ("Los Angeles", "United States", "America/Los_Angeles", ["la"]),
+    ("San Francisco", "United States", "America/Los_Angeles", ["sf"]),
+    ("San Diego", "United States", "America/Los_Angeles", []),
+    ("Seattle", "United States", "America/Los_Angeles", []),
+    ("Anchorage", "United States", "America/Anchorage", []),
+    ("Toronto", "Canada", "America/Toronto", []),
+    ("Montreal", "Canada", "America/Toronto", ["montréal"]),
+    ("Ottawa", "Canada", "America/Toronto", []),
+    ("Vancouver", "Canada", "America/Vancouver", []),
+    ("Calgary", "Canada", "America/Edmonton", []),
+    ("Mexico City", "Mexico", "America/Mexico_City", ["cdmx"]),
+    ("Cancun", "Mexico", "America/Cancun", ["cancún"]),
+    ("Havana", "Cuba", "America/Havana", []),
+    ("Bogota", "Colombia", "America/Bogota", ["bogotá"]),
+    ("Lima", "Peru", "America/Lima", []),
+    ("Santiago", "Chile", "America/Santiago", []),
+    ("Buenos Aires", "Argentina", "America/Argentina/Buenos_Aires", []),
+    ("Sao Paulo", "Brazil", "America/Sao_Paulo", ["são paulo"]),
+    ("Rio de Janeiro", "Brazil", "America/Sao_Paulo", ["rio"]),
+    ("Brasilia", "Brazil", "America/Sao_Paulo", ["brasília"]),
+    ("Caracas", "Venezuela", "America/Caracas", []),
+    ("Quito", "Ecuador", "America/Guayaquil", []),
+    ("Montevideo", "Uruguay", "America/Montevideo", []),
+]
+
+# Country, the city it resolves to (its capital or largest time zone), aliases
+COUNTRIES = [
+    ("Egypt", "Cairo", ["misr"]),
+    ("Morocco", "Rabat", []),
+    ("Tunisia", "Tunis", []),
+    ("Algeria", "Algiers", []),
+    ("Libya", "Tripoli", []),
+    ("Sudan", "Khartoum", []),
+    ("Ethiopia", "Addis Ababa", []),
+    ("Kenya", "Nairobi", []),
+    ("Tanzania", "Dar es Salaam", []),
+    ("Uganda", "Kampala", []),
+    ("Rwanda", "Kigali", []),
+    ("Nigeria", "Lagos", []),
+    ("Ghana", "Accra", []),
+    ("Senegal", "Dakar", []),
+    ("Ivory Coast", "Abidjan", ["cote d'ivoire", "côte d'ivoire"]),
+    ("DR Congo", "Kinshasa", ["democratic republic of the congo", "drc"]),
+    ("Angola", "Luanda", []),
+    ("South Africa", "Johannesburg", []),
+    ("Zimbabwe", "Harare", []),
+    ("Zambia", "Lusaka", []),
+    ("Mozambique", "Maputo", []),
+    ("Madagascar", "Antananarivo", []),
+    ("Mauritius", "Port Louis", []),
+    ("United Arab Emirates", "Dubai", ["uae", "emirates"]),
+    ("Qatar", "Doha", []),
+    ("Saudi Arabia", "Riyadh", ["saudi", "ksa"]),
+    ("Kuwait", "Kuwait City", []),
+    ("Bahrain", "Manama", []),
+    ("Oman", "Muscat", []),
+    ("Jordan", "Amman", []),
+    ("Lebanon", "Beirut", []),
+    ("Syria", "Damascus", []),
+    ("Iraq", "Baghdad", []),
+    ("Iran", "Tehran", []),
+    ("Israel", "Jerusalem", []),
+    ("Palestine", "Gaza", []),
+    ("Turkey", "Istanbul", ["türkiye", "turkiye"]),
+    ("United Kingdom", "London", ["uk", "britain", "great britain", "england", "scotland", "wales"]),
+    ("Ireland", "Dublin", []),
+    ("France", "Paris", []),
+    ("Belgium", "Brussels", []),
+    ("Netherlands", "Amsterdam", ["holland", "the netherlands"]),
+    ("Germany", "Berlin", ["deutschland"]),
+    ("Switzerland", "Zurich", []),
+    ("Austria", "Vienna", []),
+    ("Czech Republic", "Prague", ["czechia"]),
+    ("Poland", "Warsaw", []),
+    ("Hungary", "Budapest", []),
+    ("Romania", "Bucharest", []),
+    ("Bulgaria", "Sofia", []),
+    ("Serbia", "Belgrade", []),
+    ("Croatia", "Zagreb", []),
+    ("Greece", "Athens", []),
+    ("Italy", "Rome", ["italia"]),
+    ("Spain", "Madrid", ["españa"]),
+    ("Portugal", "Lisbon", []),
+    ("Denmark", "Copenhagen", []),
+    ("Sweden", "Stockholm", []),
+    ("Norway", "Oslo", []),
+    ("Finland", "Helsinki", []),
+    ("Iceland", "Reykjavik", []),
+    ("Estonia", "Tallinn", []),
+    ("Latvia", "Riga", []),
+    ("Lithuania", "Vilnius", []),
+    ("Ukraine", "Kyiv", []),
+    ("Russia", "Moscow", []),
+    ("Japan", "Tokyo", []),
+    ("South Korea", "Seoul", ["korea"]),
+    ("China", "Beijing", []),
+    ("Taiwan", "Taipei", []),
+    ("Philippines", "Manila", ["the philippines"]),
+    ("Thailand", "Bangkok", []),
+    ("Vietnam", "Hanoi", ["viet nam"]),
+    ("Malaysia", "Kuala Lumpur", []),
+    ("Indonesia", "Jakarta", []),
+    ("India", "Delhi", []),
+    ("Pakistan", "Islamabad", []),
+    ("Bangladesh", "Dhaka", []),
+    ("Nepal", "Kathmandu", []),
+    ("Sri Lanka", "Colombo", []),
+    ("Uzbekistan", "Tashkent", []),
+    ("Kazakhstan", "Almaty", []),
+    ("Australia", "Sydney", []),
+    ("New Zealand", "Auckland", []),
+    ("United States", "New York", ["usa", "america", "united states of america"]),
+    ("Canada", "Toronto", []),
+    ("Mexico", "Mexico City", []),
+    ("Cuba", "Havana", []),
+    ("Colombia", "Bogota", []),
+    ("Peru", "Lima", []),
+    ("Chile", "Santiago", []),
+    ("Argentina", "Buenos Aires", []),
+    ("Brazil", "Sao Paulo", ["brasil"]),
+    ("Venezuela", "Caracas", []),
+    ("Ecuador", "Quito", []),
+    ("Uruguay", "Montevideo", []),
+]
+
+# Answered when the query names no place, as before the gazetteer
+DEFAULT_PLACE = "Cairo"
@@ -0,0 +1,27 @@
+import os
+
+# Number of worker processes started by `python main.py`. Models are loaded once in the parent
+# and shared copy-on-write with the forked workers.
+PERCEPTO_WORKERS = int(os.getenv("PERCEPTO_WORKERS", "1"))
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+
+# Set by the pre-fork parent for each worker (0..PERCEPTO_WORKERS-1); unset when served by other means
+PERCEPTO_WORKER_ID = os.getenv("PERCEPTO_WORKER_ID")
+# Worker that runs background summarization. Without PERCEPTO_WORKER_ID (e.g. `uvicorn --workers N`)
+# the first process to take the summarization file lock is designated instead.
+SUMMARIZATION_WORKER_ID = os.getenv("SUMMARIZATION_WORKER_ID", "0")
+
+# Directory for cross-process lock and change-marker files
+WORKER_STATE_DIR = os.getenv("WORKER_STATE_DIR", "data/databases")
+
+# SQLite waits this long for another process's write lock instead of failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Time budget of one interactive request (STT, pipeline, TTS), overridable per request with
+# ?deadline_ms=. TTS is skipped, and a text-only answer returned, when less than
+# TTS_MIN_BUDGET_SECONDS is left once the answer is ready.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+TTS_MIN_BUDGET_SECONDS = float(os.getenv("TTS_MIN_BUDGET_SECONDS", "2"))
+# How often a waiting request polls for a client disconnect
+DISCONNECT_POLL_SECONDS = 0.1
@@ -0,0 +1,36 @@
+import os
+
+# Speech-to-text engine selection. "whisper" is the reference openai-whisper (fp32 PyTorch) backend,
+# "faster_whisper" runs the same models through CTranslate2 with int8 quantization on CPU.
+STT_BACKEND = os.getenv("STT_BACKEND", "whisper")
+STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "base")
+# 1 = greedy decoding
+STT_BEAM_SIZE = int(os.getenv("STT_BEAM_SIZE", "1"))
+# Pinning the language (e.g. "en") skips Whisper's language-detection pass
+STT_LANGUAGE = os.getenv("STT_LANGUAGE") or None
+# 0 = let the backend decide
+STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", "0"))
+# CTranslate2 compute type for the faster_whisper backend: int8, int8_float32, float32, ...
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8")
+
+# Energy-based voice activity detection, applied before transcription and while recording
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_FRAME_MS = 30
+# Frames must be louder than both this absolute floor and the estimated noise floor plus the margin
+VAD_MIN_ENERGY_DB = -50.0
+VAD_NOISE_MARGIN_DB = 10.0
+# A clip whose loud and quiet frames differ by less than this has no pauses to estimate the
+# noise floor from (continuous speech, an already trimmed recording): only the absolute floor applies
+VAD_MIN_DYNAMIC_RANGE_DB = 10.0
+# Audio kept around the detected speech so that soft onsets and endings are not clipped
+VAD_PADDING_MS = 200
+# Clips with less detected speech than this are treated as empty utterances
+VAD_MIN_SPEECH_MS = 250
+# record_audio stops after this much silence following speech
+VAD_END_SILENCE_MS = 800
+
+# Micro-batching: concurrent requests' clips are collected for up to STT_BATCH_MAX_WAIT_MS
+# and transcribed in one batched encoder/decoder pass (whisper backend)
+STT_BATCHING_ENABLED = os.getenv("STT_BATCHING_ENABLED", "false").lower() == "true"
+STT_BATCH_MAX_SIZE = int(os.getenv("STT_BATCH_MAX_SIZE", "8"))
+STT_BATCH_MAX_WAIT_MS = float(os.getenv("STT_BATCH_MAX_WAIT_MS", "15"))
@@ -0,0 +1,13 @@
+import os
+
+# How conversations get their titles:
+# - "local": keyphrases of the first exchange (backend/keyphrases.py), no network calls
+# - "batch": one LLM request every TITLE_BATCH_INTERVAL_SECONDS titles every untitled conversation
+#   (up to TITLE_BATCH_SIZE); until then conversations are listed with a local, provisional title
+TITLE_MODE = os.getenv("TITLE_MODE", "local")
+TITLE_MAX_LENGTH = 30
+TITLE_BATCH_INTERVAL_SECONDS = float(os.getenv("TITLE_BATCH_INTERVAL_SECONDS", "60"))
+TITLE_BATCH_SIZE = 50
+TITLE_MODEL = "gpt-4o-mini"
+# Shown when the first message has no content words to build a title from
+DEFAULT_TITLE = "New conversation"
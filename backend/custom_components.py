@@ -1,6 +1,38 @@
-from haystack import component
+from haystack import component, Document
+from haystack.dataclasses import ChatMessage
+from jinja2.sandbox import SandboxedEnvironment
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import contextvars
 import requests
 import re
+from concurrent.futures import ThreadPoolExecutor
+from backend.acknowledgments import announce_route
+from backend.config.gazetteer import DEFAULT_PLACE
+from backend.deadline import RequestCancelled, check_deadline
+from backend.lexical_index import get_lexical_index, reciprocal_rank_fusion, tokenize
+from backend.places import find_place, local_time
+from backend.vector_index import get_vector_index
+from backend.tokenization import count_tokens
+from backend.telemetry import stage
+from backend.rag_config import (
+    RRF_K,
+    CONTEXT_MIN_RELEVANCE,
+    CONTEXT_DUPLICATE_SIMILARITY,
+    CONTEXT_LEXICAL_DUPLICATE_SIMILARITY,
+    CONTEXT_TOKEN_BUDGET,
+    SYSTEM_PROMPT,
+    USER_PROMPT_TEMPLATE,
+    WEATHER_API_BASE_URL,
+    SERP_API_BASE_URL,
+    NOMINATIM_BASE_URL,
+    GOOGLE_GEOLOCATION_URL,
+    IP_API_URL,
+    TOOL_ROUTES,
+    MAX_TOOL_CALLS,
+    ACKNOWLEDGED_ROUTES,
+)
 
 @component
 class LocationRetriever:
@@ -12,7 +44,7 @@ class LocationRetriever:
         Get human-readable location description using OpenStreetMap Nominatim API.
         """
         try:
-            url = 'https://nominatim.openstreetmap.org/reverse'
+            url = f'{NOMINATIM_BASE_URL}/reverse'
             params = {
                 'lat': latitude,
                 'lon': longitude,
@@ -48,7 +80,7 @@ class LocationRetriever:
         Determine location using Google Maps Geocoding API.
         """    
         try:
-            url = f'https://www.googleapis.com/geolocation/v1/geolocate?key={self.api_key}'
+            url = f'{GOOGLE_GEOLOCATION_URL}?key={self.api_key}'
             response = requests.post(url)
             
             
@@ -77,21 +109,54 @@ class LocationRetriever:
 
 @component
 class DateTimeRetriever:
+    """
+    Local date and time of the place the query names. Places in the offline gazetteer are
+    answered from zoneinfo; weatherapi.com's timezone lookup remains for the others.
+    """
+
     def __init__(self, api_key: str):
         self.api_key = api_key
 
+    @staticmethod
+    def _format(query: str, location_name: str, country: str, date_part: str, time_part: str) -> str:
+        include_date = "date" in query.lower()
+        include_time = "time" in query.lower()
+
+        if not include_date and not include_time:
+            include_date = include_time = True
+
+        parts = []
+        if include_date:
+            parts.append(f"the date is {date_part}")
+        if include_time:
+            parts.append(f"the time is {time_part}")
+
+        joined = " and ".join(parts)
+        return f"In {location_name}, {country}, {joined}."
+
     @component.output_types(datetime=dict)
     def run(self, query: str) -> dict:
-        match = re.search(r"(?:date|time).*?(?:in|at|for)\s+([a-zA-Z\s]+)", query, re.IGNORECASE)
-        extracted = match.group(1).strip() if match else ""
+        with stage("gazetteer"):
+            place = find_place(query)
+        if place is None:
+            match = re.search(r"(?:date|time).*?(?:in|at|for)\s+([a-zA-Z\s]+)", query, re.IGNORECASE)
+            extracted = match.group(1).strip() if match else ""
 
-        filler_terms = {"time", "date", "today", "now", "it", "is", "this", ""}
-        if extracted.lower() in filler_terms:
-            location = "Cairo" 
-        else:
-            location = extracted.title() 
+            filler_terms = {"time", "date", "today", "now", "it", "is", "this", ""}
+            if extracted.lower() in filler_terms:
+                place = find_place(DEFAULT_PLACE)
+            else:
+                location = extracted.title()
 
-        url = f"http://api.weatherapi.com/v1/timezone.json?key={self.api_key}&q={location}"
+        now = local_time(place) if place is not None else None
+        if now is not None:
+            content = self._format(query, place.name, place.country, now.strftime("%Y-%m-%d"), f"{now.hour}:{now:%M}")
+            return {'content': content, 'url': ""}
+
+        # Not in the gazetteer (or no tz data for it here): ask the API
+        if place is not None:
+            location = place.name
+        url = f"{WEATHER_API_BASE_URL}/timezone.json?key={self.api_key}&q={location}"
         response = requests.get(url)
 
         if response.status_code == 200:
@@ -101,20 +166,7 @@ class DateTimeRetriever:
             localtime = data['location']['localtime']
 
             date_part, time_part = localtime.split()
-            include_date = "date" in query.lower()
-            include_time = "time" in query.lower()
-
-            if not include_date and not include_time:
-                include_date = include_time = True
-
-            parts = []
-            if include_date:
-                parts.append(f"the date is {date_part}")
-            if include_time:
-                parts.append(f"the time is {time_part}")
-
-            joined = " and ".join(parts)
-            content = f"In {location_name}, {country}, {joined}."
+            content = self._format(query, location_name, country, date_part, time_part)
 
             result = {'content': content, 'url': "https://www.weatherapi.com/"}
         else:
@@ -144,12 +196,12 @@ class WeatherRetriever:
 
         if not location:
             try:
-                ip_data = requests.get("http://ip-api.com/json/").json()
+                ip_data = requests.get(IP_API_URL).json()
                 location = ip_data.get("city", "Cairo")
             except:
                 location = "Cairo"  
 
-        url = f"http://api.weatherapi.com/v1/current.json?key={self.api_key}&q={location}"
+        url = f"{WEATHER_API_BASE_URL}/current.json?key={self.api_key}&q={location}"
         response = requests.get(url)
 
         if response.status_code == 200:
@@ -187,7 +239,7 @@ class SerpAPIWebSearch:
     @component.output_types(web_documents=dict)
     def run(self, query: str) -> dict:
         print("Searching the web..")
-        search_url = f"https://serpapi.com/search?q={query}&api_key={self.api_key}"
+        search_url = f"{SERP_API_BASE_URL}/search?q={query}&api_key={self.api_key}"
         response = requests.get(search_url)
         documents = {}
 
@@ -205,4 +257,245 @@ class SerpAPIWebSearch:
             documents['content'] = "I couldn't find any relevant information through web search."
             documents['url'] = ""
 
-        return {"web_documents": documents}
\ No newline at end of file
+        return {"web_documents": documents}
+
+@component
+class HybridRetriever:
+    """
+    Combines the in-memory BM25 index with dense Chroma retrieval using reciprocal rank fusion.
+    When the lexical match is confident the dense branch, and its embedding call, is skipped.
+    The index is looked up on every query, so documents other workers wrote are caught up first.
+    """
+    def __init__(self, embedder, dense_retriever, collection_name: str, rrf_k: int = RRF_K):
+        self.embedder = embedder
+        self.dense_retriever = dense_retriever
+        self.collection_name = collection_name
+        self.rrf_k = rrf_k
+
+    def needs_embedding(self, query: str, top_k: int = 5) -> bool:
+        """Whether run() would take the dense branch, i.e. the lexical match alone is not confident."""
+        index = get_lexical_index(self.collection_name)
+        return not index.is_confident(query, index.search(query, top_k=top_k))
+
+    @component.output_types(documents=List[Document])
+    def run(self, query: str, top_k: int = 5, query_embedding: Optional[List[float]] = None) -> dict:
+        """`query_embedding`, when given (e.g. computed in a batch with other queries), replaces the embedding call."""
+        index = get_lexical_index(self.collection_name)
+        lexical_hits = index.search(query, top_k=top_k)
+        lexical_documents = []
+        for hit in lexical_hits:
+            document = hit.to_document()
+            document.meta["relevance"] = hit.coverage
+            lexical_documents.append(document)
+
+        if index.is_confident(query, lexical_hits):
+            return {"documents": lexical_documents}
+
+        if query_embedding is None:
+            with stage("embedding"):
+                query_embedding = self.embedder.run(text=query)["embedding"]
+        if getattr(self.dense_retriever, "records_stage", False):
+            dense_documents = self.dense_retriever.run(query_embedding=query_embedding, top_k=top_k)["documents"]
+        else:
+            with stage("chroma_query"):
+                dense_documents = self.dense_retriever.run(query_embedding=query_embedding, top_k=top_k)["documents"]
+
+        # Chroma scores are squared L2 distances; on unit-norm OpenAI embeddings that maps to cosine similarity
+        coverage = {hit.id: hit.coverage for hit in lexical_hits}
+        for document in dense_documents:
+            similarity = 1 - document.score / 2 if document.score is not None else 0.0
+            document.meta["relevance"] = max(similarity, coverage.get(document.id, 0.0))
+
+        return {"documents": reciprocal_rank_fusion([dense_documents, lexical_documents], k=self.rrf_k, top_k=top_k)}
+
+
+@component
+class ExactEmbeddingRetriever:
+    """
+    Drop-in replacement for ChromaEmbeddingRetriever answering from the in-process exact vector index,
+    or from `fallback` (the Chroma retriever) when the collection is too large to be loaded.
+    """
+
+    # HybridRetriever leaves the stage timing to this component, which knows which backend answered
+    records_stage = True
+
+    def __init__(self, collection_name: str, fallback):
+        self.collection_name = collection_name
+        self.fallback = fallback
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], top_k: int = 5) -> dict:
+        index = get_vector_index(self.collection_name)
+        if index.oversized:
+            with stage("chroma_query"):
+                return self.fallback.run(query_embedding=query_embedding, top_k=top_k)
+        with stage("vector_index_query"):
+            return {"documents": index.search(query_embedding, top_k=top_k)}
+
+
+# A tool keyword and its argument, up to the end of the line or the next tool keyword
+_TOOL_CALL = re.compile(r"\b(use_\w+?_tool)\b[ \t]*:?[ \t]*(.*?)(?=\buse_\w+?_tool\b|$)", re.IGNORECASE | re.MULTILINE)
+
+
+def parse_tool_calls(reply: str, query: str) -> List[Tuple[str, str]]:
+    """
+    (tool name, argument) of every tool the reply asks for, in order and without repeats. A bare
+    keyword (no argument) gets the whole query.
+    """
+    calls = []
+    for keyword, argument in _TOOL_CALL.findall(reply):
+        tool = TOOL_ROUTES.get(keyword.lower())
+        if tool is None:
+            continue
+        # Calls sharing a line leave their separators on the argument ("weather in Paris, ")
+        call = (tool, argument.strip(" ,;'\"") or query)
+        if call not in calls:
+            calls.append(call)
+    return calls[:MAX_TOOL_CALLS]
+
+
+@component
+class RouteAnnouncer:
+    """
+    Passes the generator's replies on to the router unchanged, announcing a slow tool call
+    (ACKNOWLEDGED_ROUTES) first, so a streaming client can play an acknowledgment while the tools run.
+    """
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(self, replies: List[ChatMessage]):
+        text = replies[0].text if replies and replies[0].text else ""
+        slow = [tool for tool, _ in parse_tool_calls(text, "") if tool in ACKNOWLEDGED_ROUTES]
+        if slow:
+            announce_route(slow[0])
+        return {"replies": replies}
+
+
+@component
+class ToolDispatcher:
+    """
+    Runs every tool call of the reply (see parse_tool_calls) concurrently, each with its own
+    argument, and merges their answers in call order. A compound query ("the weather in Paris and
+    the time in Berlin") costs one wave of tool calls instead of one request per question.
+    """
+
+    # Only web search results are cited as source links
+    _CITED_TOOLS = {"web_search"}
+
+    def __init__(self, tools: Dict[str, object]):
+        # Tool name (TOOL_ROUTES values) -> component whose run(query=...) answers it
+        self.tools = tools
+
+    def _call(self, tool: str, argument: str) -> dict:
+        check_deadline(f"tool.{tool}")
+        with stage(f"tool.{tool}"):
+            try:
+                output = self.tools[tool].run(query=argument)
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                print(f"Tool {tool} failed: {e}")
+                return {"content": f"I couldn't reach the {tool.replace('_', ' ')} service.", "url": ""}
+        # SerpAPIWebSearch nests its result under web_documents
+        return output.get("web_documents", output)
+
+    @component.output_types(content=str, url=Optional[str], prompt_type=str)
+    def run(self, tool_calls: str, query: str) -> dict:
+        calls = parse_tool_calls(tool_calls, query)
+        if not calls:
+            return {"content": "I'm sorry, I couldn't work out how to answer that.", "url": None, "prompt_type": "question"}
+        if len(calls) == 1:
+            results = [self._call(*calls[0])]
+        else:
+            # Each thread runs in a copy of this one's context: deadline, stage timings, route listener
+            with ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix="tool") as pool:
+                futures = [pool.submit(contextvars.copy_context().run, self._call, *call) for call in calls]
+                results = [future.result() for future in futures]
+
+        tools = {tool for tool, _ in calls}
+        urls = [result.get("url") for (tool, _), result in zip(calls, results) if tool in self._CITED_TOOLS and result.get("url")]
+        return {
+            "content": " ".join(result["content"] for result in results),
+            "url": ", ".join(urls) if urls else None,
+            "prompt_type": tools.pop() if len(tools) == 1 else "multi_tool",
+        }
+
+
+@component
+class ContextAssembler:
+    """
+    Trims retrieved documents before prompt building: drops documents below a relevance cutoff,
+    removes near-duplicates (e.g. a summary and the statements it was built from) and enforces a token budget.
+    """
+    def __init__(
+        self,
+        min_relevance: float = CONTEXT_MIN_RELEVANCE,
+        duplicate_similarity: float = CONTEXT_DUPLICATE_SIMILARITY,
+        lexical_duplicate_similarity: float = CONTEXT_LEXICAL_DUPLICATE_SIMILARITY,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+    ):
+        self.min_relevance = min_relevance
+        self.duplicate_similarity = duplicate_similarity
+        self.lexical_duplicate_similarity = lexical_duplicate_similarity
+        self.token_budget = token_budget
+
+    def _is_duplicate(self, document: Document, kept: List[Document]) -> bool:
+        for other in kept:
+            if document.embedding is not None and other.embedding is not None:
+                a = np.asarray(document.embedding, dtype=np.float32)
+                b = np.asarray(other.embedding, dtype=np.float32)
+                similarity = float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) or 1.0))
+                if similarity >= self.duplicate_similarity:
+                    return True
+            else:
+                terms, other_terms = set(tokenize(document.content or "")), set(tokenize(other.content or ""))
+                union = terms | other_terms
+                if union and len(terms & other_terms) / len(union) >= self.lexical_duplicate_similarity:
+                    return True
+        return False
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]) -> dict:
+        kept = []
+        tokens_in = 0
+        tokens_out = 0
+
+        for document in documents:
+            tokens = count_tokens(document.content or "")
+            tokens_in += tokens
+
+            if document.meta.get("relevance", 1.0) < self.min_relevance:
+                continue
+            if self._is_duplicate(document, kept):
+                continue
+            if tokens_out + tokens > self.token_budget:
+                continue
+
+            kept.append(document)
+            tokens_out += tokens
+
+        print(
+            f"Context assembly: kept {len(kept)}/{len(documents)} documents, "
+            f"{tokens_out} context tokens ({tokens_in - tokens_out} saved)"
+        )
+        return {"documents": kept}
+
+
+@lru_cache(maxsize=None)
+def _compile_template(template: str):
+    return SandboxedEnvironment().from_string(template)
+
+
+@component
+class CachedChatPromptBuilder:
+    """
+    Builds the generator's chat messages from a byte-stable system prefix and a small dynamic user message
+    (user name, retrieved context and query). Templates are compiled once per process.
+    """
+    def __init__(self, system_prompt: str = SYSTEM_PROMPT, user_template: str = USER_PROMPT_TEMPLATE):
+        self.system_message = ChatMessage.from_system(system_prompt)
+        self.user_template = _compile_template(user_template)
+
+    @component.output_types(prompt=List[ChatMessage])
+    def run(self, query: str, user_name: str, documents: List[Document]) -> dict:
+        user_message = self.user_template.render(query=query, user_name=user_name, documents=documents)
+        return {"prompt": [self.system_message, ChatMessage.from_user(user_message)]}
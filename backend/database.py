@@ -1,16 +1,24 @@
 from sqlalchemy import (
     ForeignKey,
     create_engine,
+    event,
+    text,
+    cast,
     Column,
     Integer,
     String,
     DateTime,
     func,
 )
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional
 from datetime import datetime
+import html
+import re
+from backend.config.serving_config import SQLITE_BUSY_TIMEOUT_MS
+from backend.tenancy import LEGACY_DATABASE_URL, LRUCache, database_url_for
 
 Base = declarative_base()
 
@@ -41,11 +49,103 @@ class Settings(Base):
     value = Column(String, nullable=False)
 
 
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """WAL lets readers proceed during a write; busy_timeout makes concurrent writers from other processes wait."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+# Full-text index over messages: an external-content FTS5 table (it stores only the index, the
+# text stays in `messages`) kept in sync by triggers, so every write path is covered.
+_SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE messages_fts USING fts5(
+        user_input, ai_response, content='messages', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, user_input, ai_response) VALUES (new.id, new.user_input, new.ai_response);
+    END
+    """,
+    """
+    CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, user_input, ai_response)
+        VALUES ('delete', old.id, old.user_input, old.ai_response);
+    END
+    """,
+    """
+    CREATE TRIGGER messages_fts_update AFTER UPDATE OF user_input, ai_response ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, user_input, ai_response)
+        VALUES ('delete', old.id, old.user_input, old.ai_response);
+        INSERT INTO messages_fts(rowid, user_input, ai_response) VALUES (new.id, new.user_input, new.ai_response);
+    END
+    """,
+]
+
+_SEARCH_QUERY = text("""
+    SELECT m.id AS message_id, m.conversation_id, c.title AS conversation_title, m.timestamp,
+           snippet(messages_fts, 0, :open, :close, '…', :tokens) AS user_input_snippet,
+           snippet(messages_fts, 1, :open, :close, '…', :tokens) AS ai_response_snippet,
+           bm25(messages_fts) AS score
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    JOIN conversations c ON c.id = m.conversation_id
+    WHERE messages_fts MATCH :match AND messages_fts.rowid >= :min_rowid
+      AND (:conversation_id IS NULL OR m.conversation_id = :conversation_id)
+    ORDER BY bm25(messages_fts)
+    LIMIT :limit OFFSET :offset
+""").columns(timestamp=DateTime)
+
+# BM25 has to score every match before sorting, so a word found in most messages would take
+# time proportional to the whole history. Only the most recent SEARCH_MAX_CANDIDATES matches
+# are ranked; finding the cutoff walks the index in rowid order, which is cheap.
+SEARCH_MAX_CANDIDATES = 1000
+_SEARCH_CUTOFF_QUERY = text("""
+    SELECT rowid FROM messages_fts WHERE messages_fts MATCH :match ORDER BY rowid DESC LIMIT 1 OFFSET :candidates
+""")
+
+# Placeholder highlight markers, swapped for <mark> tags after the snippet is HTML-escaped
+_HIGHLIGHT_OPEN, _HIGHLIGHT_CLOSE = "\x02", "\x03"
+_SEARCH_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_MAX_SEARCH_TOKENS = 16
+_search_ready_urls = set()
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression: every word is quoted (so FTS5 operators
+    and punctuation in user input are never interpreted), words are ANDed, and the last word
+    matches as a prefix for search-as-you-type once it has two characters.
+    """
+    tokens = _SEARCH_TOKEN_PATTERN.findall(query)[:_MAX_SEARCH_TOKENS]
+    if not tokens:
+        return ""
+    quoted = [f'"{token}"' for token in tokens]
+    if len(tokens[-1]) >= 2:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_HIGHLIGHT_OPEN, "<mark>").replace(_HIGHLIGHT_CLOSE, "</mark>")
+
+
 class ConversationDatabase:
-    def __init__(self, db_path: str = "sqlite:///data/databases/conversations.db"):
+    def __init__(self, db_path: str = LEGACY_DATABASE_URL):
         self.engine = create_engine(db_path, echo=False)
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", _configure_sqlite_connection)
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
+        if self.engine.dialect.name == "sqlite" and db_path not in _search_ready_urls:
+            self._ensure_search_index()
+            _search_ready_urls.add(db_path)
 
         with self.Session() as session:
             if not session.query(Settings).filter_by(key="current_voice").first():
@@ -55,7 +155,83 @@ class ConversationDatabase:
             if not session.query(Settings).filter_by(key="total_interactions_count").first():
                 default_interaction_count = Settings(key="total_interactions_count", value="0")
                 session.add(default_interaction_count)
-            session.commit()
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another worker process created the defaults first
+                session.rollback()
+
+    def _ensure_search_index(self) -> None:
+        """Create the FTS5 table and its triggers on first use, backfilling messages saved before it existed."""
+        try:
+            with self.engine.begin() as connection:
+                exists = connection.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+                ).first()
+                if exists:
+                    return
+                for statement in _SEARCH_INDEX_DDL:
+                    connection.exec_driver_sql(statement)
+                connection.exec_driver_sql("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+                print("Created the messages full-text index")
+        except OperationalError as e:
+            if "already exists" not in str(e):
+                # e.g. an SQLite build without FTS5: everything but /search keeps working
+                print(f"Full-text search unavailable: {e}")
+
+    def rebuild_search_index(self) -> None:
+        """Re-index every message from scratch (repairs an index that drifted from the messages table)."""
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+    def search_messages(
+        self, query: str, limit: int = 20, offset: int = 0, conversation_id: Optional[int] = None, snippet_tokens: int = 12
+    ) -> Dict:
+        """
+        Full-text search over user inputs and AI responses, best BM25 match first (among the most
+        recent SEARCH_MAX_CANDIDATES matches). Snippets are HTML-escaped with matches wrapped in
+        <mark>. `has_more` tells whether another page exists.
+        """
+        match = build_match_query(query)
+        if not match:
+            return {"results": [], "has_more": False}
+
+        with self.engine.connect() as connection:
+            min_rowid = 0
+            if conversation_id is None:
+                cutoff = connection.execute(
+                    _SEARCH_CUTOFF_QUERY, {"match": match, "candidates": SEARCH_MAX_CANDIDATES}
+                ).first()
+                min_rowid = cutoff[0] if cutoff else 0
+            rows = connection.execute(
+                _SEARCH_QUERY,
+                {
+                    "match": match,
+                    "min_rowid": min_rowid,
+                    "conversation_id": conversation_id,
+                    "open": _HIGHLIGHT_OPEN,
+                    "close": _HIGHLIGHT_CLOSE,
+                    "tokens": snippet_tokens,
+                    "limit": limit + 1,
+                    "offset": offset,
+                },
+            ).all()
+
+        return {
+            "results": [
+                {
+                    "conversation_id": row.conversation_id,
+                    "conversation_title": row.conversation_title,
+                    "message_id": row.message_id,
+                    "timestamp": row.timestamp.isoformat(),
+                    "user_input_snippet": _highlight(row.user_input_snippet),
+                    "ai_response_snippet": _highlight(row.ai_response_snippet),
+                    "score": -row.score,
+                }
+                for row in rows[:limit]
+            ],
+            "has_more": len(rows) > limit,
+        }
 
     def create_new_conversation(self) -> int:
         """Create a new conversation and return its ID."""
@@ -82,13 +258,13 @@ class ConversationDatabase:
                 ai_response=ai_response,
             )
             session.add(message)
-            session.commit()
 
-            # Increment the total_interactions_count
-            total_interactions_setting = session.query(Settings).filter_by(key="total_interactions_count").first()
-            if total_interactions_setting:
-                total_interactions_setting.value = str(int(total_interactions_setting.value) + 1)
-                session.commit()
+            # Increment the total_interactions_count in SQL, so concurrent workers do not lose updates
+            session.query(Settings).filter_by(key="total_interactions_count").update(
+                {Settings.value: cast(cast(Settings.value, Integer) + 1, String)},
+                synchronize_session=False,
+            )
+            session.commit()
 
             return message.id # Return message.id
 
@@ -115,6 +291,48 @@ class ConversationDatabase:
                 for msg in messages
             ]
 
+    def iter_messages(
+        self,
+        conversation_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 500,
+    ) -> Iterator[Dict]:
+        """
+        Stream messages, grouped by conversation and oldest first, optionally limited to one
+        conversation and to timestamps in [start, end). Rows are fetched through a server-side
+        cursor, batch_size at a time, so memory stays constant whatever the history size.
+        """
+        with self.Session() as session:
+            query = (
+                session.query(
+                    Message.id,
+                    Message.conversation_id,
+                    Conversation.title,
+                    Message.user_input,
+                    Message.ai_response,
+                    Message.timestamp,
+                )
+                .join(Conversation, Message.conversation_id == Conversation.id)
+                .order_by(Message.conversation_id, Message.timestamp, Message.id)
+            )
+            if conversation_id is not None:
+                query = query.filter(Message.conversation_id == conversation_id)
+            if start is not None:
+                query = query.filter(Message.timestamp >= start)
+            if end is not None:
+                query = query.filter(Message.timestamp < end)
+
+            for row in query.execution_options(yield_per=batch_size):
+                yield {
+                    "conversation_id": row.conversation_id,
+                    "conversation_title": row.title,
+                    "message_id": row.id,
+                    "user_input": row.user_input,
+                    "ai_response": row.ai_response,
+                    "timestamp": row.timestamp.isoformat(),
+                }
+
     def get_message_by_id(
         self, conversation_id: int, message_id: int
     ) -> Optional[Dict]:
@@ -161,14 +379,59 @@ class ConversationDatabase:
                 return True
             return False
 
+    def set_missing_titles(self, titles: Dict[int, str]) -> int:
+        """Title the given conversations that are still untitled, in one transaction; returns how many were set."""
+        with self.Session() as session:
+            updated = 0
+            for conversation_id, title in titles.items():
+                updated += (
+                    session.query(Conversation)
+                    .filter(Conversation.id == conversation_id, Conversation.title.is_(None))
+                    .update({Conversation.title: title}, synchronize_session=False)
+                )
+            session.commit()
+            return updated
+
+    def _first_exchanges(self, session, conversation_ids: List[int]) -> Dict[int, Message]:
+        first_ids = (
+            session.query(func.min(Message.id))
+            .filter(Message.conversation_id.in_(conversation_ids))
+            .group_by(Message.conversation_id)
+        )
+        messages = session.query(Message).filter(Message.id.in_(first_ids)).all()
+        return {message.conversation_id: message for message in messages}
+
+    def get_untitled_conversations(self, limit: int = 50) -> List[Dict]:
+        """First exchange of the oldest untitled conversations that have at least one message."""
+        with self.Session() as session:
+            untitled = (
+                session.query(Conversation.id)
+                .filter(Conversation.title.is_(None), Conversation.messages.any())
+                .order_by(Conversation.id)
+                .limit(limit)
+            )
+            first = self._first_exchanges(session, [row.id for row in untitled])
+            return [
+                {"conversation_id": conversation_id, "user_input": message.user_input, "ai_response": message.ai_response}
+                for conversation_id, message in sorted(first.items())
+            ]
+
     def get_conversations(self) -> List[Dict]:
-        """Retrieve all conversations with their IDs and titles."""
+        """
+        Retrieve all conversations with their IDs and titles. A conversation not titled yet is
+        listed with a provisional title built locally from its first exchange.
+        """
+        from backend.titles import provisional_title
+
         with self.Session() as session:
             conversations = session.query(Conversation).all()
+            untitled = [conv.id for conv in conversations if conv.title is None]
+            first = self._first_exchanges(session, untitled) if untitled else {}
             return [
                 {
                     "id": conv.id,
-                    "title": conv.title,
+                    "title": conv.title if conv.title is not None else provisional_title(first.get(conv.id)),
+                    "title_provisional": conv.title is None,
                     "created_at": conv.created_at.isoformat(),
                 }
                 for conv in conversations
@@ -215,3 +478,34 @@ class ConversationDatabase:
                 setting = Settings(key="current_voice", value=voice)
                 session.add(setting)
             session.commit()
+
+    def get_summarization_threshold(self) -> Optional[int]:
+        """This database's own summarization threshold, or None to use CONVERSATION_COUNT_THRESHOLD."""
+        with self.Session() as session:
+            setting = session.query(Settings).filter_by(key="summarization_threshold").first()
+            return int(setting.value) if setting else None
+
+    def update_summarization_threshold(self, threshold: Optional[int]) -> None:
+        """Set this database's summarization threshold; None reverts to the default."""
+        with self.Session() as session:
+            setting = session.query(Settings).filter_by(key="summarization_threshold").first()
+            if threshold is None:
+                if setting:
+                    session.delete(setting)
+            elif setting:
+                setting.value = str(threshold)
+            else:
+                session.add(Settings(key="summarization_threshold", value=str(threshold)))
+            session.commit()
+
+
+def _dispose(user_id: str, database: ConversationDatabase) -> None:
+    database.engine.dispose()
+
+
+_databases: LRUCache[str, ConversationDatabase] = LRUCache(on_evict=_dispose)
+
+
+def get_conversation_database(user_id: str) -> ConversationDatabase:
+    """The user's database shard, opened once per process and kept while the user is among the active ones."""
+    return _databases.get_or_create(user_id, lambda: ConversationDatabase(database_url_for(user_id)))
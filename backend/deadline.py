@@ -0,0 +1,138 @@
+"""
+Per-request deadlines and cancellation.
+
+A request starts a Deadline (a time budget plus a cancellation flag) in a context variable, so it
+follows the request into asyncio tasks and `asyncio.to_thread` workers. Stages check it before
+they start: STT and TTS in services, every haystack component through the StageTracer. Work that
+is already running in a thread (an LLM call, a transcription) cannot be interrupted, but the
+request stops waiting for it, and whatever would have run after it is skipped.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, TypeVar
+
+CLIENT_DISCONNECTED = "client_disconnected"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+T = TypeVar("T")
+
+
+class RequestCancelled(Exception):
+    """The request was abandoned before `stage` could run."""
+
+    reason = CLIENT_DISCONNECTED
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request {self.reason.replace('_', ' ')} before {stage}")
+        self.stage = stage
+
+
+class DeadlineExceeded(RequestCancelled):
+    reason = DEADLINE_EXCEEDED
+
+
+class Deadline:
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Mark the client as gone; safe to call from any thread."""
+        self._cancelled.set()
+
+    def check(self, stage: str) -> None:
+        if self.cancelled:
+            raise RequestCancelled(stage)
+        if self.expired:
+            raise DeadlineExceeded(stage)
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def start_deadline(budget_seconds: float) -> Deadline:
+    """Start the deadline of the current request context."""
+    deadline = Deadline(budget_seconds)
+    _deadline.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def check_deadline(stage: str) -> None:
+    """Raise RequestCancelled if the current request was abandoned; a no-op outside requests."""
+    deadline = _deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def detached(fn: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a sync function to run without the current request's deadline, for work that outlives the request."""
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        context = contextvars.copy_context()
+        context.run(_deadline.set, None)
+        return context.run(fn, *args, **kwargs)
+
+    return run
+
+
+def cancellation_cause(exc: BaseException) -> Optional[RequestCancelled]:
+    """The RequestCancelled behind `exc`, looking through wrappers such as haystack's PipelineRuntimeError."""
+    while exc is not None:
+        if isinstance(exc, RequestCancelled):
+            return exc
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+async def _wait_for_disconnect(request, poll_seconds: float) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(poll_seconds)
+
+
+async def guard(awaitable: Awaitable[T], request, stage: str, poll_seconds: float = 0.1) -> T:
+    """
+    Await `awaitable` unless the client disconnects or the current deadline passes first. Either way
+    the awaitable is cancelled, the deadline is marked so that threads skip their remaining stages,
+    and RequestCancelled (or DeadlineExceeded) is raised.
+    """
+    deadline = _deadline.get()
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.create_task(_wait_for_disconnect(request, poll_seconds))
+    try:
+        done, _ = await asyncio.wait(
+            {task, watcher},
+            timeout=deadline.remaining() if deadline is not None else None,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    finally:
+        watcher.cancel()
+
+    if task in done:
+        return task.result()
+    task.cancel()
+    if watcher in done:
+        if deadline is not None:
+            deadline.cancel()
+        raise RequestCancelled(stage)
+    raise DeadlineExceeded(stage)
@@ -0,0 +1,116 @@
+"""
+Embedding model configuration and compact vector math.
+
+text-embedding-3 models are trained so that a prefix of an embedding, re-normalized, is itself a
+good embedding (the API's `dimensions` parameter does exactly that). Collections record the
+dimensionality they were built with in their metadata, and embedders are created to match the
+collection, so a collection migrated to fewer dimensions is picked up without a restart.
+"""
+from typing import Optional
+
+import numpy as np
+
+from backend.rag_config import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, EMBEDDING_NATIVE_DIMENSIONS
+
+# Collection metadata keys
+DIMENSIONS_KEY = "embedding_dimensions"
+MODEL_KEY = "embedding_model"
+
+
+def collection_metadata(dimensions: Optional[int] = EMBEDDING_DIMENSIONS, model: str = EMBEDDING_MODEL) -> dict:
+    return {MODEL_KEY: model, DIMENSIONS_KEY: dimensions or EMBEDDING_NATIVE_DIMENSIONS}
+
+
+def collection_dimensions(collection) -> Optional[int]:
+    """
+    Dimensionality of the vectors stored in a collection: recorded in its metadata, else measured
+    on a stored vector (collections created before dimensions were configurable), else the
+    configured EMBEDDING_DIMENSIONS for a collection that is still empty.
+    """
+    metadata = collection.metadata or {}
+    if metadata.get(DIMENSIONS_KEY):
+        return int(metadata[DIMENSIONS_KEY])
+    sample = collection.peek(limit=1)
+    embeddings = sample.get("embeddings")
+    if embeddings is not None and len(embeddings):
+        return len(embeddings[0])
+    return EMBEDDING_DIMENSIONS
+
+
+def create_text_embedder(dimensions: Optional[int] = EMBEDDING_DIMENSIONS):
+    from haystack.components.embedders import OpenAITextEmbedder
+
+    from backend.llm_scheduler import scheduled
+
+    if dimensions == EMBEDDING_NATIVE_DIMENSIONS:
+        dimensions = None
+    return scheduled(OpenAITextEmbedder(model=EMBEDDING_MODEL, dimensions=dimensions, max_retries=0))
+
+
+def create_document_embedder(dimensions: Optional[int] = EMBEDDING_DIMENSIONS, batch_size: int = 32):
+    """Embedder for many texts at once: one API request per `batch_size` documents."""
+    from haystack.components.embedders import OpenAIDocumentEmbedder
+
+    from backend.llm_scheduler import scheduled
+
+    if dimensions == EMBEDDING_NATIVE_DIMENSIONS:
+        dimensions = None
+    return scheduled(
+        OpenAIDocumentEmbedder(
+            model=EMBEDDING_MODEL, dimensions=dimensions, batch_size=batch_size, progress_bar=False, max_retries=0
+        )
+    )
+
+
+def truncate_embeddings(embeddings, dimensions: int) -> np.ndarray:
+    """Shorten text-embedding-3 vectors to their first `dimensions` components and re-normalize."""
+    matrix = np.asarray(embeddings, dtype=np.float32)[:, :dimensions]
+    return normalize_rows(matrix)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class QuantizedMatrix:
+    """
+    Unit-normalized embeddings held as float32, float16 (half the memory) or int8 with a per-row
+    scale (a quarter), for in-memory similarity math. Cosine similarity is a plain dot product.
+    """
+
+    DTYPES = ("float32", "float16", "int8")
+
+    def __init__(self, embeddings, dtype: str = "float32"):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unknown embedding storage dtype '{dtype}'. Available: {list(self.DTYPES)}")
+        self.dtype = dtype
+        unit = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if dtype == "int8":
+            self.scales = np.abs(unit).max(axis=1, keepdims=True) / 127
+            self.scales[self.scales == 0] = 1.0
+            self.values = np.round(unit / self.scales).astype(np.int8)
+        else:
+            self.scales = None
+            self.values = unit.astype(dtype)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def similarity_matrix(self) -> np.ndarray:
+        """Pairwise cosine similarities (float32, n x n)."""
+        if self.dtype == "int8":
+            products = self.values.astype(np.int32) @ self.values.astype(np.int32).T
+            return products.astype(np.float32) * (self.scales * self.scales.T)
+        values = self.values.astype(np.float32)
+        return values @ values.T
+
+    def scores(self, queries) -> np.ndarray:
+        """Cosine similarities of unit-norm float32 queries (q x d) against every stored row (q x n)."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        products = queries @ self.values.astype(np.float32).T
+        return products * self.scales.T if self.scales is not None else products
@@ -0,0 +1,42 @@
+"""
+Streaming NDJSON export of conversation history.
+"""
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+# Lines are buffered up to this size before being (optionally) compressed and sent
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def to_stored_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Message timestamps are stored as naive UTC; convert an aware filter bound to match."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def ndjson_chunks(records: Iterable[dict], compress: bool = False, chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Encode records as newline-delimited JSON in bounded chunks, gzip-compressed on the fly if requested."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    buffer, size = [], 0
+
+    def encode(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor is not None else data
+
+    for record in records:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            data = encode(b"".join(buffer))
+            buffer, size = [], 0
+            if data:
+                yield data
+
+    tail = encode(b"".join(buffer)) if buffer else b""
+    if compressor is not None:
+        tail += compressor.flush()
+    if tail:
+        yield tail
@@ -0,0 +1,102 @@
+"""
+Local keyphrase extraction (RAKE: Rapid Automatic Keyword Extraction) for conversation titles.
+
+Candidate phrases are the runs of words between stopwords and punctuation. Each word is scored
+by degree / frequency (words that occur in longer phrases score higher) and a phrase by the sum
+of its words. Titles come from what the user said; words the answer repeats count double.
+No model and no network: a title costs microseconds.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also am an and any are as at be because been before being
+    below between both but by can could did do does doing don't down during each few for from further
+    get got had has have having he her here hers herself him himself his how i i'd i'll i'm i've if in
+    into is it it's its itself just know let let's like me maybe more most my myself need no nor not now
+    of off ok okay on once only or other our ours ourselves out over own please really same say she
+    should so some such tell than thank thanks that that's the their theirs them themselves then there
+    these they this those through to too under until up very want was we were what what's when where
+    which while who whom why will with would yeah yes you you're your yours yourself yourselves
+    hey hi hello start started starting going trying try tried think thought find make
+    today tonight tomorrow yesterday now ago last next week weekend day morning evening night
+    """.split()
+)
+
+# Longer candidates read as sentences rather than titles
+MAX_PHRASE_WORDS = 4
+
+_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9'’\-]*|[^\sA-Za-z0-9]")
+_SMALL_WORDS = frozenset({"a", "an", "and", "as", "at", "by", "for", "in", "of", "on", "or", "the", "to", "vs"})
+
+
+def candidate_phrases(text: str) -> List[List[str]]:
+    phrases, current = [], []
+    for token in _TOKEN.findall(text):
+        word = token.lower().replace("’", "'")
+        if not word[0].isalnum() or word in STOPWORDS:
+            if current:
+                phrases.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        phrases.append(current)
+    return [phrase for phrase in phrases if len(phrase) <= MAX_PHRASE_WORDS]
+
+
+def rank_phrases(text: str, context: str = "") -> List[Tuple[str, float]]:
+    """Candidate phrases of `text`, best first; words that also occur in `context` count double."""
+    phrases = candidate_phrases(text)
+    context_words = {token.lower() for phrase in candidate_phrases(context) for token in phrase}
+    frequency: Dict[str, int] = defaultdict(int)
+    degree: Dict[str, int] = defaultdict(int)
+    for phrase in phrases:
+        for token in phrase:
+            frequency[token.lower()] += 1
+            degree[token.lower()] += len(phrase)
+
+    scores: Dict[str, float] = {}
+    surface: Dict[str, List[str]] = {}
+    for phrase in phrases:
+        key = " ".join(token.lower() for token in phrase)
+        scores[key] = sum(
+            degree[word] / frequency[word] * (2 if word in context_words else 1) for word in key.split()
+        )
+        surface.setdefault(key, phrase)
+    # Stable sort: ties go to the phrase mentioned first
+    ranked = sorted(scores, key=lambda key: -scores[key])
+    return [(" ".join(surface[key]), scores[key]) for key in ranked]
+
+
+def _title_case(phrase: str) -> str:
+    words = phrase.split()
+    return " ".join(
+        word if any(c.isupper() for c in word) or (i and word.lower() in _SMALL_WORDS) else word.capitalize()
+        for i, word in enumerate(words)
+    )
+
+
+def _shorten(text: str, max_length: int) -> str:
+    if len(text) <= max_length:
+        return text
+    cut = text[:max_length]
+    return cut.rsplit(" ", 1)[0] if " " in cut else cut
+
+
+def keyphrase_title(user_message: str, ai_response: str = "", max_length: int = 30) -> str:
+    """
+    A short title for an exchange: the best keyphrase of the user's message, followed by the
+    runner-up when the best is a single word and both fit. Empty when the message has no content word.
+    """
+    ranked = rank_phrases(user_message, ai_response or "")
+    if not ranked:
+        return ""
+    title = _title_case(ranked[0][0])
+    if len(ranked) > 1 and " " not in title:
+        combined = f"{title} {_title_case(ranked[1][0])}"
+        if len(combined) <= max_length:
+            title = combined
+    return _shorten(title, max_length)
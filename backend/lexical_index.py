@@ -0,0 +1,292 @@
+"""
+In-memory BM25 inverted index over the personal memory collection.
+
+Personal facts are short and dense with names and dates, which exact term
+matching handles better than dense embeddings. The index mirrors the Chroma
+collection, is updated incrementally on every write, catches up with only the
+documents other worker processes added or deleted, and is rebuilt from Chroma
+(documents and metadata only, no embeddings) at startup and whenever the
+collection was replaced.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from backend.rag_config import (
+    BM25_B,
+    BM25_K1,
+    CHROMA_COLLECTION_NAME,
+    LEXICAL_CONFIDENCE_COVERAGE,
+    LEXICAL_CONFIDENCE_MARGIN,
+    LEXICAL_MIN_QUERY_TERMS,
+)
+
+if TYPE_CHECKING:
+    from haystack import Document
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by did do does for from had has have how i i'm if in
+    is it its me my of on or our so that the their them then there these they this
+    to was we were what when where which who whom why will with you your
+    """.split()
+)
+
+# Documents fetched from Chroma per request while catching up
+_SYNC_BATCH_SIZE = 1000
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def _stem(token: str) -> str:
+    """Very light suffix stripping so that 'parked' matches 'park' and 'years' matches 'year'."""
+    if len(token) > 4 and not token.isdigit():
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+                return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and stem (numbers are kept)."""
+    return [_stem(token) for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+@dataclass
+class LexicalHit:
+    id: str
+    content: str
+    meta: dict
+    score: float
+    coverage: float
+
+    def to_document(self) -> "Document":
+        from haystack import Document
+
+        return Document(id=self.id, content=self.content, meta=dict(self.meta), score=self.score)
+
+
+@dataclass
+class _IndexedDocument:
+    content: str
+    meta: dict
+    term_freqs: Counter = field(default_factory=Counter)
+    length: int = 0
+
+
+class BM25Index:
+    """Incrementally updated Okapi BM25 index. Safe to share between threads."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._documents: Dict[str, _IndexedDocument] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, content: str, meta: Optional[dict] = None) -> None:
+        """Add or replace a single document."""
+        terms = tokenize(content or "")
+        indexed = _IndexedDocument(content=content, meta=meta or {}, term_freqs=Counter(terms), length=len(terms))
+
+        with self._lock:
+            if doc_id in self._documents:
+                self._remove_locked(doc_id)
+            self._documents[doc_id] = indexed
+            self._total_length += indexed.length
+            for term, freq in indexed.term_freqs.items():
+                self._postings.setdefault(term, {})[doc_id] = freq
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str) -> None:
+        indexed = self._documents.pop(doc_id, None)
+        if indexed is None:
+            return
+        self._total_length -= indexed.length
+        for term in indexed.term_freqs:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def rebuild(self, ids: Iterable[str], documents: Iterable[str], metadatas: Iterable[Optional[dict]]) -> None:
+        """Replace the whole index content."""
+        fresh = BM25Index(self.k1, self.b)
+        for doc_id, content, meta in zip(ids, documents, metadatas):
+            fresh.add(doc_id, content, meta)
+
+        with self._lock:
+            self._documents = fresh._documents
+            self._postings = fresh._postings
+            self._total_length = fresh._total_length
+
+    def rebuild_from_collection(self, collection) -> None:
+        """Rebuild from a Chroma collection (no embeddings are fetched)."""
+        results = collection.get(include=["documents", "metadatas"])
+        self.rebuild(results["ids"], results["documents"], results["metadatas"] or [None] * len(results["ids"]))
+
+    def sync_from_collection(self, collection) -> None:
+        """
+        Catch up with documents other processes added to or deleted from the collection: IDs are
+        listed first, then only the missing documents are fetched and tokenized.
+        """
+        stored = collection.get(include=[])["ids"]
+        stored_ids = set(stored)
+        with self._lock:
+            for doc_id in [doc_id for doc_id in self._documents if doc_id not in stored_ids]:
+                self._remove_locked(doc_id)
+            missing = [doc_id for doc_id in stored if doc_id not in self._documents]
+        for start in range(0, len(missing), _SYNC_BATCH_SIZE):
+            batch = collection.get(ids=missing[start : start + _SYNC_BATCH_SIZE], include=["documents", "metadatas"])
+            for doc_id, content, meta in zip(batch["ids"], batch["documents"], batch["metadatas"] or [None] * len(batch["ids"])):
+                self.add(doc_id, content, meta)
+
+    def _idf(self, term: str) -> float:
+        doc_freq = len(self._postings.get(term, ()))
+        total = len(self._documents)
+        return math.log(1 + (total - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def search(self, query: str, top_k: int = 5) -> List[LexicalHit]:
+        """Return the top_k documents by BM25 score together with their query-term coverage."""
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            if not self._documents:
+                return []
+
+            avg_length = self._total_length / len(self._documents) or 1.0
+            idfs = {term: self._idf(term) for term in query_terms}
+            total_idf = sum(idfs.values()) or 1.0
+            scores: Dict[str, float] = {}
+            matched_idf: Dict[str, float] = {}
+
+            for term in query_terms:
+                for doc_id, freq in self._postings.get(term, {}).items():
+                    length = self._documents[doc_id].length
+                    norm = freq + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idfs[term] * freq * (self.k1 + 1) / norm
+                    matched_idf[doc_id] = matched_idf.get(doc_id, 0.0) + idfs[term]
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            return [
+                LexicalHit(
+                    id=doc_id,
+                    content=self._documents[doc_id].content,
+                    meta=self._documents[doc_id].meta,
+                    score=score,
+                    coverage=matched_idf[doc_id] / total_idf,
+                )
+                for doc_id, score in ranked
+            ]
+
+    @staticmethod
+    def is_confident(query: str, hits: List[LexicalHit]) -> bool:
+        """
+        Whether the lexical hits are good enough to answer without a dense lookup:
+        the best hit covers almost all informative query terms and clearly beats the runner-up.
+        """
+        if not hits or len(set(tokenize(query))) < LEXICAL_MIN_QUERY_TERMS:
+            return False
+        if hits[0].coverage < LEXICAL_CONFIDENCE_COVERAGE:
+            return False
+        return len(hits) == 1 or hits[0].score >= LEXICAL_CONFIDENCE_MARGIN * hits[1].score
+
+
+def reciprocal_rank_fusion(rankings: List[List["Document"]], k: int, top_k: int) -> List["Document"]:
+    """Fuse several ranked document lists by reciprocal rank; the fused score replaces Document.score."""
+    fused_scores: Dict[str, float] = {}
+    documents: Dict[str, "Document"] = {}
+
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            fused_scores[document.id] = fused_scores.get(document.id, 0.0) + 1.0 / (k + rank + 1)
+            documents.setdefault(document.id, document)
+
+    ranked_ids = sorted(fused_scores, key=fused_scores.get, reverse=True)[:top_k]
+    fused = []
+    for doc_id in ranked_ids:
+        document = documents[doc_id]
+        document.score = fused_scores[doc_id]
+        fused.append(document)
+    return fused
+
+
+_indexes: Dict[str, BM25Index] = {}
+# Shared-marker versions each index was last synced with (see backend.workers)
+_index_versions: Dict[str, tuple] = {}
+_indexes_lock = threading.Lock()
+
+
+def _store_version(collection_name: str) -> tuple:
+    from backend.workers import collection_replaced_marker, documents_added_marker
+
+    return collection_replaced_marker(collection_name).version(), documents_added_marker(collection_name).version()
+
+
+def get_lexical_index(collection_name: str = CHROMA_COLLECTION_NAME) -> BM25Index:
+    """
+    Return the process-wide index for a collection, building it from Chroma on first use. When
+    another process added (or deleted) documents only those are fetched; a replaced collection
+    (summarization, embedding migration, compaction) is rebuilt in place.
+    """
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        version = _store_version(collection_name)
+        previous = _index_versions.get(collection_name)
+        if index is None or previous != version:
+            from backend.vector_store import get_or_create_collection
+
+            collection = get_or_create_collection(collection_name)
+            if index is None or previous is None or previous[0] != version[0]:
+                index = index or BM25Index()
+                index.rebuild_from_collection(collection)
+                print(f"BM25 index for '{collection_name}' built with {len(index)} documents")
+            else:
+                index.sync_from_collection(collection)
+            _indexes[collection_name] = index
+            _index_versions[collection_name] = version
+        return index
+
+
+def add_to_lexical_index(
+    collection_name: str, doc_id: str, content: str, meta: Optional[dict] = None, replaces: Optional[str] = None
+) -> None:
+    """
+    Index a document this process just wrote to Chroma (in place of the deleted document `replaces`,
+    if given) and signal the other workers.
+    """
+    from backend.workers import documents_added_marker
+
+    index = get_lexical_index(collection_name)
+    with _indexes_lock:
+        if replaces is not None:
+            index.remove(replaces)
+        index.add(doc_id, content, meta)
+        in_sync = _index_versions.get(collection_name) == _store_version(collection_name)
+        documents_added_marker(collection_name).bump()
+        # Our own write does not require a sync; if we were already behind another worker, the
+        # recorded version stays behind too, so the next lookup catches up
+        if in_sync:
+            _index_versions[collection_name] = _store_version(collection_name)
+
+
+def drop_lexical_index(collection_name: str) -> None:
+    """Free an index (e.g. of a user evicted from the active set); it is rebuilt on next use."""
+    with _indexes_lock:
+        _indexes.pop(collection_name, None)
+        _index_versions.pop(collection_name, None)
@@ -0,0 +1,327 @@
+"""
+One scheduler for every outbound OpenAI call in the process.
+
+Components keep their haystack interface; `scheduled(component)` swaps the component's OpenAI
+client for a proxy whose `chat.completions.create` and `embeddings.create` go through
+LLMScheduler.call. The components are built with max_retries=0 so that retrying happens here:
+
+- token buckets keep requests and tokens per minute under the account limits
+- concurrency adapts (AIMD): it grows slowly while calls succeed and halves on a 429
+- retryable errors (429, 5xx, timeouts, connection errors) are retried with jittered exponential
+  backoff, or after the server's Retry-After, which also pauses every other caller
+- waiting calls are admitted strictly by priority: an interactive call is always admitted before
+  any queued background call (summarization, titles), and background calls never hold more than
+  LLM_BACKGROUND_SHARE of the concurrency slots, so some stay free for interactive traffic
+
+The priority comes from a context variable (interactive by default), because the same components
+serve both requests and background work. Calls made for a request also respect its deadline.
+"""
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, TypeVar
+
+from backend.config.serving_config import PERCEPTO_WORKERS
+from backend.deadline import DeadlineExceeded, check_deadline, current_deadline
+from backend.rag_config import (
+    LLM_BACKGROUND_SHARE,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_COMPLETION_TOKENS_ESTIMATE,
+    LLM_INITIAL_CONCURRENCY,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+)
+from backend.telemetry import LLM_CONCURRENCY_LIMIT, LLM_QUEUE_WAIT, LLM_RETRIES
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# A burst of 429s from calls that were in flight together halves the limit only once
+_DECREASE_COOLDOWN_SECONDS = 1.0
+_MAX_RETRY_AFTER_SECONDS = 60.0
+
+T = TypeVar("T")
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run the block's OpenAI calls (including those in threads started from it) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """`per_minute` units refilled continuously, with a burst of at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        self._refill()
+        # A single call larger than the bucket goes through once the bucket is full
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    return getattr(exc, "status_code", None)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    import openai
+
+    if isinstance(exc, openai.APIConnectionError):
+        # Includes APITimeoutError
+        return True
+    if getattr(exc, "code", None) == "insufficient_quota":
+        # A 429 that waiting does not fix
+        return False
+    status = _status_code(exc)
+    return status is not None and (status in (408, 409, 429) or status >= 500)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Delay requested by the server (retry-after-ms or Retry-After, in seconds or as an HTTP date)."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return min(float(headers["retry-after-ms"]) / 1000, _MAX_RETRY_AFTER_SECONDS)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        return min(max(0.0, seconds), _MAX_RETRY_AFTER_SECONDS)
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Rough token cost of a chat or embeddings request (4 characters per token), for the token bucket."""
+    if "messages" in kwargs:
+        characters = sum(len(str(message.get("content") or "")) for message in kwargs["messages"])
+        completion = kwargs.get("max_completion_tokens") or kwargs.get("max_tokens") or LLM_COMPLETION_TOKENS_ESTIMATE
+        return characters // 4 + completion
+    inputs = kwargs.get("input") or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    return sum(len(str(text)) for text in inputs) // 4
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        initial_concurrency: int = LLM_INITIAL_CONCURRENCY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        background_share: float = LLM_BACKGROUND_SHARE,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(initial_concurrency, max_concurrency))
+        self.background_share = background_share
+        self.max_retries = max_retries
+
+        self.in_flight = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    def _admission_delay(self, ticket, tokens: int) -> Optional[float]:
+        """0 to admit `ticket` now, a number of seconds to wait for rate limits, None to wait for a release."""
+        if self._waiting[0] != ticket:
+            return None
+        slots = int(self.limit)
+        if sum(self.in_flight.values()) >= slots:
+            return None
+        priority = ticket[0]
+        if priority == BACKGROUND and self.in_flight[BACKGROUND] >= max(1, int(slots * self.background_share)):
+            return None
+        delays = [self.paused_until - time.monotonic()]
+        if self.request_bucket is not None:
+            delays.append(self.request_bucket.wait_time(1))
+        if self.token_bucket is not None:
+            delays.append(self.token_bucket.wait_time(tokens))
+        return max(0.0, *delays)
+
+    def _acquire(self, priority: int, tokens: int) -> None:
+        start = time.monotonic()
+        deadline = current_deadline()
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    delay = self._admission_delay(ticket, tokens)
+                    if delay == 0:
+                        break
+                    timeout = 1.0 if delay is None else delay
+                    if deadline is not None:
+                        # Wake up to give up on an expired request instead of waiting for a slot
+                        timeout = min(timeout, deadline.remaining() + 0.001)
+                    self._condition.wait(timeout)
+                    check_deadline("llm_queue")
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+            self.in_flight[priority] += 1
+            if self.request_bucket is not None:
+                self.request_bucket.take(1)
+            if self.token_bucket is not None:
+                self.token_bucket.take(tokens)
+        LLM_QUEUE_WAIT.labels(priority=PRIORITY_NAMES[priority]).observe(time.monotonic() - start)
+
+    def _release(self, priority: int, succeeded: bool, token_correction: int = 0) -> None:
+        with self._condition:
+            self.in_flight[priority] -= 1
+            if succeeded:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            if token_correction and self.token_bucket is not None:
+                self.token_bucket.take(token_correction)
+            LLM_CONCURRENCY_LIMIT.set(self.limit)
+            self._condition.notify_all()
+
+    def _overloaded(self, retry_after: Optional[float]) -> None:
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease >= _DECREASE_COOLDOWN_SECONDS:
+                self.limit = max(1.0, self.limit / 2)
+                self._last_decrease = now
+                LLM_CONCURRENCY_LIMIT.set(self.limit)
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def call(self, fn: Callable[[], T], tokens: int = 0, priority: Optional[int] = None) -> T:
+        """Run one OpenAI request `fn` (estimated to cost `tokens`) under the limits, retrying transient errors."""
+        if priority is None:
+            priority = _priority.get()
+        attempt = 0
+        while True:
+            check_deadline("llm_queue")
+            self._acquire(priority, tokens)
+            try:
+                result = fn()
+            except Exception as exc:
+                self._release(priority, succeeded=False)
+                if not _is_retryable(exc) or attempt >= self.max_retries:
+                    raise
+                retry_after = _retry_after(exc)
+                if _status_code(exc) == 429:
+                    self._overloaded(retry_after)
+                if retry_after is not None:
+                    delay = retry_after
+                else:
+                    delay = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+                deadline = current_deadline()
+                if deadline is not None and deadline.remaining() < delay:
+                    raise DeadlineExceeded("llm_retry") from exc
+                LLM_RETRIES.labels(reason=str(_status_code(exc) or type(exc).__name__)).inc()
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            usage = getattr(result, "usage", None)
+            actual = getattr(usage, "total_tokens", None)
+            self._release(priority, succeeded=True, token_correction=actual - tokens if actual else 0)
+            return result
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """The process-wide scheduler; each worker process (never one inherited across fork) gets its share of the limits."""
+    global _scheduler, _scheduler_pid
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler_pid != os.getpid():
+            _scheduler_pid = os.getpid()
+            workers = max(1, PERCEPTO_WORKERS)
+            _scheduler = LLMScheduler(
+                requests_per_minute=LLM_REQUESTS_PER_MINUTE / workers,
+                tokens_per_minute=LLM_TOKENS_PER_MINUTE / workers,
+            )
+        return _scheduler
+
+
+class _ScheduledCreate:
+    """Proxy for an OpenAI resource (chat.completions, embeddings) whose create() is scheduled."""
+
+    def __init__(self, resource):
+        self._resource = resource
+
+    def create(self, **kwargs):
+        return get_llm_scheduler().call(lambda: self._resource.create(**kwargs), tokens=estimate_tokens(kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._resource, name)
+
+
+class _ScheduledChat:
+    def __init__(self, chat):
+        self._chat = chat
+        self.completions = _ScheduledCreate(chat.completions)
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+class ScheduledOpenAIClient:
+    """An openai.OpenAI client whose chat completions and embeddings go through the scheduler."""
+
+    def __init__(self, client):
+        self._client = client
+        self.chat = _ScheduledChat(client.chat)
+        self.embeddings = _ScheduledCreate(client.embeddings)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def scheduled(component):
+    """Route a haystack OpenAI component's calls through the scheduler (build it with max_retries=0)."""
+    if not isinstance(component.client, ScheduledOpenAIClient):
+        component.client = ScheduledOpenAIClient(component.client)
+    return component
@@ -0,0 +1,52 @@
+"""
+Write-time deduplication of remembered statements.
+
+Users repeat themselves ("remind me I parked on level 3"), and every repeat stored as a memory of
+its own fills the retrieved context with copies and grows summarization's clustering work.
+Before save_conversation stores a statement, its embedding is compared with the nearest stored
+statement; at MEMORY_DEDUP_SIMILARITY or above, the new statement replaces that one instead of
+being added next to it. The newer wording and date win, as a repeat is often a correction
+("level 3" after "level 2"), and the metadata keeps when it was first said and how many times.
+
+A replaced memory gets a new ID rather than being updated in place: other workers' vector
+indexes catch up by ID, so they drop the old entry and fetch the new one.
+
+backend.compact_memory applies the same merge to memories stored before deduplication.
+"""
+from typing import Optional, Tuple
+
+from backend.rag_config import MEMORY_DEDUP_SIMILARITY
+from backend.telemetry import stage
+
+# Only statements saved from conversations are merged; facts and summaries are left alone
+DEDUPLICATED_TYPE = "conversation"
+
+
+def similarity_from_distance(distance: float) -> float:
+    """Cosine similarity of two unit vectors from Chroma's default metric, their squared L2 distance."""
+    return 1 - distance / 2
+
+
+def nearest_duplicate(collection, embedding, threshold: float = MEMORY_DEDUP_SIMILARITY) -> Optional[Tuple[str, dict]]:
+    """ID and metadata of the stored statement that `embedding` repeats, or None."""
+    with stage("dedup_lookup"):
+        result = collection.query(
+            query_embeddings=[embedding],
+            n_results=1,
+            where={"type": DEDUPLICATED_TYPE},
+            include=["metadatas", "distances"],
+        )
+    if not result["ids"] or not result["ids"][0]:
+        return None
+    if similarity_from_distance(result["distances"][0][0]) < threshold:
+        return None
+    return result["ids"][0][0], result["metadatas"][0][0] or {}
+
+
+def merged_metadata(previous: dict, metadata: dict) -> dict:
+    """Metadata of a statement replacing `previous`, an earlier repeat of it."""
+    return {
+        **metadata,
+        "first_timestamp": previous.get("first_timestamp", previous.get("timestamp", metadata["timestamp"])),
+        "repeat_count": int(previous.get("repeat_count", 1)) + int(metadata.get("repeat_count", 1)),
+    }
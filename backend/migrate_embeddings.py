@@ -0,0 +1,170 @@
+"""
+Online migration of a Chroma collection to a different embedding dimensionality.
+
+    python -m backend.migrate_embeddings --dimensions 1024 --mode truncate
+    python -m backend.migrate_embeddings --dimensions 1024 --mode reembed --batch-size 64
+    python -m backend.migrate_embeddings --dimensions 1024 --user alice
+
+The collection (the default user's, or --user's) is copied in batches into `<name>.migration` while the service keeps serving
+from the original. `truncate` shortens the stored text-embedding-3 vectors and re-normalizes
+them (no API calls); `reembed` embeds every document again with the `dimensions` parameter.
+Documents written or deleted during the copy are picked up by catch-up passes, then the collections are
+swapped by renaming. The original is kept as `<name>.pre_migration_<timestamp>` unless
+--drop-backup is given. Workers notice the swap and rebuild their pipelines, and their query
+embedders follow the new collection's dimensions, so no restart is needed.
+
+Summarization, which also replaces the collection, is held off for the whole migration.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import time
+from datetime import datetime
+from typing import List, Set
+
+from backend.embeddings import (
+    DIMENSIONS_KEY,
+    collection_dimensions,
+    collection_metadata,
+    create_document_embedder,
+    truncate_embeddings,
+)
+from backend.rag_config import CHROMA_COLLECTION_NAME, EMBEDDING_NATIVE_DIMENSIONS
+from backend.vector_store import get_chroma_client
+from backend.tenancy import collection_name_for, validate_user_id
+from backend.workers import collection_replaced_marker, summarization_lock
+
+MAX_CATCH_UP_PASSES = 5
+
+
+class EmbeddingMigration:
+    def __init__(self, collection_name: str, dimensions: int, mode: str, batch_size: int):
+        self.client = get_chroma_client()
+        self.collection_name = collection_name
+        self.dimensions = dimensions
+        self.mode = mode
+        self.batch_size = batch_size
+        self.copied: Set[str] = set()
+        self._embedder = None
+
+    def _embed(self, documents: List[str], embeddings) -> List[List[float]]:
+        if self.mode == "truncate":
+            return truncate_embeddings(embeddings, self.dimensions).tolist()
+
+        if self._embedder is None:
+            self._embedder = create_document_embedder(self.dimensions, batch_size=self.batch_size)
+        from haystack import Document
+
+        result = self._embedder.run(documents=[Document(content=text) for text in documents])
+        return [document.embedding for document in result["documents"]]
+
+    def copy_missing(self, source, target, drop_deleted: bool = True) -> int:
+        """
+        Copy the documents of `source` that are not yet in `target` and, with `drop_deleted`, delete
+        from `target` the copied documents `source` no longer has (repeats replaced by memory
+        deduplication). Returns how many documents were copied or deleted.
+        """
+        stored = source.get(include=[])["ids"]
+        deleted = []
+        if drop_deleted:
+            stored_ids = set(stored)
+            deleted = [doc_id for doc_id in self.copied if doc_id not in stored_ids]
+            if deleted:
+                target.delete(ids=deleted)
+                self.copied.difference_update(deleted)
+                print(f"  removed {len(deleted)} documents deleted since they were copied")
+        missing = [doc_id for doc_id in stored if doc_id not in self.copied]
+        include = ["documents", "metadatas"] + (["embeddings"] if self.mode == "truncate" else [])
+        for start in range(0, len(missing), self.batch_size):
+            batch = source.get(ids=missing[start:start + self.batch_size], include=include)
+            if not batch["ids"]:
+                continue
+            target.add(
+                ids=batch["ids"],
+                embeddings=self._embed(batch["documents"], batch.get("embeddings")),
+                documents=batch["documents"],
+                metadatas=batch["metadatas"],
+            )
+            self.copied.update(batch["ids"])
+            print(f"  copied {len(self.copied)} documents")
+        return len(missing) + len(deleted)
+
+    def run(self, drop_backup: bool = False) -> None:
+        source = self.client.get_collection(name=self.collection_name)
+        current = collection_dimensions(source)
+        if self.mode == "truncate" and current is not None and self.dimensions > current:
+            raise SystemExit(f"Cannot truncate {current}-dimension vectors to {self.dimensions}; use --mode reembed")
+
+        # '.' cannot occur in user IDs, so these names never collide with another user's collection
+        target_name = f"{self.collection_name}.migration"
+        try:
+            # Leftover of an interrupted run
+            self.client.delete_collection(name=target_name)
+        except Exception:
+            pass
+        target = self.client.create_collection(
+            name=target_name,
+            metadata={**(source.metadata or {}), **collection_metadata(self.dimensions)},
+        )
+
+        with summarization_lock(self.collection_name) as acquired:
+            if not acquired:
+                raise SystemExit("Summarization is running; retry the migration once it has finished")
+
+            start = time.perf_counter()
+            print(f"Migrating '{self.collection_name}' from {current} to {self.dimensions} dimensions ({self.mode})...")
+            self.copy_missing(source, target)
+            # Catch up with documents saved by the running service during the copy
+            for _ in range(MAX_CATCH_UP_PASSES):
+                if self.copy_missing(source, target) == 0:
+                    break
+
+            backup_name = f"{self.collection_name}.pre_migration_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            source.modify(name=backup_name)
+            # Writes and deletes that reached the original through an already-open handle just before the rename
+            self.copy_missing(source, target)
+            try:
+                target.modify(name=self.collection_name)
+            except Exception:
+                # A write in between the two renames created an empty collection under the name;
+                # it only adds to the original, so nothing it lacks is deleted
+                stray = self.client.get_collection(name=self.collection_name)
+                self.copy_missing(stray, target, drop_deleted=False)
+                self.client.delete_collection(name=self.collection_name)
+                target.modify(name=self.collection_name)
+            collection_replaced_marker(self.collection_name).bump()
+
+        print(
+            f"Migrated {len(self.copied)} documents in {time.perf_counter() - start:.1f}s; "
+            f"'{self.collection_name}' now stores {target.metadata[DIMENSIONS_KEY]}-dimension vectors"
+        )
+        if drop_backup:
+            self.client.delete_collection(name=backup_name)
+            print(f"Dropped '{backup_name}'")
+        else:
+            print(f"Original kept as '{backup_name}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", help=f"Collection to migrate (default: the --user's, i.e. '{CHROMA_COLLECTION_NAME}' for the default user)")
+    parser.add_argument("--user", help="Migrate this user's collection")
+    parser.add_argument("--dimensions", type=int, required=True)
+    parser.add_argument("--mode", choices=["truncate", "reembed"], default="truncate")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--drop-backup", action="store_true", help="Delete the original collection after the swap")
+    args = parser.parse_args()
+
+    if not 0 < args.dimensions <= EMBEDDING_NATIVE_DIMENSIONS:
+        parser.error(f"--dimensions must be between 1 and {EMBEDDING_NATIVE_DIMENSIONS}")
+    try:
+        collection_name = args.collection or collection_name_for(validate_user_id(args.user))
+    except ValueError as e:
+        parser.error(str(e))
+    EmbeddingMigration(collection_name, args.dimensions, args.mode, args.batch_size).run(args.drop_backup)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Offline place extraction and local time for DateTimeRetriever.
+
+Every name and alias of the gazetteer (backend/config/gazetteer.py) goes into one Aho-Corasick
+automaton, so a single pass over the query finds every known place it mentions, in any
+position and without relying on a preposition before it. Text is compared case- and
+accent-folded, with punctuation turned into spaces and each word padded by spaces, so only
+whole words match ("Rome" does not match in "chromebook"). The local time of a found place comes
+from its IANA time zone through zoneinfo, with no network call.
+"""
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from backend.config.gazetteer import CITIES, COUNTRIES
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    country: str
+    timezone: str
+
+
+# Apostrophes split words too, so that "Paris's" matches "Paris"
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents, replace punctuation with spaces; the result is padded with one space on each side."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return f" {' '.join(_NON_WORD.sub(' ', folded).split())} "
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher: finds every occurrence of every pattern in one pass over the text."""
+
+    def __init__(self, patterns: Dict[str, object]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state, the (pattern length, value) of every pattern ending there
+        self._outputs: List[List[Tuple[int, object]]] = [[]]
+        for pattern, value in patterns.items():
+            self._insert(pattern, value)
+        self._link()
+
+    def _insert(self, pattern: str, value) -> None:
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._outputs[state].append((len(pattern), value))
+
+    def _link(self) -> None:
+        """Breadth-first failure links; each state also inherits the outputs of its failure state."""
+        # Depth-one states fail to the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, object]]:
+        """(start, end, value) of every match, in order of end position."""
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._outputs[state]:
+                matches.append((position + 1 - length, position + 1, value))
+        return matches
+
+
+@lru_cache(maxsize=1)
+def _matcher() -> AhoCorasick:
+    places: Dict[str, Place] = {}
+    cities: Dict[str, Place] = {}
+    for name, country, timezone, aliases in CITIES:
+        cities[name] = Place(name, country, timezone)
+        for alias in [name, *aliases]:
+            places[normalize(alias)] = cities[name]
+    for country, city, aliases in COUNTRIES:
+        for alias in [country, *aliases]:
+            # A city named like its country (Singapore, Luxembourg) keeps its city entry
+            places.setdefault(normalize(alias), cities[city])
+    return AhoCorasick(places)
+
+
+def find_place(text: str) -> Optional[Place]:
+    """
+    The place a query asks about: of the known names it mentions, the first one, and of several
+    starting at the same word the longest ("New York City" over "New York"). None if there is none.
+    """
+    matches = _matcher().find_all(normalize(text))
+    if not matches:
+        return None
+    return min(matches, key=lambda match: (match[0], -(match[1] - match[0])))[2]
+
+
+def local_time(place: Place) -> Optional[datetime]:
+    """Current time at the place, or None if this system has no data for its time zone (e.g. no tzdata on Windows)."""
+    try:
+        return datetime.now(ZoneInfo(place.timezone))
+    except ZoneInfoNotFoundError:
+        return None
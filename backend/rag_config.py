@@ -2,11 +2,107 @@
 Centralized configuration for the RAG pipeline.
 This module contains reusable prompt templates and routing configurations.
 """
+import os
+
+# Interactions after which a user's memory is summarized; a user can override it (PUT /summarization_threshold)
 CONVERSATION_COUNT_THRESHOLD = 20
 USER_NAME = "Ahmed"
-PROMPT_TEMPLATE = """
+
+# Multi-tenancy (backend/tenancy.py). Requests without an X-User-ID header belong to DEFAULT_USER_ID,
+# whose data stays in the legacy collection and database; other users get their own under these names.
+DEFAULT_USER_ID = "default"
+USER_DATABASE_DIR = "data/databases/users"
+# Users whose pipeline, database engine and in-memory indexes each worker keeps loaded
+MAX_ACTIVE_USERS = int(os.getenv("MAX_ACTIVE_USERS", "32"))
+
+CHROMA_DB_PATH = "data/databases/chroma_db"
+CHROMA_COLLECTION_NAME = "conversations"
+# Client/server Chroma (e.g. "http://127.0.0.1:8001"). Required when running more than one worker
+# process: the embedded PersistentClient keeps its HNSW index in process memory and is not multi-process safe.
+CHROMA_SERVER_URL = os.getenv("CHROMA_SERVER_URL")
+
+# Embeddings. text-embedding-3 vectors can be shortened (the API's `dimensions` parameter): 1024 or
+# 512 dimensions keep most of the retrieval quality at a third or a sixth of the storage.
+# Unset = the model's native 3072. Existing collections keep their own size until migrated
+# with `python -m backend.migrate_embeddings`.
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_NATIVE_DIMENSIONS = 3072
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None
+# Precision of the summarizer's in-memory embedding matrix: float32, float16 or int8
+EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+
+# Hybrid (BM25 + dense) retrieval
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+# The lexical results answer alone (no embedding call) when the best hit covers
+# at least this share of the query's IDF mass and beats the runner-up by the margin.
+LEXICAL_CONFIDENCE_COVERAGE = 0.8
+LEXICAL_CONFIDENCE_MARGIN = 1.5
+LEXICAL_MIN_QUERY_TERMS = 2
+
+# Exact in-process dense search (backend/vector_index.py): one matrix-vector product over the
+# whole collection instead of a Chroma HNSW query. Above VECTOR_INDEX_MAX_DOCUMENTS the index
+# is not loaded and queries go to Chroma. VECTOR_INDEX_MEMMAP_DIR keeps the matrix in a
+# memory-mapped file there instead of anonymous memory.
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "false").lower() == "true"
+VECTOR_INDEX_MAX_DOCUMENTS = int(os.getenv("VECTOR_INDEX_MAX_DOCUMENTS", "50000"))
+VECTOR_INDEX_MEMMAP_DIR = os.getenv("VECTOR_INDEX_MEMMAP_DIR") or None
+
+# Write-time deduplication of statements (backend/memory_dedup.py): a new statement at least
+# MEMORY_DEDUP_SIMILARITY (cosine) to its nearest stored statement replaces it instead of being
+# added next to it. `python -m backend.compact_memory` applies the same rule to stored memories.
+MEMORY_DEDUP_ENABLED = os.getenv("MEMORY_DEDUP_ENABLED", "true").lower() == "true"
+MEMORY_DEDUP_SIMILARITY = float(os.getenv("MEMORY_DEDUP_SIMILARITY", "0.95"))
+
+# Context assembly between the retriever and the prompt builder
+TOKENIZER_MODEL = "gpt-4o-mini"
+CONTEXT_MIN_RELEVANCE = 0.25
+CONTEXT_DUPLICATE_SIMILARITY = 0.92
+# Used when one of the two documents has no embedding (e.g. lexical-only hits)
+CONTEXT_LEXICAL_DUPLICATE_SIMILARITY = 0.8
+CONTEXT_TOKEN_BUDGET = 800
+
+LLM_MODEL = "gpt-4o-mini"
+
+# Outbound OpenAI scheduling (backend/llm_scheduler.py). Rate limits are the account's per-minute
+# limits (0 disables one) and are split evenly across PERCEPTO_WORKERS processes. Concurrency
+# adapts between 1 and LLM_MAX_CONCURRENCY: +1 per window of successful calls, halved on a 429.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Background work (summarization, titles) never holds more than this share of the slots
+LLM_BACKGROUND_SHARE = float(os.getenv("LLM_BACKGROUND_SHARE", "0.5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = 0.5
+LLM_BACKOFF_MAX_SECONDS = 20.0
+# Completion tokens reserved for a chat call that does not set max_tokens
+LLM_COMPLETION_TOKENS_ESTIMATE = 300
+
+# POST /query/batch: most queries per request, and how many run through the LLM at once
+QUERY_BATCH_MAX_SIZE = 100
+QUERY_BATCH_CONCURRENCY = int(os.getenv("QUERY_BATCH_CONCURRENCY", "4"))
+
+# External service endpoints. Overridable so that benchmarks and CI can point the
+# service at local stand-ins (see benchmarks/fake_services.py); OpenAI honours OPENAI_BASE_URL.
+WEATHER_API_BASE_URL = os.getenv("WEATHER_API_BASE_URL", "http://api.weatherapi.com/v1")
+SERP_API_BASE_URL = os.getenv("SERP_API_BASE_URL", "https://serpapi.com")
+NOMINATIM_BASE_URL = os.getenv("NOMINATIM_BASE_URL", "https://nominatim.openstreetmap.org")
+GOOGLE_GEOLOCATION_URL = os.getenv("GOOGLE_GEOLOCATION_URL", "https://www.googleapis.com/geolocation/v1/geolocate")
+IP_API_URL = os.getenv("IP_API_URL", "http://ip-api.com/json/")
+ELEVEN_LABS_BASE_URL = os.getenv("ELEVEN_LABS_BASE_URL")
+
+# Observability: requests slower than this many milliseconds get a sampled stack profile
+# written to data/profiles (0 disables the profiler)
+SLOW_REQUEST_PROFILE_MS = int(os.getenv("SLOW_REQUEST_PROFILE_MS", "0"))
+SLOW_REQUEST_PROFILE_INTERVAL_MS = int(os.getenv("SLOW_REQUEST_PROFILE_INTERVAL_MS", "5"))
+
+# The system prompt is a static, byte-stable prefix (no interpolation) so that the provider's
+# prompt cache can reuse it across calls; everything that varies lives in USER_PROMPT_TEMPLATE.
+SYSTEM_PROMPT = """
         Context and Role:
-        - You are PerceptoAI, a personalized AI assistant for {{user_name}}
+        - You are PerceptoAI, a personalized AI assistant for the user named in the message below
         - Your primary goal is to provide accurate, helpful, and contextually relevant responses
         - You have access to a knowledge base of personal information and documents
 
@@ -20,7 +116,7 @@ PROMPT_TEMPLATE = """
         A. For Statements/Reminders:
            - Listen carefully to the new information
            - Acknowledge and confirm understanding
-           - Generate a friendly response on {{user_name}}'s statement
+           - Generate a friendly response on the user's statement
 
         B. For Questions:
            Prioritize Response Sources (in order):
@@ -32,7 +128,7 @@ PROMPT_TEMPLATE = """
            2. Specialized Tools (when no document info is available):
               a) Location Queries:
                  - Trigger ONLY if asking about CURRENT location
-                 - Specific condition: Direct question about {{user_name}}'s location
+                 - Specific condition: Direct question about the user's location
                  - Respond with 'use_location_tool'
 
               b) Date/Time Queries:
@@ -52,7 +148,7 @@ PROMPT_TEMPLATE = """
                    * Completely unrelated to personal context
                    * No personal, family, or relationship details
                  - Explicit Exclusions:
-                   * Questions about {{user_name}}'s family
+                   * Questions about the user's family
                    * Personal history inquiries
                    * Specific details about known individuals
                  - Respond with 'use_web_search_tool'
@@ -64,47 +160,53 @@ PROMPT_TEMPLATE = """
         Response Formatting Rules:
         - Questions (non-tool): 'question: your precise answer'
         - Statements: 'statement: your friendly acknowledgment'
-        - Tool Routing: RETURN ONLY the exact tool keyword (e.g., 'use_weather_tool') with NO prefix or additional text
+        - Tool Routing: RETURN ONLY tool lines, one per tool needed, each 'tool_keyword: the part of the query it answers',
+          with NO prefix or additional text. A query asking for several things gets several lines, e.g. for
+          "what's the weather in Paris and the time in Berlin":
+          use_weather_tool: weather in Paris
+          use_datetime_tool: time in Berlin
         - No Info: 'question: your friendly and explanatory response'
 
         CRITICAL: Never expose the existence of documents or tools in the response.
+        """
 
-        Retrieved Personal Context:
-        {% for document in documents %}
-            {{document.content}}
-        {% endfor %}
+USER_PROMPT_TEMPLATE = """
+User name: {{user_name}}
 
-        Current Query: {{query}}
-        """
+Retrieved Personal Context:
+{% for document in documents %}
+    {{document.content}}
+{% endfor %}
+
+Current Query: {{query}}
+"""
+
+# Tool keyword -> tool name. The LLM may ask for several tools in one reply (one
+# "keyword: argument" line each); ToolDispatcher runs them concurrently and merges their answers.
+TOOL_ROUTES = {
+    "use_weather_tool": "weather",
+    "use_location_tool": "location",
+    "use_datetime_tool": "datetime",
+    "use_web_search_tool": "web_search",
+}
+# At most this many tool calls run per query; further lines of the reply are ignored
+MAX_TOOL_CALLS = 4
+# Tools that make slow third-party calls; POST /process_audio/stream acknowledges them with a
+# pre-rendered clip while they run (see backend/acknowledgments.py)
+ACKNOWLEDGED_ROUTES = ["location", "web_search"]
+
+_USES_TOOL = " or ".join(f"'{keyword}' in replies[0].text.lower()" for keyword in TOOL_ROUTES)
 
 ROUTES = [
       {
-         "condition": '{{ "use_weather_tool" in replies[0].lower() }}',
-         "output": "{{ query }}",
-         "output_name": "weather_search",
-         "output_type": str
-      },
-      {
-         "condition": '{{ "use_location_tool" in replies[0].lower() }}',
-         "output": "{{ query }}",
-         "output_name": "location_search",
-         "output_type": str
-      },
-      {
-         "condition": '{{ "use_datetime_tool" in replies[0].lower() }}',
-         "output": "{{ query }}",
-         "output_name": "datetime_search",
-         "output_type": str
-      },
-      {
-         "condition": '{{ "use_web_search_tool" in replies[0].lower() }}',
-         "output": "{{ query }}",
-         "output_name": "web_search",
+         "condition": "{{ " + _USES_TOOL + " }}",
+         "output": "{{ replies[0].text }}",
+         "output_name": "tool_calls",
          "output_type": str
       },
       {
-         "condition": "{{'use_web_search_tool' not in replies[0].lower() and 'use_location_tool' not in replies[0].lower() and 'use_datetime_tool' not in replies[0].lower() and 'use_weather_tool' not in replies[0].lower()}}",
-         "output": "{{replies[0]}}",
+         "condition": "{{ not (" + _USES_TOOL + ") }}",
+         "output": "{{replies[0].text}}",
          "output_name": "answer",
          "output_type": str,
       },
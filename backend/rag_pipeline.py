@@ -1,94 +1,124 @@
 import os
-from haystack import Pipeline
-from haystack.components.embedders import OpenAITextEmbedder
-from haystack.components.builders import PromptBuilder
-from haystack.components.generators.openai import OpenAIGenerator
+from typing import List, Optional
+from haystack import Document, Pipeline
+from haystack.components.generators.chat import OpenAIChatGenerator
 from haystack_integrations.components.retrievers.chroma import ChromaEmbeddingRetriever
-from haystack_integrations.document_stores.chroma import ChromaDocumentStore
 from haystack.components.routers import ConditionalRouter
-from backend.custom_components import LocationRetriever, DateTimeRetriever, WeatherRetriever, SerpAPIWebSearch
-from backend.rag_config import PROMPT_TEMPLATE, ROUTES
-from dotenv import load_dotenv
-
-load_dotenv()
+from backend.custom_components import LocationRetriever, DateTimeRetriever, WeatherRetriever, SerpAPIWebSearch, HybridRetriever, ExactEmbeddingRetriever, RouteAnnouncer, ToolDispatcher, ContextAssembler, CachedChatPromptBuilder
+from backend.lexical_index import drop_lexical_index
+from backend.llm_scheduler import scheduled
+from backend.telemetry import instrument_haystack, record_llm_usage, stage
+from backend.embeddings import collection_dimensions, create_document_embedder, create_text_embedder
+from backend.vector_index import drop_vector_index
+from backend.vector_store import create_document_store, get_or_create_collection
+from backend.tenancy import LRUCache, collection_name_for, display_name_for
+from backend.workers import collection_replaced_marker
+from backend.rag_config import ROUTES, DEFAULT_USER_ID, LLM_MODEL, VECTOR_INDEX_ENABLED
 
 class RAGPipeline:
-    def __init__(self, user_name: str):
-        self.user_name = user_name
-        self.prompt_template = PROMPT_TEMPLATE
+    def __init__(self, user_id: str = DEFAULT_USER_ID):
+        instrument_haystack()
+        self.user_id = user_id
+        self.user_name = display_name_for(user_id)
+        # Each user's memory is a collection of its own
+        self.collection_name = collection_name_for(user_id)
         self.routes = ROUTES
 
-        self.document_store = ChromaDocumentStore(persist_path="data/databases/chroma_db", collection_name="conversations")
-        self.embedder = OpenAITextEmbedder(model="text-embedding-3-large")
+        # Queries are embedded with the dimensionality the collection was built with
+        self.embedding_dimensions = collection_dimensions(get_or_create_collection(self.collection_name))
+        self.document_store = create_document_store(self.collection_name)
+        self.embedder = create_text_embedder(self.embedding_dimensions)
+        self.batch_embedder = create_document_embedder(self.embedding_dimensions)
         self.chroma_retriever = ChromaEmbeddingRetriever(document_store=self.document_store)
-        self.prompt_builder = PromptBuilder(template=self.prompt_template)
-        self.generator = OpenAIGenerator(model="gpt-4o-mini")
+        dense_retriever = self.chroma_retriever
+        if VECTOR_INDEX_ENABLED:
+            dense_retriever = ExactEmbeddingRetriever(self.collection_name, fallback=self.chroma_retriever)
+        self.hybrid_retriever = HybridRetriever(
+            embedder=self.embedder,
+            dense_retriever=dense_retriever,
+            collection_name=self.collection_name,
+        )
+        self.context_assembler = ContextAssembler()
+        self.prompt_builder = CachedChatPromptBuilder()
+        # Retries, rate limits and priorities are handled by the shared LLM scheduler
+        self.generator = scheduled(OpenAIChatGenerator(model=LLM_MODEL, max_retries=0))
         self.weather_retriever = WeatherRetriever(api_key=os.getenv('WEATHER_API_KEY'))
         self.location_retriever = LocationRetriever(api_key=os.getenv('GOOGLE_MAPS_API_KEY'))
         self.datetime_retriever = DateTimeRetriever(api_key=os.getenv('WEATHER_API_KEY'))
         self.web_search = SerpAPIWebSearch(api_key=os.getenv('SERP_API_KEY'))
+        self.tool_dispatcher = ToolDispatcher({
+            "weather": self.weather_retriever,
+            "location": self.location_retriever,
+            "datetime": self.datetime_retriever,
+            "web_search": self.web_search,
+        })
+        self.route_announcer = RouteAnnouncer()
         self.router = ConditionalRouter(routes=self.routes)
 
         self.pipeline = Pipeline()
-        self.pipeline.add_component("query_embedder", self.embedder)
-        self.pipeline.add_component("retriever", self.chroma_retriever)
-        self.pipeline.add_component("location_retriever", self.location_retriever)
-        self.pipeline.add_component("datetime_retriever", self.datetime_retriever)
-        self.pipeline.add_component("weather_retriever", self.weather_retriever)
-        self.pipeline.add_component("web_search", self.web_search)
+        self.pipeline.add_component("retriever", self.hybrid_retriever)
+        self.pipeline.add_component("tool_dispatcher", self.tool_dispatcher)
+        self.pipeline.add_component("context_assembler", self.context_assembler)
         self.pipeline.add_component("prompt", self.prompt_builder)
         self.pipeline.add_component("generator", self.generator)
+        self.pipeline.add_component("route_announcer", self.route_announcer)
         self.pipeline.add_component("router", self.router)
 
-        self.pipeline.connect("query_embedder.embedding", "retriever.query_embedding")
-        self.pipeline.connect("retriever.documents", "prompt.documents")
-        self.pipeline.connect("prompt", "generator")
-        self.pipeline.connect("generator.replies", "router.replies")
-        self.pipeline.connect("router.weather_search", "weather_retriever.query")
-        self.pipeline.connect("router.location_search", "location_retriever.query")
-        self.pipeline.connect("router.datetime_search", "datetime_retriever.query")
-        self.pipeline.connect("router.web_search", "web_search.query")
+        self.pipeline.connect("retriever.documents", "context_assembler.documents")
+        self.pipeline.connect("context_assembler.documents", "prompt.documents")
+        self.pipeline.connect("prompt.prompt", "generator.messages")
+        self.pipeline.connect("generator.replies", "route_announcer.replies")
+        self.pipeline.connect("route_announcer.replies", "router.replies")
+        self.pipeline.connect("router.tool_calls", "tool_dispatcher.tool_calls")
 
-    def process_query(self, query: str, top_k: int = 5):
+    def embed_queries(self, queries: List[str], top_k: int = 5) -> List[Optional[List[float]]]:
+        """
+        Embed many queries in shared API batches, for process_query(query_embedding=...).
+        Queries the lexical index answers confidently on its own are not embedded (None).
+        """
+        embeddings = [None] * len(queries)
+        pending = [i for i, query in enumerate(queries) if self.hybrid_retriever.needs_embedding(query, top_k)]
+        if pending:
+            with stage("embedding"):
+                documents = self.batch_embedder.run(documents=[Document(content=queries[i]) for i in pending])["documents"]
+            for i, document in zip(pending, documents):
+                embeddings[i] = document.embedding
+        return embeddings
+
+    def process_query(self, query: str, top_k: int = 5, query_embedding: Optional[List[float]] = None):
         """Process a query through the RAG pipeline with advanced routing"""
         result = self.pipeline.run(
             {
-                "query_embedder": {"text": query},
-                "retriever": {"top_k": top_k},
+                "retriever": {"query": query, "top_k": top_k, "query_embedding": query_embedding},
                 "prompt": {"query": query, "user_name": self.user_name},
-                "router": {"query": query}
+                "router": {"query": query},
+                "tool_dispatcher": {"query": query},
             },
             include_outputs_from={"retriever", "generator"}
         )
         
-        generator_reply = result["generator"]["replies"][0]
+        reply = result["generator"]["replies"][0]
+        generator_reply = reply.text
+        self._log_usage(reply.meta.get("usage"))
         prompt_type_map = {
             ('question: ', 'Question: '): 'question',
             ('statement: ', 'Statement: '): 'statement',
-            'use_weather_tool': 'weather',
-            'use_datetime_tool': 'datetime',
-            'use_location_tool': 'location',
-            'use_web_search_tool': 'web_search'
         }
 
         prompt_type = None
         content = None
         url = None
 
-        for prefix, type_name in prompt_type_map.items():
-            if isinstance(prefix, tuple):
+        if "tool_dispatcher" in result:
+            # One or more tools answered, merged into one reply
+            tools = result["tool_dispatcher"]
+            prompt_type, content, url = tools["prompt_type"], tools["content"], tools["url"]
+        else:
+            for prefix, type_name in prompt_type_map.items():
                 if any(generator_reply.startswith(p) for p in prefix):
                     prompt_type = type_name
                     content = generator_reply[len(prefix[0]):].strip()
                     break
-            elif generator_reply.startswith(prefix):
-                prompt_type = type_name
-                if type_name == 'web_search':
-                    content = result["web_search"]["web_documents"]["content"]
-                    url = result["web_search"]["web_documents"]["url"]
-                else:
-                    content = result[f"{type_name}_retriever"]["content"]
-                break
         
         print("Query:", query)
         print("Prompt type:", prompt_type)
@@ -100,6 +130,17 @@ class RAGPipeline:
             "url": url
         }
 
+    @staticmethod
+    def _log_usage(usage):
+        """Log and count prompt, cached and completion token counts reported by the provider."""
+        counts = record_llm_usage(usage)
+        if counts:
+            print(
+                f"LLM usage: prompt_tokens={counts['prompt']}, "
+                f"cached_tokens={counts['cached']}, "
+                f"completion_tokens={counts['completion']}"
+            )
+
     def export_pipeline_diagram(self, output_path: str = 'pipeline_diagrams.png'):
         """
         Export the pipeline diagram to a PNG file.
@@ -109,4 +150,31 @@ class RAGPipeline:
             "theme": "default",
             "bgColor": "#FFFFFF"
         })
-        return
\ No newline at end of file
+        return
+
+
+
+def _release_user(user_id: str, entry) -> None:
+    """An evicted user's indexes go with their pipeline; all of it is rebuilt from storage on their next request."""
+    collection_name = collection_name_for(user_id)
+    drop_lexical_index(collection_name)
+    drop_vector_index(collection_name)
+
+
+# user ID -> (collection version the pipeline was built for, pipeline)
+_pipelines = LRUCache(on_evict=_release_user)
+
+
+def get_rag_pipeline(user_id: str = DEFAULT_USER_ID) -> RAGPipeline:
+    """
+    Return the process-wide pipeline for a user, building it (and opening the vector store) on first use.
+    A pipeline is rebuilt after the summarizer, in any worker process, replaced that user's Chroma collection.
+    Building blocks only callers asking for the same user; call it from a worker thread in async code.
+    """
+    version = collection_replaced_marker(collection_name_for(user_id)).version()
+    entry = _pipelines.get_or_create(user_id, lambda: (version, RAGPipeline(user_id)))
+    if entry[0] != version:
+        # Unless a concurrent caller already replaced the stale pipeline
+        _pipelines.pop(user_id, entry)
+        entry = _pipelines.get_or_create(user_id, lambda: (version, RAGPipeline(user_id)))
+    return entry[1]
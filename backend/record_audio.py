@@ -3,30 +3,50 @@ import numpy as np
 import wavio
 import os
 from datetime import datetime
+from backend.vad import StreamingVAD, trim_silence
+from backend.config.stt_config import VAD_FRAME_MS, VAD_END_SILENCE_MS
 
-def record_audio(duration=5, sample_rate=44100):
+def record_audio(duration=5, sample_rate=44100, stop_on_silence=True):
     """
-    Record audio from microphone and save it as a WAV file
+    Record audio from microphone and save it as a WAV file.
+    With stop_on_silence, recording ends once speech has been followed by VAD_END_SILENCE_MS
+    of silence (duration is then the maximum length), and leading/trailing silence is trimmed.
+    Returns None when no speech was detected.
     """
-    print(f"Recording for {duration} seconds...")
-    
-    recording = sd.rec(int(duration * sample_rate), 
-                      samplerate=sample_rate, 
-                      channels=1)
-    
-    sd.wait()
+    print(f"Recording for up to {duration} seconds...")
+
+    vad = StreamingVAD(sample_rate)
+    frames = []
+    max_frames = int(duration * 1000 / VAD_FRAME_MS)
+
+    with sd.InputStream(samplerate=sample_rate, channels=1, dtype="float32", blocksize=vad.frame_length) as stream:
+        for _ in range(max_frames):
+            frame, _ = stream.read(vad.frame_length)
+            frames.append(frame.copy())
+            vad.process(frame)
+            if stop_on_silence and vad.heard_speech and vad.silence_after_speech_ms >= VAD_END_SILENCE_MS:
+                print("End of speech detected.")
+                break
+
+    recording = np.concatenate(frames).reshape(-1)
+    if stop_on_silence:
+        recording = trim_silence(recording, sample_rate)
+        if len(recording) == 0:
+            print("No speech detected, nothing saved.")
+            return None
+
     os.makedirs('data/audio_prompts', exist_ok=True)
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'data/audio_prompts/a_recording_{timestamp}.wav'
-    wavio.write(filename, recording, sample_rate, sampwidth=2)
+    wavio.write(filename, recording.reshape(-1, 1), sample_rate, sampwidth=2)
     
     print(f"Recording saved as {filename}")
     return filename
 
 if __name__ == "__main__":
     try:
-        duration = int(input("Enter recording duration (in seconds): "))
+        duration = int(input("Enter maximum recording duration (in seconds): "))
         if duration <= 0:
             raise ValueError("Duration must be greater than 0")
     except ValueError as e:
@@ -0,0 +1,51 @@
+"""
+Explicit dependency graph for the work of one request.
+
+Each node is an async function started as soon as the nodes it depends on have finished, with
+their results as arguments, so independent work overlaps without hand-written gather calls.
+Every node's start offset and duration is kept, and log() prints the timeline of the request.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class RequestGraph:
+    def __init__(self, label: str):
+        self.label = label
+        self.start = time.perf_counter()
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def node(self, name: str, fn: Callable[..., Awaitable[Any]], *depends_on: str) -> asyncio.Task:
+        """Schedule `fn(*results of depends_on)`; dependencies must already be nodes of the graph."""
+        dependencies = [self._tasks[dependency] for dependency in depends_on]
+
+        async def run():
+            inputs = [await dependency for dependency in dependencies]
+            start = time.perf_counter()
+            try:
+                return await fn(*inputs)
+            finally:
+                self.timings[name] = (start - self.start, time.perf_counter() - start)
+
+        task = asyncio.ensure_future(run())
+        self._tasks[name] = task
+        return task
+
+    async def result(self, name: str) -> Any:
+        return await self._tasks[name]
+
+    def cancel(self) -> None:
+        """Cancel the nodes still pending, e.g. after another node failed."""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Mark the failure as retrieved; the caller handles the one it awaited
+                task.exception()
+
+    def log(self) -> None:
+        nodes = sorted(self.timings.items(), key=lambda item: item[1][0])
+        timeline = ", ".join(f"{name} +{start * 1000:.0f}ms/{duration * 1000:.0f}ms" for name, (start, duration) in nodes)
+        print(f"{self.label} nodes (start/duration): {timeline}")
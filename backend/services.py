@@ -1,86 +1,143 @@
+import asyncio
 import os
 from typing import Optional
 from fastapi import HTTPException
-import whisper
-from elevenlabs.client import ElevenLabs
-from dotenv import load_dotenv
 from datetime import datetime
-import chromadb
-from backend.database import ConversationDatabase
+from backend.database import get_conversation_database
 import uuid
-from textblob import TextBlob
-from backend.config.elevenlabs_voice_config import ELEVENLABS_VOICE_IDs, TONE_SETTINGS
-from haystack.components.generators.openai import OpenAIGenerator
-
-load_dotenv()
+from backend.config.elevenlabs_voice_config import ELEVENLABS_VOICE_IDs, TONE_SETTINGS, AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT
+from backend.audio_store import new_audio_path
+from backend.deadline import RequestCancelled, check_deadline
+from backend.lexical_index import add_to_lexical_index
+from backend.memory_dedup import merged_metadata, nearest_duplicate
+from backend.rag_config import DEFAULT_USER_ID, ELEVEN_LABS_BASE_URL, MEMORY_DEDUP_ENABLED, VECTOR_INDEX_ENABLED
+from backend.telemetry import MEMORY_WRITES, stage
+from backend.tenancy import collection_name_for
+from backend.vector_index import add_to_vector_index
+from backend.vector_store import get_or_create_collection
+from backend.stt import get_stt_engine
+from backend.vad import decode_audio, trim_silence
+from backend.stt_batching import get_batching_transcriber
+from backend.config.stt_config import VAD_ENABLED, STT_BATCHING_ENABLED
 
 
 async def convert_audio_to_text(audio_path: str) -> str:
     """
-    Convert audio to text using Whisper model
+    Convert audio to text using the configured STT engine.
+    Silence is trimmed first; an empty string is returned when the clip contains no speech.
     """
     try:
-        model = whisper.load_model("base")
-        result = model.transcribe(audio_path)
-        
-        return result["text"]
-
+        check_deadline("stt")
+        audio = audio_path
+        if VAD_ENABLED or STT_BATCHING_ENABLED:
+            with stage("vad"):
+                audio = decode_audio(audio_path)
+                if VAD_ENABLED:
+                    audio = trim_silence(audio)
+            if len(audio) == 0:
+                return ""
+
+        with stage("stt"):
+            if STT_BATCHING_ENABLED:
+                return await get_batching_transcriber().transcribe(audio)
+            return await asyncio.to_thread(get_stt_engine().transcribe, audio)
+
+    except RequestCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error transcribing audio: {str(e)}")
 
 
-async def convert_text_to_speech(answer: str, prompt: str = None, voice_name: str = "Sarah") -> str:
+def _synthesize(answer: str, voice_id: str, voice_settings, audio_format: str) -> str:
+    """Stream ElevenLabs audio to a new file in the audio store; stops between chunks if the request is abandoned."""
+    output_format, extension, _ = AUDIO_FORMATS[audio_format]
+    from elevenlabs.client import ElevenLabs
+
+    client = ElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY"), base_url=ELEVEN_LABS_BASE_URL)
+    audio = client.text_to_speech.convert(
+        text=answer,
+        voice_id=voice_id,
+        model_id="eleven_multilingual_v2",
+        voice_settings=voice_settings,
+        output_format=output_format,
+    )
+
+    output_path = new_audio_path(extension)
+    try:
+        with open(output_path, "wb") as f:
+            for chunk in audio:
+                check_deadline("tts")
+                f.write(chunk)
+    except BaseException:
+        os.unlink(output_path)
+        raise
+    return output_path
+
+
+def analyze_tone(prompt: Optional[str]) -> str:
+    """Pick a voice tone (a TONE_SETTINGS key) from the sentiment of the user's prompt."""
+    if not prompt:
+        return "neutral"
+    from textblob import TextBlob
+
+    with stage("tone_analysis"):
+        analysis = TextBlob(prompt)
+        polarity = analysis.sentiment.polarity
+        subjectivity = analysis.sentiment.subjectivity
+
+    if polarity > 0.4:
+        return "happy"
+    elif polarity < -0.6:
+        return "sad"
+    elif polarity < -0.3:
+        return "serious"
+    elif subjectivity > 0.6:
+        return "empathetic"
+    return "neutral"
+
+
+async def convert_text_to_speech(
+    answer: str,
+    prompt: str = None,
+    voice_name: str = "Sarah",
+    audio_format: str = DEFAULT_AUDIO_FORMAT,
+    tone: Optional[str] = None,
+) -> str:
     """
     Convert text to speech using ElevenLabs with basic tone adjustment based on sentiment.
+    `tone` can be analyzed beforehand (see analyze_tone); otherwise it is derived from `prompt` here.
+    The clip is written to the audio store in the requested codec (see AUDIO_FORMATS) and its path is returned.
     """
     try:
+        check_deadline("tts")
         if not os.getenv("ELEVEN_LABS_API_KEY"):
             raise HTTPException(status_code=500, detail="ELEVEN_LABS_API_KEY not found in .env file")
 
-        tone = "neutral"
-        if prompt:
-            analysis = TextBlob(prompt)
-            polarity = analysis.sentiment.polarity
-            subjectivity = analysis.sentiment.subjectivity
-
-            if polarity > 0.4:
-                tone = "happy"
-            elif polarity < -0.6:
-                tone = "sad"
-            elif polarity < -0.3:
-                tone = "serious"
-            elif subjectivity > 0.6:
-                tone = "empathetic"
+        if tone is None:
+            tone = analyze_tone(prompt)
 
         voice_id = ELEVENLABS_VOICE_IDs[voice_name]
-        client = ElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY"))
-        
-        audio = client.text_to_speech.convert(
-            text=answer,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2",
-            voice_settings=TONE_SETTINGS[tone]
-        )
-
-        output_path = f"data/model_outputs/output_{datetime.now().strftime('%Y-%m-%d %H-%M-%S')}.mp3"
-        os.makedirs("data/model_outputs", exist_ok=True)
-        with open(output_path, "wb") as f:
-            for chunk in audio:
-                f.write(chunk)
+        with stage("tts"):
+            output_path = await asyncio.to_thread(_synthesize, answer, voice_id, TONE_SETTINGS[tone], audio_format)
 
         return output_path
 
+    except RequestCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating speech: {str(e)}")
 
 
 def save_conversation(data: dict, conversation_id: Optional[int] = None) -> dict:
     """
-    Save conversation to SQLite and non-question inputs to ChromaDB with embeddings
+    Save conversation to SQLite and non-question inputs to ChromaDB with embeddings, in the
+    database shard and collection of data["user_id"]
     """
     try:
+        user_id = data.get("user_id", DEFAULT_USER_ID)
+        collection_name = collection_name_for(user_id)
         # Saving in SQLite
-        conversation_db = ConversationDatabase()
+        conversation_db = get_conversation_database(user_id)
         full_response = (
             data["ai_response"]["answer"]
             + f"\n\nSources Links: {data['ai_response']['url']}"
@@ -99,21 +156,20 @@ def save_conversation(data: dict, conversation_id: Optional[int] = None) -> dict
         else:
             final_conversation_id = conversation_id
 
-        message_id = conversation_db.save_message(
-            data["user_input"],
-            full_response,
-            final_conversation_id,
-        )
+        with stage("sqlite_write"):
+            message_id = conversation_db.save_message(
+                data["user_input"],
+                full_response,
+                final_conversation_id,
+            )
 
         # Saving in ChromaDB
-        chroma_db_path = "data/databases/chroma_db"
-        os.makedirs(chroma_db_path, exist_ok=True)
-        chroma_client = chromadb.PersistentClient(path=chroma_db_path)
-        collection = chroma_client.get_or_create_collection(name="conversations")
+        collection = get_or_create_collection(collection_name)
 
         if data["ai_response"]["prompt_type"] == "statement":
             conversation_text = f"{data['user_name']}: {data['user_input']}\n\nStatement Date: {datetime.now().strftime('%d %B %Y')}"
-            embedding = data["embedder"].run(conversation_text)
+            with stage("embedding"):
+                embedding = data["embedder"].run(conversation_text)
 
             document = {
                 "id": str(uuid.uuid4()),
@@ -124,12 +180,29 @@ def save_conversation(data: dict, conversation_id: Optional[int] = None) -> dict
                     "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 },
             }
-
-            collection.add(
-                ids=[document["id"]],
-                embeddings=[document["embedding"]],
-                documents=[document["content"]],
-                metadatas=[document["metadata"]],
+            # A repeat of a stored statement replaces it (see backend/memory_dedup.py)
+            duplicate = nearest_duplicate(collection, document["embedding"]) if MEMORY_DEDUP_ENABLED else None
+            if duplicate is not None:
+                document["metadata"] = merged_metadata(duplicate[1], document["metadata"])
+
+            with stage("chroma_write"):
+                collection.add(
+                    ids=[document["id"]],
+                    embeddings=[document["embedding"]],
+                    documents=[document["content"]],
+                    metadatas=[document["metadata"]],
+                )
+                # Deleted only once the new one is stored, so the memory is never missing
+                if duplicate is not None:
+                    collection.delete(ids=[duplicate[0]])
+            replaces = duplicate[0] if duplicate is not None else None
+            MEMORY_WRITES.labels(outcome="inserted" if duplicate is None else "merged").inc()
+            if VECTOR_INDEX_ENABLED:
+                add_to_vector_index(
+                    collection_name, document["id"], document["embedding"], document["content"], document["metadata"], replaces
+                )
+            add_to_lexical_index(
+                collection_name, document["id"], document["content"], document["metadata"], replaces
             )
 
         return {
@@ -140,49 +213,3 @@ def save_conversation(data: dict, conversation_id: Optional[int] = None) -> dict
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving conversation: {str(e)}")
-
-
-async def create_conversation_title(
-    conversation_id: int, user_message: str, ai_response: str
-) -> str:
-    """
-    Create a conversation title based on user input and AI response.
-
-    Args:
-        conversation_id (int): The ID of the conversation in the database.
-        user_message (str): The user's input message.
-        ai_response (str): The AI's response to the user's message.
-
-    Returns:
-        str: The generated conversation title.
-    """
-    try:
-        generator = OpenAIGenerator(model="gpt-4o-mini")
-
-        prompt_template = """
-        Create a concise conversation title (max 30 characters) based on the following user message and AI response. Only return the title, don't return any other text.
-        User message: {{ user_message }}
-        AI response: {{ ai_response }}
-        """
-
-        prompt = prompt_template.replace("{{ user_message }}", user_message).replace(
-            "{{ ai_response }}", ai_response
-        )
-
-        result = generator.run(prompt)
-        title = result["replies"][0].strip()
-
-        title = title[:30]
-
-        conversation_db = ConversationDatabase()
-        conversation_db.update_conversation_title(
-            conversation_id=conversation_id,
-            title=title,
-        )
-
-        return title
-
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error creating conversation title: {str(e)}"
-        )
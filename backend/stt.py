@@ -0,0 +1,186 @@
+"""
+Pluggable speech-to-text engines.
+
+Engines load their model lazily on first use and are cached per configuration, so the
+model is loaded once per process instead of once per request.
+"""
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from backend.config.stt_config import (
+    STT_BACKEND,
+    STT_BEAM_SIZE,
+    STT_COMPUTE_TYPE,
+    STT_CPU_THREADS,
+    STT_LANGUAGE,
+    STT_MODEL_SIZE,
+)
+
+# A path to an audio file, or 16 kHz mono float32 samples
+AudioInput = Union[str, np.ndarray]
+
+
+class STTEngine(ABC):
+    """Base class for speech-to-text backends."""
+
+    name = "base"
+    # Whether a model loaded before os.fork() keeps working in the forked workers
+    fork_safe = False
+
+    def __init__(
+        self,
+        model_size: str = STT_MODEL_SIZE,
+        beam_size: int = STT_BEAM_SIZE,
+        language: Optional[str] = STT_LANGUAGE,
+        cpu_threads: int = STT_CPU_THREADS,
+    ):
+        self.model_size = model_size
+        self.beam_size = beam_size
+        self.language = language
+        self.cpu_threads = cpu_threads
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    @abstractmethod
+    def _load_model(self):
+        ...
+
+    @abstractmethod
+    def transcribe(self, audio: AudioInput) -> str:
+        ...
+
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[str]:
+        """Transcribe several clips; backends with a batched forward pass override this."""
+        return [self.transcribe(audio) for audio in audios]
+
+    def warmup(self) -> None:
+        """Load the model and run one inference on a second of silence."""
+        self.transcribe(np.zeros(16000, dtype=np.float32))
+
+    def describe(self) -> str:
+        return f"{self.name}:{self.model_size}"
+
+
+class WhisperEngine(STTEngine):
+    """Reference openai-whisper backend (PyTorch, fp32 on CPU)."""
+
+    name = "whisper"
+    fork_safe = True
+
+    def _load_model(self):
+        import torch
+        import whisper
+
+        if self.cpu_threads > 0:
+            torch.set_num_threads(self.cpu_threads)
+        return whisper.load_model(self.model_size, device="cpu")
+
+    def transcribe(self, audio: AudioInput) -> str:
+        result = self.model.transcribe(
+            audio,
+            fp16=False,
+            language=self.language,
+            beam_size=self.beam_size if self.beam_size > 1 else None,
+        )
+        return result["text"]
+
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[str]:
+        """
+        Pad every clip of up to 30 s into one log-mel batch and run a single batched
+        encoder/decoder pass. Longer clips go through the regular sliding-window transcribe.
+        Unlike transcribe(), batched decoding has no temperature fallback.
+        """
+        import torch
+        import whisper
+
+        texts: List[Optional[str]] = [None] * len(audios)
+        short = [i for i, audio in enumerate(audios) if len(audio) <= whisper.audio.N_SAMPLES]
+        for i in set(range(len(audios))) - set(short):
+            texts[i] = self.transcribe(audios[i])
+
+        if short:
+            model = self.model
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(torch.from_numpy(np.asarray(audios[i], dtype=np.float32))),
+                    n_mels=model.dims.n_mels,
+                )
+                for i in short
+            ]).to(model.device)
+            options = whisper.DecodingOptions(
+                language=self.language,
+                fp16=False,
+                beam_size=self.beam_size if self.beam_size > 1 else None,
+                without_timestamps=True,
+            )
+            for i, result in zip(short, whisper.decode(model, mels, options)):
+                texts[i] = result.text
+        return texts
+
+
+class FasterWhisperEngine(STTEngine):
+    """CTranslate2 backend with int8 quantized weights (requires the faster-whisper package)."""
+
+    name = "faster_whisper"
+    # CTranslate2 starts its worker threads with the model, and threads do not survive fork
+    fork_safe = False
+
+    def __init__(self, *args, compute_type: str = STT_COMPUTE_TYPE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compute_type = compute_type
+
+    def _load_model(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError("STT_BACKEND=faster_whisper requires the faster-whisper package") from e
+
+        return WhisperModel(
+            self.model_size,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+        )
+
+    def transcribe(self, audio: AudioInput) -> str:
+        segments, _ = self.model.transcribe(audio, beam_size=self.beam_size, language=self.language)
+        return "".join(segment.text for segment in segments)
+
+    def describe(self) -> str:
+        return f"{self.name}:{self.model_size}:{self.compute_type}"
+
+
+STT_ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+_engines: Dict[tuple, STTEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def create_stt_engine(backend: str = STT_BACKEND, **options) -> STTEngine:
+    """Build a new engine; options override the configured model size, beam size, language and threads."""
+    if backend not in STT_ENGINES:
+        raise ValueError(f"Unknown STT backend '{backend}'. Available: {sorted(STT_ENGINES)}")
+    return STT_ENGINES[backend](**options)
+
+
+def get_stt_engine(backend: str = STT_BACKEND, **options) -> STTEngine:
+    """Return the process-wide engine for a configuration, creating it on first use."""
+    key = (backend, tuple(sorted(options.items())))
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = create_stt_engine(backend, **options)
+        return _engines[key]
@@ -0,0 +1,87 @@
+"""
+Micro-batching scheduler for speech-to-text.
+
+Requests that arrive within STT_BATCH_MAX_WAIT_MS of each other are transcribed together in
+one batched forward pass, so concurrent short clips share the model's batch capacity instead
+of each running alone. While a batch is being transcribed, new clips queue up and form the
+next batch immediately, so the extra latency per clip is bounded by the wait window.
+"""
+import asyncio
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from backend.config.stt_config import STT_BATCH_MAX_SIZE, STT_BATCH_MAX_WAIT_MS
+from backend.stt import STTEngine, get_stt_engine
+from backend.telemetry import STT_BATCH_SIZE
+
+
+class BatchingTranscriber:
+    def __init__(self, engine: STTEngine, max_batch_size: int = STT_BATCH_MAX_SIZE, max_wait_ms: float = STT_BATCH_MAX_WAIT_MS):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "asyncio.Queue[Tuple[np.ndarray, asyncio.Future]]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        """Queue a clip (16 kHz mono float32) and wait for its transcription."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Whatever queued up during the previous batch joins without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            pending = [(audio, future) for audio, future in batch if not future.cancelled()]
+            if not pending:
+                continue
+            STT_BATCH_SIZE.observe(len(pending))
+            try:
+                texts = await asyncio.to_thread(self.engine.transcribe_batch, [audio for audio, _ in pending])
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), text in zip(pending, texts):
+                if not future.done():
+                    future.set_result(text)
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+
+_transcriber: Optional[BatchingTranscriber] = None
+
+
+def get_batching_transcriber() -> BatchingTranscriber:
+    """Process-wide transcriber for the configured engine; must be called from the event loop."""
+    global _transcriber
+    if _transcriber is None:
+        _transcriber = BatchingTranscriber(get_stt_engine())
+    return _transcriber
@@ -1,24 +1,43 @@
 from datetime import datetime
 from backend.rag_pipeline import RAGPipeline
-import numpy as np
 import uuid
-import chromadb
-from backend.database import ConversationDatabase
+from haystack.dataclasses import ChatMessage
+from backend.database import get_conversation_database
+from backend.lexical_index import get_lexical_index
+from backend.vector_index import get_vector_index
+from backend.llm_scheduler import BACKGROUND, llm_priority
+from backend.embeddings import QuantizedMatrix, collection_dimensions, collection_metadata
+from backend.rag_config import EMBEDDING_STORAGE_DTYPE, VECTOR_INDEX_ENABLED
+from backend.telemetry import stage
+from backend.vector_store import get_chroma_client, get_or_create_collection
+from backend.workers import collection_replaced_marker, is_summarization_worker, summarization_lock
 
 class ConversationSummarizer:
     def __init__(self, rag_pipeline: RAGPipeline):
         self.rag_pipeline = rag_pipeline
-        self.collection = chromadb.PersistentClient(path="data/databases/chroma_db").get_or_create_collection(name="conversations")
+        # The pipeline's user: their collection is summarized and their interaction count reset
+        self.collection_name = rag_pipeline.collection_name
+        self.collection = get_or_create_collection(self.collection_name)
         
     def process_conversation(self, conversation_count, conversation_count_threshold):
-        """Process a new conversation and trigger summarization if needed"""
-        if conversation_count >= conversation_count_threshold:
-            print("\nSummarizing conversations...")
-            self.summarize_conversations()
-
-            conversations_db = ConversationDatabase()
-            conversations_db.reset_total_interactions_count()
-            print("\nResetted total interactions count!")
+        """
+        Process a new conversation and trigger summarization if needed.
+        With several worker processes only the designated summarization worker runs it; the
+        count is kept in SQLite, so a threshold crossed on another worker is picked up on its next request.
+        """
+        if conversation_count >= conversation_count_threshold and is_summarization_worker():
+            with summarization_lock(self.collection_name) as acquired:
+                if not acquired:
+                    print("Summarization already running, skipping")
+                    return
+                print("\nSummarizing conversations...")
+                # Shares the pipeline's generator and embedder, but yields to interactive calls
+                with stage("summarization"), llm_priority(BACKGROUND):
+                    self.summarize_conversations()
+
+                conversations_db = get_conversation_database(self.rag_pipeline.user_id)
+                conversations_db.reset_total_interactions_count()
+                print("\nResetted total interactions count!")
             
     def summarize_conversations(self):
         """Summarize and cluster recent conversations"""
@@ -34,7 +53,7 @@ class ConversationSummarizer:
             print("No conversations to summarize!\n")
             return
             
-        clusters = self._cluster_conversations(results["documents"], results["embeddings"].tolist())
+        clusters = self._cluster_conversations(results["documents"], results["embeddings"])
         print("Clustering finished!")
 
         summaries = []
@@ -46,46 +65,26 @@ class ConversationSummarizer:
         print("Summarizing of Clusters finished!")
         self._save_summaries(summaries)
 
-    def _cluster_conversations(self, documents, embeddings):
-        """Cluster conversations based on similarity with all previous documents"""
+    def _cluster_conversations(self, documents, embeddings, dtype: str = EMBEDDING_STORAGE_DTYPE):
+        """
+        Cluster conversations based on similarity with all previous documents: a conversation joins the
+        first cluster holding any member with cosine similarity >= 0.6. All pairwise similarities come from
+        one matrix product over the (optionally float16/int8 quantized) embedding matrix.
+        """
+        similarities = QuantizedMatrix(embeddings, dtype).similarity_matrix()
         clusters = []
 
-        for doc, embedding in zip(documents, embeddings):
-            added_to_cluster = False
-
+        for i in range(len(documents)):
             for cluster in clusters:
-                similarities = [
-                    self._calculate_similarity(prev_emb, embedding)
-                    for prev_emb in cluster["embeddings"] #All embeddings in one cluster
-                ]
-                if any(sim >= 0.6 for sim in similarities):
-                    cluster["documents"].append(doc)
-                    cluster["embeddings"].append(embedding)
-                    added_to_cluster = True
+                if (similarities[i, cluster] >= 0.6).any():
+                    cluster.append(i)
                     break
-
-            if not added_to_cluster:
+            else:
                 # Create new cluster
-                clusters.append({
-                    "documents": [doc],
-                    "embeddings": [embedding]
-                })
+                clusters.append([i])
 
+        return [[documents[i] for i in cluster] for cluster in clusters]
 
-        final_clusters = [cluster["documents"] for cluster in clusters]
-        return final_clusters
-        
-    def _calculate_similarity(self, emb1, emb2):
-        """Calculate cosine similarity between two embeddings"""
-        emb1 = np.array(emb1)
-        emb2 = np.array(emb2)
-        
-        dot_product = np.dot(emb1, emb2)
-        norm1 = np.linalg.norm(emb1)
-        norm2 = np.linalg.norm(emb2)
-        
-        return dot_product / (norm1 * norm2)
-        
     def _summarize_cluster(self, cluster_text):
         """Summarize a cluster of conversations"""
         prompt = f"""
@@ -96,15 +95,17 @@ class ConversationSummarizer:
             Start directly with the content of the summary.
         """
         
-        result = self.rag_pipeline.generator.run(prompt)
-        return result["replies"][0]
+        with stage("llm.summarize"):
+            result = self.rag_pipeline.generator.run(messages=[ChatMessage.from_user(prompt)])
+        return result["replies"][0].text
         
     def _save_summaries(self, summaries):
         """Save summaries and update the document store"""
         try:
-            client = chromadb.PersistentClient(path="data/databases/chroma_db")
-            collection_name = "conversations"
-            temp_collection_name = "conversations_temp"
+            client = get_chroma_client()
+            collection_name = self.collection_name
+            # '.' cannot occur in user IDs, so this never collides with another user's collection
+            temp_collection_name = f"{self.collection_name}.temp"
 
             # Fetch all 'summary' documents from the old collection
             print("Fetching all summary documents from the old collection...")
@@ -123,7 +124,10 @@ class ConversationSummarizer:
 
             # Create a new collection
             print("Creating a new collection...")
-            temp_collection = client.get_or_create_collection(name=temp_collection_name)
+            temp_collection = client.get_or_create_collection(
+                name=temp_collection_name,
+                metadata={**(old_collection.metadata or {}), **collection_metadata(collection_dimensions(old_collection))},
+            )
 
             # Copy existing summary docs to the new collection
             print("Copying existing summary docs to the new collection...")
@@ -138,7 +142,8 @@ class ConversationSummarizer:
             # Add new summaries to the new collection
             print("Adding new summaries to the new collection...")
             for summary in summaries:
-                embedding = self.rag_pipeline.embedder.run(summary)
+                with stage("embedding"):
+                    embedding = self.rag_pipeline.embedder.run(summary)
                 document = {
                     "id": str(uuid.uuid4()),
                     "content": summary,
@@ -162,6 +167,11 @@ class ConversationSummarizer:
 
             # Change the temp collection to be the new one
             temp_collection.modify(name=collection_name)
+            # Tell every worker (this one included) to reopen the collection and rebuild its indexes
+            collection_replaced_marker(collection_name).bump()
+            get_lexical_index(collection_name)
+            if VECTOR_INDEX_ENABLED:
+                get_vector_index(collection_name)
 
             print(f"Added {len(summaries)} summaries to database!")
             print("Summarized conversations!")
@@ -0,0 +1,293 @@
+"""
+Per-stage latency instrumentation.
+
+Every stage (STT, embedding, retrieval, LLM, tools, TTS, database writes, summarization)
+is timed once and reported three ways: an OpenTelemetry span, a Prometheus histogram
+sample and, for stages that run inside an HTTP request, a Server-Timing entry.
+Haystack pipeline components are picked up automatically through a haystack Tracer.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from opentelemetry import trace
+from prometheus_client import CONTENT_TYPE_LATEST, Counter as PrometheusCounter, Gauge, Histogram, generate_latest
+
+from backend.deadline import check_deadline
+from backend.rag_config import SLOW_REQUEST_PROFILE_INTERVAL_MS, SLOW_REQUEST_PROFILE_MS
+
+tracer = trace.get_tracer("perceptoai")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_DURATION = Histogram(
+    "perceptoai_stage_duration_seconds",
+    "Duration of a single processing stage",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUEST_DURATION = Histogram(
+    "perceptoai_request_duration_seconds",
+    "Duration of HTTP requests",
+    ["method", "path", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_TOKENS = PrometheusCounter(
+    "perceptoai_llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ["kind"],
+)
+LLM_QUEUE_WAIT = Histogram(
+    "perceptoai_llm_queue_wait_seconds",
+    "Time an OpenAI call waited in the scheduler for a slot and rate-limit budget",
+    ["priority"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_RETRIES = PrometheusCounter(
+    "perceptoai_llm_retries_total",
+    "OpenAI calls retried by the scheduler, by HTTP status or error type",
+    ["reason"],
+)
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "perceptoai_llm_concurrency_limit",
+    "Current adaptive limit on concurrent OpenAI calls",
+    multiprocess_mode="liveall",
+)
+REQUESTS_CANCELLED = PrometheusCounter(
+    "perceptoai_requests_cancelled_total",
+    "Requests abandoned because the client disconnected or the deadline passed",
+    ["reason", "stage"],
+)
+REQUESTS_DEGRADED = PrometheusCounter(
+    "perceptoai_requests_degraded_total",
+    "Requests answered in a reduced form to stay within their deadline",
+    ["mode"],
+)
+STT_BATCH_SIZE = Histogram(
+    "perceptoai_stt_batch_size",
+    "Clips transcribed together in one batched STT pass",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32),
+)
+# Dedup ratio: rate of outcome="merged" over the rate of all outcomes
+MEMORY_WRITES = PrometheusCounter(
+    "perceptoai_memory_writes_total",
+    "Statements saved to memory, by whether they were added or replaced a stored repeat",
+    ["outcome"],
+)
+
+# Pipeline component name -> stage name reported in metrics and Server-Timing
+COMPONENT_STAGES = {
+    "retriever": "retrieval",
+    "context_assembler": "context_assembly",
+    "prompt": "prompt_build",
+    "generator": "llm",
+    "router": "routing",
+    # All tool calls of a query; each one is also timed as tool.<name> (weather, location, datetime, web_search)
+    "tool_dispatcher": "tools",
+}
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+_active_profile: ContextVar[Optional["SlowRequestProfiler"]] = ContextVar("active_profile", default=None)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record a finished stage in the histogram and in the current request's timings."""
+    STAGE_DURATION.labels(stage=name).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """Time a block of work as one named stage."""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.watch_current_thread()
+
+    start = time.perf_counter()
+    with tracer.start_as_current_span(name, attributes=attributes) as span:
+        try:
+            yield span
+        finally:
+            record_stage(name, time.perf_counter() - start)
+
+
+def record_llm_usage(usage: Optional[dict]) -> Dict[str, int]:
+    """Count prompt, cached and completion tokens from an OpenAI usage payload."""
+    if not usage:
+        return {}
+    details = usage.get("prompt_tokens_details") or {}
+    cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+    counts = {
+        "prompt": usage.get("prompt_tokens") or 0,
+        "cached": cached or 0,
+        "completion": usage.get("completion_tokens") or 0,
+    }
+    for kind, value in counts.items():
+        LLM_TOKENS.labels(kind=kind).inc(value)
+    return counts
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """Start collecting stage timings for the current request context."""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total_seconds: Optional[float] = None) -> str:
+    """Format collected timings as a Server-Timing header value (repeated stages are summed)."""
+    totals: Dict[str, float] = defaultdict(float)
+    for name, seconds in timings:
+        totals[re.sub(r"[^A-Za-z0-9_.-]", "_", name)] += seconds
+    if total_seconds is not None:
+        totals["total"] = total_seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+def metrics_payload() -> bytes:
+    # With several worker processes, PROMETHEUS_MULTIPROC_DIR makes every worker write its samples
+    # to shared files, aggregated here so /metrics covers all workers and not just the one serving it
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+class StageTracer:
+    """
+    Haystack tracer (implements haystack.tracing.Tracer) that records every component run as a stage,
+    delegating spans to OpenTelemetry. Haystack itself is only imported when tracing is enabled.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    @contextmanager
+    def trace(self, operation_name: str, tags: Optional[Dict] = None, parent_span=None):
+        if operation_name != "haystack.component.run":
+            with self.inner.trace(operation_name, tags=tags, parent_span=parent_span) as span:
+                yield span
+            return
+
+        component_name = (tags or {}).get("haystack.component.name")
+        stage_name = COMPONENT_STAGES.get(component_name, component_name)
+        # Components of an abandoned request are skipped instead of run
+        check_deadline(stage_name)
+        profile = _active_profile.get()
+        if profile is not None:
+            profile.watch_current_thread()
+
+        start = time.perf_counter()
+        with self.inner.trace(operation_name, tags=tags, parent_span=parent_span) as span:
+            try:
+                yield span
+            finally:
+                record_stage(stage_name, time.perf_counter() - start)
+
+    def current_span(self):
+        return self.inner.current_span()
+
+
+class SlowRequestProfiler:
+    """
+    Sampling profiler for a single request. A daemon thread samples the stacks of every
+    thread that ran one of the request's stages; the collapsed stacks are written to
+    data/profiles only if the request turns out to be slower than the threshold.
+    """
+
+    def __init__(self, threshold_ms: int, interval_ms: int, output_dir: str = "data/profiles"):
+        self.threshold_ms = threshold_ms
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self.samples: Counter = Counter()
+        self.thread_ids = {threading.get_ident()}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+
+    def watch_current_thread(self) -> None:
+        self.thread_ids.add(threading.get_ident())
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SlowRequestProfiler":
+        _active_profile.set(self)
+        self._thread.start()
+        return self
+
+    def stop(self, label: str, elapsed_ms: float) -> Optional[str]:
+        """Stop sampling; dump collapsed stacks (flamegraph input) if the request was slow."""
+        self._stop.set()
+        self._thread.join()
+        if elapsed_ms < self.threshold_ms or not self.samples:
+            return None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = re.sub(r"[^A-Za-z0-9_-]", "_", label.strip("/")) or "root"
+        path = os.path.join(
+            self.output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{safe_label}_{int(elapsed_ms)}ms.txt"
+        )
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"Slow request {label} took {elapsed_ms:.0f} ms, profile written to {path}")
+        return path
+
+
+def start_profiler() -> Optional[SlowRequestProfiler]:
+    """Start the slow-request profiler when SLOW_REQUEST_PROFILE_MS is configured."""
+    if SLOW_REQUEST_PROFILE_MS <= 0:
+        return None
+    return SlowRequestProfiler(SLOW_REQUEST_PROFILE_MS, SLOW_REQUEST_PROFILE_INTERVAL_MS).start()
+
+
+def setup_telemetry() -> None:
+    """Configure OTLP span export when an endpoint is set."""
+    if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(resource=Resource.create({"service.name": "perceptoai"}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+
+
+_haystack_instrumented = False
+
+
+def instrument_haystack() -> None:
+    """Hook stage timing into haystack pipelines; called when the first pipeline is built."""
+    global _haystack_instrumented
+    if _haystack_instrumented:
+        return
+    from haystack import tracing as haystack_tracing
+    from haystack.tracing.opentelemetry import OpenTelemetryTracer
+
+    haystack_tracing.enable_tracing(StageTracer(OpenTelemetryTracer(trace.get_tracer("haystack"))))
+    _haystack_instrumented = True
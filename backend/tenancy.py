@@ -0,0 +1,160 @@
+"""
+Per-user isolation of memory and history.
+
+Every request belongs to a user ID (the X-User-ID header, DEFAULT_USER_ID without it). Each user
+has a Chroma collection and an SQLite file of their own, so retrieval, BM25/vector indexes and
+summarization only ever touch one user's memory. The default user keeps the legacy locations
+(the `conversations` collection, data/databases/conversations.db), so single-user deployments
+see no change.
+
+Per-user objects (RAG pipelines, database engines) live in LRUCaches of MAX_ACTIVE_USERS
+entries per worker process; an evicted user is reloaded from storage on their next request.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from backend.rag_config import (
+    CHROMA_COLLECTION_NAME,
+    DEFAULT_USER_ID,
+    MAX_ACTIVE_USERS,
+    USER_DATABASE_DIR,
+    USER_NAME,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+LEGACY_DATABASE_URL = "sqlite:///data/databases/conversations.db"
+
+# Chroma collection names are at most 63 characters. Collections also get derived names, the
+# longest being migrate_embeddings' backup "<name>.pre_migration_<YYYYmmddHHMMSS>", so a user's
+# collection name itself is kept to what leaves room for that suffix
+MAX_COLLECTION_NAME_LENGTH = 63 - len(".pre_migration_20240101000000")
+
+# Collection names must also start and end with a letter or digit
+_USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9_-]{0,46}[A-Za-z0-9])?$")
+
+
+def validate_user_id(user_id: Optional[str]) -> str:
+    """The user ID to use for a request; raises ValueError for one that cannot name a collection or file."""
+    if not user_id:
+        return DEFAULT_USER_ID
+    if not _USER_ID_PATTERN.match(user_id):
+        raise ValueError("User ID must be 1-48 letters, digits, '-' or '_', starting and ending with a letter or digit")
+    return user_id
+
+
+def collection_name_for(user_id: str) -> str:
+    """
+    The user's Chroma collection. IDs too long to fit are shortened and suffixed with a hash of the
+    full ID after a '.', which user IDs cannot contain, so a shortened name never equals another
+    user's plain one.
+    """
+    if user_id == DEFAULT_USER_ID:
+        name = CHROMA_COLLECTION_NAME
+    else:
+        name = f"{CHROMA_COLLECTION_NAME}_{user_id}"
+        if len(name) > MAX_COLLECTION_NAME_LENGTH:
+            digest = hashlib.sha256(user_id.encode()).hexdigest()[:8]
+            name = f"{name[: MAX_COLLECTION_NAME_LENGTH - len(digest) - 1]}.{digest}"
+    assert len(name) <= MAX_COLLECTION_NAME_LENGTH, f"Collection name '{name}' is too long"
+    return name
+
+
+def database_url_for(user_id: str) -> str:
+    if user_id == DEFAULT_USER_ID:
+        return LEGACY_DATABASE_URL
+    os.makedirs(USER_DATABASE_DIR, exist_ok=True)
+    return f"sqlite:///{USER_DATABASE_DIR}/{user_id}.db"
+
+
+def display_name_for(user_id: str) -> str:
+    """How prompts and stored statements refer to the user."""
+    return USER_NAME if user_id == DEFAULT_USER_ID else user_id
+
+
+def known_user_ids() -> List[str]:
+    """Every user with a database shard, the default user first."""
+    shards = os.listdir(USER_DATABASE_DIR) if os.path.isdir(USER_DATABASE_DIR) else []
+    return [DEFAULT_USER_ID] + sorted(name[: -len(".db")] for name in shards if name.endswith(".db"))
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe mapping of at most `capacity` entries, created on demand by get_or_create; the
+    least recently used entry is evicted (and handed to `on_evict`) when a new one does not fit.
+    Entries are built outside the cache's lock, so building one user's entry (a pipeline and its
+    indexes) never holds up lookups of other users; concurrent callers for one key share one build.
+    """
+
+    def __init__(self, capacity: int = MAX_ACTIVE_USERS, on_evict: Optional[Callable[[K, V], None]] = None):
+        self.capacity = max(1, capacity)
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[K, V]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Per-key locks of the entries being built
+        self._building: Dict[K, threading.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def _lookup_locked(self, key: K) -> Optional[V]:
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def get_or_create(self, key: K, factory: Callable[[], V]) -> V:
+        with self._lock:
+            value = self._lookup_locked(key)
+            if value is not None:
+                return value
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                # Built by the caller we waited for
+                value = self._lookup_locked(key)
+            if value is not None:
+                return value
+            try:
+                value = factory()
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+            with self._lock:
+                self._entries[key] = value
+                evicted = []
+                while len(self._entries) > self.capacity:
+                    evicted.append(self._entries.popitem(last=False))
+
+        for evicted_key, evicted_value in evicted:
+            self._evict(evicted_key, evicted_value)
+        return value
+
+    def pop(self, key: K, value: Optional[V] = None) -> Optional[V]:
+        """Remove an entry; with `value`, only if the entry is still that object (not a newer one)."""
+        with self._lock:
+            if value is not None and self._entries.get(key) is not value:
+                return None
+            value = self._entries.pop(key, None)
+        if value is not None:
+            self._evict(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            entries, self._entries = list(self._entries.items()), OrderedDict()
+        for key, value in entries:
+            self._evict(key, value)
+
+    def _evict(self, key: K, value: V) -> None:
+        if self.on_evict is not None:
+            self.on_evict(key, value)
@@ -0,0 +1,114 @@
+"""
+Conversation titles, without an LLM call per new conversation.
+
+TITLE_MODE=local titles a conversation from the keyphrases of its first exchange, right after
+it is saved. TITLE_MODE=batch leaves new conversations untitled and a timer on the background
+worker titles all of them with one LLM request. Either way, GET /conversations lists a
+conversation that has no title yet with a provisional local one.
+"""
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+from backend.config.title_config import (
+    DEFAULT_TITLE,
+    TITLE_BATCH_INTERVAL_SECONDS,
+    TITLE_BATCH_SIZE,
+    TITLE_MAX_LENGTH,
+    TITLE_MODE,
+    TITLE_MODEL,
+)
+from backend.database import get_conversation_database
+from backend.keyphrases import keyphrase_title
+from backend.telemetry import stage
+
+TITLE_MODES = ("local", "batch")
+if TITLE_MODE not in TITLE_MODES:
+    raise ValueError(f"Unknown TITLE_MODE '{TITLE_MODE}'. Available: {list(TITLE_MODES)}")
+
+_BATCH_PROMPT = """Create a concise title (max {max_length} characters) for each conversation below, based on its first user message and AI response.
+Return only a JSON object mapping each conversation ID to its title, e.g. {{"12": "Weekend Trip to Lyon"}}.
+
+{conversations}"""
+
+
+def local_title(user_message: str, ai_response: str = "") -> str:
+    return keyphrase_title(user_message, ai_response, TITLE_MAX_LENGTH) or DEFAULT_TITLE
+
+
+def provisional_title(first_message) -> str:
+    """Title shown for a conversation that has none yet; `first_message` is its first Message row, if any."""
+    if first_message is None:
+        return DEFAULT_TITLE
+    return local_title(first_message.user_input, first_message.ai_response)
+
+
+def assign_local_title(user_id: str, conversation_id: int, user_message: str, ai_response: str) -> None:
+    """Title a user's new conversation from its first exchange (TITLE_MODE=local); a titled one is left alone."""
+    with stage("title.local"):
+        title = local_title(user_message, ai_response)
+    with stage("sqlite_write"):
+        get_conversation_database(user_id).set_missing_titles({conversation_id: title})
+
+
+def _parse_titles(reply: str, conversation_ids: List[int]) -> Dict[int, str]:
+    try:
+        mapping = json.loads(reply)
+    except json.JSONDecodeError:
+        print(f"Title batch: unparseable reply {reply[:200]!r}")
+        return {}
+    titles = {}
+    for conversation_id in conversation_ids:
+        title = mapping.get(str(conversation_id)) if isinstance(mapping, dict) else None
+        if isinstance(title, str) and title.strip():
+            titles[conversation_id] = title.strip().strip('"')[:TITLE_MAX_LENGTH]
+    return titles
+
+
+def title_untitled_conversations(user_id: str, limit: int = TITLE_BATCH_SIZE) -> int:
+    """Title up to `limit` of a user's untitled conversations with a single LLM request; returns how many were titled."""
+    from haystack.components.generators.openai import OpenAIGenerator
+
+    from backend.llm_scheduler import BACKGROUND, llm_priority, scheduled
+
+    conversations_db = get_conversation_database(user_id)
+    pending = conversations_db.get_untitled_conversations(limit)
+    if not pending:
+        return 0
+
+    listing = "\n\n".join(
+        f"ID {item['conversation_id']}\nUser: {item['user_input'][:300]}\nAI: {item['ai_response'][:300]}"
+        for item in pending
+    )
+    generator = scheduled(
+        OpenAIGenerator(
+            model=TITLE_MODEL,
+            max_retries=0,
+            generation_kwargs={"response_format": {"type": "json_object"}, "max_tokens": 20 * len(pending) + 50},
+        )
+    )
+    with stage("llm.title_batch"), llm_priority(BACKGROUND):
+        reply = generator.run(_BATCH_PROMPT.format(max_length=TITLE_MAX_LENGTH, conversations=listing))["replies"][0]
+
+    titles = _parse_titles(reply, [item["conversation_id"] for item in pending])
+    with stage("sqlite_write"):
+        updated = conversations_db.set_missing_titles(titles)
+    print(f"Title batch: titled {updated} of {len(pending)} conversations of user '{user_id}'")
+    return updated
+
+
+async def run_title_batcher(interval: Optional[float] = None) -> None:
+    """Timer loop for TITLE_MODE=batch; only the background worker makes the requests, one per user with untitled conversations."""
+    from backend.tenancy import known_user_ids
+    from backend.workers import is_summarization_worker
+
+    interval = TITLE_BATCH_INTERVAL_SECONDS if interval is None else interval
+    while True:
+        await asyncio.sleep(interval)
+        if not is_summarization_worker():
+            continue
+        for user_id in await asyncio.to_thread(known_user_ids):
+            try:
+                await asyncio.to_thread(title_untitled_conversations, user_id)
+            except Exception as e:
+                print(f"Title batch for user '{user_id}' failed: {e}")
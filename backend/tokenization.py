@@ -0,0 +1,21 @@
+"""
+Token counting for prompt budgeting, using the same BPE as the generator model.
+"""
+from functools import lru_cache
+
+import tiktoken
+
+from backend.rag_config import TOKENIZER_MODEL
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = TOKENIZER_MODEL) -> int:
+    """Number of tokens the model will see for the given text."""
+    return len(_get_encoding(model).encode(text or "", disallowed_special=()))
@@ -0,0 +1,141 @@
+"""
+Energy-based voice activity detection.
+
+Whisper pads every clip to a 30 s window and the recorded prompts are mostly silence, so
+trimming to the spoken part before transcription saves STT compute, and detecting the end
+of speech lets recording stop early. Clips without speech are reported as empty so that
+the request can skip the LLM and TTS altogether.
+"""
+import subprocess
+import wave
+from typing import Optional
+
+import numpy as np
+
+from backend.config.stt_config import (
+    VAD_FRAME_MS,
+    VAD_MIN_DYNAMIC_RANGE_DB,
+    VAD_MIN_ENERGY_DB,
+    VAD_MIN_SPEECH_MS,
+    VAD_NOISE_MARGIN_DB,
+    VAD_PADDING_MS,
+)
+
+SAMPLE_RATE = 16000
+
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode any ffmpeg-readable file to mono float32 samples; WAV files also work without ffmpeg."""
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-",
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True).stdout
+        return np.frombuffer(output, np.int16).astype(np.float32) / 32768.0
+    except FileNotFoundError:
+        if not path.lower().endswith(".wav"):
+            raise
+        return _read_wav(path, sample_rate)
+
+
+def _read_wav(path: str, sample_rate: int) -> np.ndarray:
+    with wave.open(path, "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        frames = f.readframes(f.getnframes())
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+    samples = np.frombuffer(frames, dtype).astype(np.float32)
+    if width == 1:
+        samples = samples - 128
+    samples = samples / float(2 ** (8 * width - 1))
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        target = np.arange(int(len(samples) * sample_rate / rate)) * rate / sample_rate
+        samples = np.interp(target, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+def frame_energies_db(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS) -> np.ndarray:
+    """RMS energy of consecutive non-overlapping frames, in dBFS."""
+    frame_length = int(sample_rate * frame_ms / 1000)
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[: frame_count * frame_length].reshape(frame_count, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return (20 * np.log10(np.maximum(rms, 1e-10))).astype(np.float32)
+
+
+def speech_threshold_db(energies_db: np.ndarray, noise_floor_db: Optional[float] = None) -> float:
+    """
+    Adaptive threshold: the estimated noise floor plus a margin, never below the absolute floor.
+    The quietest frames of a clip only estimate the noise floor when the clip has pauses, i.e.
+    its loud frames stand out from them; otherwise the absolute floor alone decides.
+    """
+    if noise_floor_db is None:
+        if not len(energies_db):
+            return VAD_MIN_ENERGY_DB
+        quiet, loud = np.percentile(energies_db, [10, 95])
+        if loud - quiet < VAD_MIN_DYNAMIC_RANGE_DB:
+            return VAD_MIN_ENERGY_DB
+        noise_floor_db = float(quiet)
+    return max(VAD_MIN_ENERGY_DB, noise_floor_db + VAD_NOISE_MARGIN_DB)
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Return the span from the first to the last speech frame (plus padding); empty if there is no speech."""
+    energies = frame_energies_db(samples, sample_rate)
+    if len(energies) == 0:
+        return samples[:0]
+
+    speech = energies > speech_threshold_db(energies)
+    if speech.sum() * VAD_FRAME_MS < VAD_MIN_SPEECH_MS:
+        return samples[:0]
+
+    frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+    padding = int(sample_rate * VAD_PADDING_MS / 1000)
+    speech_frames = np.flatnonzero(speech)
+    start = max(0, speech_frames[0] * frame_length - padding)
+    end = min(len(samples), (speech_frames[-1] + 1) * frame_length + padding)
+    return samples[start:end]
+
+
+class StreamingVAD:
+    """
+    Frame-by-frame speech detector for live recording. The noise floor is calibrated on the
+    first frames (assumed to be background noise) and tracked slowly afterwards.
+    """
+
+    def __init__(self, sample_rate: int, calibration_ms: int = 300):
+        self.sample_rate = sample_rate
+        self.calibration_frames = max(1, calibration_ms // VAD_FRAME_MS)
+        self.frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+        self.noise_floor_db: Optional[float] = None
+        self._calibration = []
+        self.speech_ms = 0
+        self.silence_after_speech_ms = 0
+
+    def process(self, frame: np.ndarray) -> bool:
+        """Feed one frame of VAD_FRAME_MS; returns whether it contains speech."""
+        energy = float(frame_energies_db(frame.reshape(-1).astype(np.float32), self.sample_rate)[0])
+
+        if len(self._calibration) < self.calibration_frames:
+            self._calibration.append(energy)
+            self.noise_floor_db = float(np.median(self._calibration))
+            return False
+
+        is_speech = energy > speech_threshold_db(np.empty(0), self.noise_floor_db)
+        if is_speech:
+            self.speech_ms += VAD_FRAME_MS
+            self.silence_after_speech_ms = 0
+        else:
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * energy
+            if self.speech_ms:
+                self.silence_after_speech_ms += VAD_FRAME_MS
+        return is_speech
+
+    @property
+    def heard_speech(self) -> bool:
+        return self.speech_ms >= VAD_MIN_SPEECH_MS
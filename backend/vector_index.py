@@ -0,0 +1,254 @@
+"""
+Exact in-process vector index over the personal memory collection.
+
+A single user's memory is hundreds to a few thousand vectors, small enough that one
+matrix-vector product over every stored embedding is faster than a query through Chroma's
+persistent HNSW segment (serialization, locking, result conversion) and is exact. The index
+keeps the collection's unit-normalized embeddings in one contiguous float32 matrix, in memory
+or, with VECTOR_INDEX_MEMMAP_DIR, in a memory-mapped file that the OS can page out.
+
+Like the BM25 index it mirrors the Chroma collection: updated incrementally on this process's
+writes, caught up with only the missing documents when another worker added some, and rebuilt
+when the collection was replaced (summarization, embedding migration). Collections larger than
+VECTOR_INDEX_MAX_DOCUMENTS are not loaded; ExactEmbeddingRetriever (backend.custom_components)
+then queries Chroma's HNSW.
+"""
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.rag_config import CHROMA_COLLECTION_NAME, VECTOR_INDEX_MAX_DOCUMENTS, VECTOR_INDEX_MEMMAP_DIR
+from backend.telemetry import stage
+
+if TYPE_CHECKING:
+    from haystack import Document
+
+# Rows fetched from Chroma per request while loading
+_LOAD_BATCH_SIZE = 1000
+
+
+class ExactVectorIndex:
+    """Append-mostly matrix of unit-norm embeddings with their documents. Safe to share between threads."""
+
+    def __init__(self, max_documents: int = VECTOR_INDEX_MAX_DOCUMENTS, memmap_dir: Optional[str] = VECTOR_INDEX_MEMMAP_DIR):
+        self.max_documents = max_documents
+        self.memmap_dir = memmap_dir
+        # Set when the collection outgrew max_documents: nothing is held and queries go to HNSW
+        self.oversized = False
+        self._lock = threading.RLock()
+        self._clear_locked()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _clear_locked(self) -> None:
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._contents: List[str] = []
+        self._metas: List[dict] = []
+
+    def _allocate(self, rows: int, dimensions: int) -> np.ndarray:
+        if not self.memmap_dir:
+            return np.empty((rows, dimensions), dtype=np.float32)
+        # An unlinked temporary file: nothing to clean up, and it goes away with the last reference
+        backing = tempfile.TemporaryFile(dir=self.memmap_dir, prefix="vector-index-")
+        return np.memmap(backing, dtype=np.float32, mode="w+", shape=(rows, dimensions))
+
+    def _reserve_locked(self, rows: int, dimensions: int) -> None:
+        """Make room for `rows` more vectors; capacity doubles so appends stay amortized O(1)."""
+        if self._matrix is not None and self._matrix.shape[1] != dimensions:
+            raise ValueError(f"Embedding has {dimensions} dimensions, the index holds {self._matrix.shape[1]}")
+        needed = self._size + rows
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        grown = self._allocate(max(needed, 2 * capacity, 64), dimensions)
+        if self._size:
+            grown[: self._size] = self._matrix[: self._size]
+        # Searches running on the previous matrix keep their own reference to it
+        self._matrix = grown
+
+    def add_many(
+        self,
+        ids: Sequence[str],
+        embeddings,
+        documents: Sequence[str],
+        metadatas: Optional[Sequence[Optional[dict]]] = None,
+    ) -> None:
+        """Append documents (an ID already present is replaced)."""
+        if not len(ids):
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._lock:
+            if self.oversized:
+                return
+            if any(doc_id in self._positions for doc_id in ids):
+                self._remove_locked(set(ids))
+            if self._size + len(ids) > self.max_documents:
+                self._set_oversized_locked()
+                return
+            self._reserve_locked(len(ids), vectors.shape[1])
+            self._matrix[self._size : self._size + len(ids)] = vectors
+            for doc_id, content, meta in zip(ids, documents, metadatas):
+                self._positions[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._contents.append(content)
+                self._metas.append(meta or {})
+            self._size += len(ids)
+
+    def add(self, doc_id: str, embedding, content: str, meta: Optional[dict] = None) -> None:
+        self.add_many([doc_id], [embedding], [content], [meta])
+
+    def remove(self, doc_ids) -> None:
+        with self._lock:
+            self._remove_locked(set(doc_ids))
+
+    def _remove_locked(self, doc_ids: set) -> None:
+        keep = [position for position, doc_id in enumerate(self._ids) if doc_id not in doc_ids]
+        if len(keep) == self._size:
+            return
+        # Compact into a new matrix instead of shifting rows under concurrent searches
+        matrix = self._allocate(max(len(keep), 64), self._matrix.shape[1])
+        matrix[: len(keep)] = self._matrix[keep]
+        self._matrix = matrix
+        self._ids = [self._ids[position] for position in keep]
+        self._contents = [self._contents[position] for position in keep]
+        self._metas = [self._metas[position] for position in keep]
+        self._positions = {doc_id: position for position, doc_id in enumerate(self._ids)}
+        self._size = len(keep)
+
+    def _set_oversized_locked(self) -> None:
+        self._clear_locked()
+        self.oversized = True
+        print(f"Vector index disabled above {self.max_documents} documents, using Chroma HNSW")
+
+    def _load_locked(self, collection, ids: List[str]) -> None:
+        for start in range(0, len(ids), _LOAD_BATCH_SIZE):
+            batch = collection.get(ids=ids[start : start + _LOAD_BATCH_SIZE], include=["embeddings", "documents", "metadatas"])
+            if len(batch["ids"]):
+                self.add_many(batch["ids"], batch["embeddings"], batch["documents"], batch["metadatas"])
+            if self.oversized:
+                return
+
+    def rebuild_from_collection(self, collection) -> None:
+        """Load the whole collection, or nothing if it is larger than max_documents."""
+        with self._lock:
+            self._clear_locked()
+            self.oversized = False
+            if collection.count() > self.max_documents:
+                self._set_oversized_locked()
+                return
+            self._load_locked(collection, collection.get(include=[])["ids"])
+
+    def sync_from_collection(self, collection) -> None:
+        """
+        Catch up with documents added to the collection by other processes (IDs first, then only the
+        missing rows), and drop the ones they deleted (repeats replaced by memory deduplication).
+        """
+        with self._lock:
+            if self.oversized:
+                if collection.count() <= self.max_documents:
+                    self.rebuild_from_collection(collection)
+                return
+            stored = collection.get(include=[])["ids"]
+            stored_ids = set(stored)
+            self._remove_locked({doc_id for doc_id in self._ids if doc_id not in stored_ids})
+            missing = [doc_id for doc_id in stored if doc_id not in self._positions]
+            self._load_locked(collection, missing)
+
+    def search(self, query_embedding, top_k: int = 5) -> List["Document"]:
+        """
+        Exact top_k by cosine similarity. Document.score is the squared L2 distance between the unit
+        vectors (2 - 2 * cosine), the same scale as ChromaEmbeddingRetriever's default metric.
+        """
+        with self._lock:
+            matrix, size = self._matrix, self._size
+            ids, contents, metas = self._ids, self._contents, self._metas
+        if not size or top_k <= 0:
+            return []
+        from haystack import Document
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        similarities = matrix[:size] @ query
+        if top_k < size:
+            best = np.argpartition(-similarities, top_k)[:top_k]
+            best = best[np.argsort(-similarities[best])]
+        else:
+            best = np.argsort(-similarities)
+        return [
+            Document(
+                id=ids[i],
+                content=contents[i],
+                meta=dict(metas[i]),
+                score=float(2 - 2 * similarities[i]),
+                embedding=matrix[i].tolist(),
+            )
+            for i in best
+        ]
+
+
+_indexes: Dict[str, ExactVectorIndex] = {}
+# Shared-marker versions each index was last synced with (see backend.workers)
+_index_versions: Dict[str, tuple] = {}
+_indexes_lock = threading.Lock()
+
+
+def _store_version(collection_name: str) -> tuple:
+    from backend.workers import collection_replaced_marker, documents_added_marker
+
+    return collection_replaced_marker(collection_name).version(), documents_added_marker(collection_name).version()
+
+
+def get_vector_index(collection_name: str = CHROMA_COLLECTION_NAME) -> ExactVectorIndex:
+    """
+    Return the process-wide index for a collection, loading it from Chroma on first use. When
+    another process added documents only those are fetched; a replaced collection is reloaded.
+    """
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        version = _store_version(collection_name)
+        previous = _index_versions.get(collection_name)
+        if index is None or previous != version:
+            from backend.vector_store import get_or_create_collection
+
+            collection = get_or_create_collection(collection_name)
+            if index is None or previous is None or previous[0] != version[0]:
+                index = index or ExactVectorIndex()
+                with stage("vector_index_build"):
+                    index.rebuild_from_collection(collection)
+                print(f"Vector index for '{collection_name}' built with {len(index)} documents")
+            else:
+                index.sync_from_collection(collection)
+            _indexes[collection_name] = index
+            _index_versions[collection_name] = version
+        return index
+
+
+def add_to_vector_index(
+    collection_name: str, doc_id: str, embedding, content: str, meta: Optional[dict] = None, replaces: Optional[str] = None
+) -> None:
+    """
+    Index a document this process just wrote to Chroma, in place of the deleted document `replaces`
+    if given. The documents-added marker bump that follows (add_to_lexical_index) makes the next
+    lookup list the collection's IDs, but fetches nothing.
+    """
+    index = get_vector_index(collection_name)
+    if replaces is not None:
+        index.remove([replaces])
+    index.add(doc_id, embedding, content, meta)
+
+
+def drop_vector_index(collection_name: str) -> None:
+    """Free an index (e.g. of a user evicted from the active set); it is reloaded on next use."""
+    with _indexes_lock:
+        _indexes.pop(collection_name, None)
+        _index_versions.pop(collection_name, None)
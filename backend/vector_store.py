@@ -0,0 +1,60 @@
+"""
+Access to the Chroma vector store.
+
+By default Chroma runs embedded (PersistentClient on CHROMA_DB_PATH). With CHROMA_SERVER_URL set,
+every worker process talks to one Chroma server instead, which is the only setup that is safe
+with several worker processes.
+"""
+import os
+import threading
+from urllib.parse import urlparse
+
+from backend.rag_config import CHROMA_DB_PATH, CHROMA_SERVER_URL
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _server_address():
+    url = urlparse(CHROMA_SERVER_URL)
+    return url.hostname or "127.0.0.1", url.port or (443 if url.scheme == "https" else 8000), url.scheme == "https"
+
+
+def get_chroma_client():
+    """Return the process-wide Chroma client (a client inherited across fork is never reused)."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            import chromadb
+
+            if CHROMA_SERVER_URL:
+                host, port, ssl = _server_address()
+                _client = chromadb.HttpClient(host=host, port=port, ssl=ssl)
+            else:
+                os.makedirs(CHROMA_DB_PATH, exist_ok=True)
+                _client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+            _client_pid = os.getpid()
+        return _client
+
+
+def create_document_store(collection_name: str):
+    """Haystack document store on the configured Chroma (embedded or server)."""
+    from haystack_integrations.document_stores.chroma import ChromaDocumentStore
+
+    if CHROMA_SERVER_URL:
+        host, port, _ = _server_address()
+        return ChromaDocumentStore(host=host, port=port, collection_name=collection_name)
+    return ChromaDocumentStore(persist_path=CHROMA_DB_PATH, collection_name=collection_name)
+
+
+def get_or_create_collection(name: str):
+    """Open a collection; a new one records the configured embedding model and dimensions in its metadata."""
+    from backend.embeddings import collection_metadata
+
+    client = get_chroma_client()
+    try:
+        return client.get_collection(name=name)
+    except Exception:
+        # Created here, or concurrently by another worker
+        return client.get_or_create_collection(name=name, metadata=collection_metadata())
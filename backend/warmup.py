@@ -0,0 +1,144 @@
+"""
+Startup warmup and readiness.
+
+Heavy dependencies (haystack, chromadb, Whisper/torch, tiktoken, TextBlob, ElevenLabs) are imported
+lazily, so the server starts listening right away and /healthz answers immediately. The warmup
+task then loads every model and client once, in the background, and /readyz reports ready only
+when it is done, so the first real request does not pay for cold imports and model loads.
+"""
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.rag_config import DEFAULT_USER_ID, VECTOR_INDEX_ENABLED
+from backend.telemetry import stage
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class Readiness:
+    """Warmup progress as reported by /readyz."""
+
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+
+    def status(self) -> dict:
+        if self.ready:
+            state = "ready"
+        elif self.error is not None:
+            state = "failed"
+        else:
+            state = "warming_up"
+        return {
+            "status": state,
+            "error": self.error,
+            "steps_ms": {name: round(seconds * 1000, 1) for name, seconds in self.steps.items()},
+        }
+
+
+readiness = Readiness()
+
+
+def _load_stt_model() -> None:
+    # Weights only: the first inference (and torch's thread pool) must happen after fork
+    from backend.stt import get_stt_engine
+
+    engine = get_stt_engine()
+    if engine.fork_safe:
+        engine.model
+
+
+def _import_pipeline_modules() -> None:
+    # Imports only; clients with sockets or threads are created per worker
+    import backend.rag_pipeline  # noqa: F401
+    import backend.summarizer  # noqa: F401
+
+
+def _warm_stt() -> None:
+    from backend.stt import get_stt_engine
+
+    get_stt_engine().warmup()
+
+
+def _warm_rag_pipeline() -> None:
+    # Builds the default user's haystack pipeline, opens the Chroma store and builds the BM25 (and exact
+    # vector) index; other users' are built on their first request
+    from backend.lexical_index import get_lexical_index
+    from backend.rag_pipeline import get_rag_pipeline
+    from backend.vector_index import get_vector_index
+
+    pipeline = get_rag_pipeline(DEFAULT_USER_ID)
+    pipeline.document_store.count_documents()
+    get_lexical_index(pipeline.collection_name)
+    if VECTOR_INDEX_ENABLED:
+        get_vector_index(pipeline.collection_name)
+
+
+def _warm_tokenizer() -> None:
+    from backend.tokenization import count_tokens
+
+    count_tokens("warmup")
+
+
+def _warm_tone_analyzer() -> None:
+    from textblob import TextBlob
+
+    TextBlob("Warming up the tone analyzer.").sentiment
+
+
+def _warm_tts_client() -> None:
+    import elevenlabs.client  # noqa: F401
+
+
+def _warm_acknowledgments() -> None:
+    # Renders only clips missing from disk (normally none after the first start); a failed clip is logged, not fatal
+    from backend.acknowledgments import render_clips
+
+    rendered = render_clips()
+    if rendered:
+        print(f"Rendered {rendered} acknowledgment clips")
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("stt", _warm_stt),
+    ("rag_pipeline", _warm_rag_pipeline),
+    ("tokenizer", _warm_tokenizer),
+    ("tone_analyzer", _warm_tone_analyzer),
+    ("tts_client", _warm_tts_client),
+    ("acknowledgments", _warm_acknowledgments),
+]
+
+# Fork-safe subset, run once in the pre-fork parent (see backend.workers)
+PRELOAD_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("stt_model", _load_stt_model),
+    ("pipeline_modules", _import_pipeline_modules),
+    ("tokenizer", _warm_tokenizer),
+    ("tone_analyzer", _warm_tone_analyzer),
+    ("tts_client", _warm_tts_client),
+]
+
+
+async def run_warmup() -> None:
+    """Run every warmup step in a worker thread, then mark the service ready."""
+    readiness.started_at = time.perf_counter()
+    if not WARMUP_ENABLED:
+        readiness.ready = True
+        return
+
+    try:
+        for name, step in WARMUP_STEPS:
+            start = time.perf_counter()
+            with stage(f"warmup.{name}"):
+                await asyncio.to_thread(step)
+            readiness.steps[name] = time.perf_counter() - start
+    except Exception as e:
+        readiness.error = f"{name}: {e}"
+        print(f"Warmup failed during {name}: {e}")
+        return
+
+    readiness.ready = True
+    print(f"Warmup finished in {time.perf_counter() - readiness.started_at:.1f}s")
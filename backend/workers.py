@@ -0,0 +1,194 @@
+"""
+Multi-process serving.
+
+`serve()` is a small pre-fork server. The parent imports the app, loads the fork-safe models
+(Whisper weights, tokenizer, TextBlob lexicon), freezes the garbage collector so those objects
+stay on untouched pages, binds the listening socket and forks PERCEPTO_WORKERS uvicorn workers
+accepting on it. The pages are shared copy-on-write, so N workers do not hold N copies of the
+weights. Workers that exit unexpectedly are restarted with the same worker ID.
+
+State shared between workers:
+- SQLite runs in WAL mode with a busy timeout (see backend.database)
+- Chroma must run as a server (CHROMA_SERVER_URL)
+- per-process caches (RAG pipelines, BM25 and vector indexes) are refreshed through per-collection SharedMarker files
+- background summarization runs in one designated worker only
+"""
+import gc
+import os
+import signal
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from backend.config.serving_config import (
+    PERCEPTO_WORKERS,
+    SERVER_HOST,
+    SERVER_PORT,
+    SUMMARIZATION_WORKER_ID,
+    WORKER_STATE_DIR,
+)
+from backend.rag_config import CHROMA_COLLECTION_NAME, CHROMA_SERVER_URL
+from filelock import FileLock, Timeout
+
+WORKER_ID: Optional[str] = os.getenv("PERCEPTO_WORKER_ID")
+
+
+class SharedMarker:
+    """A small file whose content changes whenever shared state changes, polled by other workers."""
+
+    def __init__(self, name: str):
+        self.path = os.path.join(WORKER_STATE_DIR, f"{name}.marker")
+
+    def version(self) -> str:
+        try:
+            with open(self.path) as f:
+                return f.read()
+        except FileNotFoundError:
+            return ""
+
+    def bump(self) -> str:
+        os.makedirs(WORKER_STATE_DIR, exist_ok=True)
+        token = uuid.uuid4().hex
+        temp_path = f"{self.path}.{os.getpid()}"
+        with open(temp_path, "w") as f:
+            f.write(token)
+        os.replace(temp_path, self.path)
+        return token
+
+
+def collection_replaced_marker(collection_name: str) -> SharedMarker:
+    """The summarizer replaced the Chroma collection: cached document stores point to a deleted collection."""
+    return _collection_marker("chroma_collection", collection_name)
+
+
+def documents_added_marker(collection_name: str) -> SharedMarker:
+    """A worker added documents: other workers' BM25 and vector indexes are missing them."""
+    return _collection_marker("chroma_documents", collection_name)
+
+
+def _collection_marker(kind: str, collection_name: str) -> SharedMarker:
+    # One marker per user collection, so one user's writes never invalidate another user's caches
+    return SharedMarker(kind if collection_name == CHROMA_COLLECTION_NAME else f"{kind}.{collection_name}")
+
+
+# Markers of the default user's collection
+COLLECTION_REPLACED = collection_replaced_marker(CHROMA_COLLECTION_NAME)
+DOCUMENTS_ADDED = documents_added_marker(CHROMA_COLLECTION_NAME)
+
+_held_locks: Dict[str, FileLock] = {}
+
+
+def _try_lock(name: str) -> Optional[FileLock]:
+    """Take a non-blocking exclusive file lock; returns None if another process holds it."""
+    os.makedirs(WORKER_STATE_DIR, exist_ok=True)
+    lock = FileLock(os.path.join(WORKER_STATE_DIR, f"{name}.lock"))
+    try:
+        lock.acquire(timeout=0)
+    except Timeout:
+        return None
+    return lock
+
+
+def is_summarization_worker() -> bool:
+    """
+    Whether this process runs background summarization. Under `python main.py` the worker with
+    SUMMARIZATION_WORKER_ID is designated; otherwise the first process to take the
+    summarization-worker lock keeps it for its lifetime.
+    """
+    if WORKER_ID is not None:
+        return WORKER_ID == SUMMARIZATION_WORKER_ID
+    if "summarization_worker" not in _held_locks:
+        lock = _try_lock("summarization_worker")
+        if lock is None:
+            return False
+        _held_locks["summarization_worker"] = lock
+    return True
+
+
+@contextmanager
+def summarization_lock(collection_name: str = CHROMA_COLLECTION_NAME):
+    """
+    Yield True if no other run holds the collection's summarization lock, so runs (summarization,
+    embedding migration) on one collection never overlap across processes.
+    """
+    lock = _try_lock("summarization" if collection_name == CHROMA_COLLECTION_NAME else f"summarization.{collection_name}")
+    try:
+        yield lock is not None
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+def preload() -> None:
+    """Load fork-safe models in the parent so that forked workers share them copy-on-write."""
+    from backend.warmup import PRELOAD_STEPS
+
+    for name, step in PRELOAD_STEPS:
+        start = time.perf_counter()
+        step()
+        print(f"Preloaded {name} in {time.perf_counter() - start:.1f}s")
+    # Objects created so far are never collected; this keeps the GC from writing to their pages
+    gc.collect()
+    gc.freeze()
+
+
+def _run_worker(app, sock, worker_id: int, host: str, port: int) -> None:
+    global WORKER_ID
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    WORKER_ID = str(worker_id)
+    os.environ["PERCEPTO_WORKER_ID"] = WORKER_ID
+    exit_code = 1
+    try:
+        uvicorn.Server(uvicorn.Config(app, host=host, port=port)).run(sockets=[sock])
+        exit_code = 0
+    finally:
+        os._exit(exit_code)
+
+
+def serve(app: str = "main:app", workers: int = PERCEPTO_WORKERS, host: str = SERVER_HOST, port: int = SERVER_PORT):
+    """Serve the app with one process, or pre-fork `workers` processes sharing preloaded models."""
+    import uvicorn
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run(app, host=host, port=port)
+        return
+    if not CHROMA_SERVER_URL:
+        print("WARNING: several workers share an embedded Chroma store; set CHROMA_SERVER_URL to run a Chroma server")
+
+    application = uvicorn.importer.import_from_string(app)
+    preload()
+    sock = uvicorn.Config(application, host=host, port=port).bind_socket()
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(worker_id: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(application, sock, worker_id, host, port)
+        children[pid] = worker_id
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker_id in range(workers):
+        spawn(worker_id)
+    print(f"Serving on http://{host}:{port} with {workers} workers")
+
+    while children:
+        pid, status = os.wait()
+        worker_id = children.pop(pid, None)
+        if worker_id is not None and not stopping:
+            print(f"Worker {worker_id} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(1)
+            spawn(worker_id)
+    sock.close()
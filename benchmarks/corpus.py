@@ -0,0 +1,27 @@
+"""
+Replay corpus for benchmarks, built from the recorded clips in data/audio_prompts.
+"""
+import glob
+import os
+from dataclasses import dataclass
+from typing import List
+
+AUDIO_PROMPTS_DIR = "data/audio_prompts"
+
+
+@dataclass
+class AudioClip:
+    name: str
+    path: str
+    data: bytes
+
+
+def load_audio_corpus(directory: str = AUDIO_PROMPTS_DIR) -> List[AudioClip]:
+    """Load every .wav clip once into memory so the load generator does no disk I/O."""
+    clips = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        with open(path, "rb") as f:
+            clips.append(AudioClip(name=os.path.splitext(os.path.basename(path))[0], path=path, data=f.read()))
+    if not clips:
+        raise FileNotFoundError(f"No .wav clips found in {directory}")
+    return clips
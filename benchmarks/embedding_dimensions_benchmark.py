@@ -0,0 +1,134 @@
+"""
+Memory footprint versus retrieval recall for reduced-dimension and quantized embeddings.
+
+The reference is exact top-k search over the full 3072-dimension float32 vectors. For every
+(dimensions, dtype) pair, the same search runs on truncated, re-normalized and quantized
+vectors and recall@k is reported against the reference. The table also shows bytes per vector
+and, per dimensionality, the on-disk size and build time of a Chroma collection.
+
+Vectors come from an existing collection (the stored vectors must be full-size), or from a
+text file embedded through the API. Queries are either a text file or, by default,
+leave-one-out: every stored vector queries the others.
+
+    python -m benchmarks.embedding_dimensions_benchmark --dimensions 3072,1536,1024,512,256 --dtypes float32,float16,int8
+    python -m benchmarks.embedding_dimensions_benchmark --texts memories.txt --queries questions.txt --k 5
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from benchmarks.stats import format_table, write_json
+
+REFERENCE_DIMENSIONS = 3072
+
+
+def _read_lines(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _embed(texts: List[str]) -> np.ndarray:
+    from haystack import Document
+    from haystack.components.embedders import OpenAIDocumentEmbedder
+
+    from backend.rag_config import EMBEDDING_MODEL
+
+    embedder = OpenAIDocumentEmbedder(model=EMBEDDING_MODEL, progress_bar=False)
+    documents = embedder.run(documents=[Document(content=text) for text in texts])["documents"]
+    return np.asarray([document.embedding for document in documents], dtype=np.float32)
+
+
+def _load_collection(name: str) -> np.ndarray:
+    from backend.vector_store import get_chroma_client
+
+    embeddings = np.asarray(get_chroma_client().get_collection(name=name).get(include=["embeddings"])["embeddings"])
+    if embeddings.ndim != 2 or embeddings.shape[1] != REFERENCE_DIMENSIONS:
+        raise SystemExit(f"Collection '{name}' does not hold {REFERENCE_DIMENSIONS}-dimension vectors; use --texts")
+    return embeddings.astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int, exclude_self: bool) -> np.ndarray:
+    if exclude_self:
+        scores = scores.copy()
+        np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(reference)) for row, reference in zip(found, expected))
+    return hits / expected.size
+
+
+def chroma_footprint(vectors: np.ndarray) -> dict:
+    """Build a throwaway persistent Chroma collection; report build time and size on disk."""
+    import chromadb
+
+    with tempfile.TemporaryDirectory(prefix="perceptoai-dims-") as path:
+        collection = chromadb.PersistentClient(path=path).create_collection(name="benchmark")
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), 500):
+            batch = vectors[offset:offset + 500]
+            collection.add(ids=[str(offset + i) for i in range(len(batch))], embeddings=batch.tolist())
+        build_ms = (time.perf_counter() - start) * 1000
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return {"chroma_build_ms": build_ms, "chroma_disk_mb": size / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default="conversations", help="Collection to read full-size vectors from")
+    parser.add_argument("--texts", help="Embed these lines (one document per line) instead of reading a collection")
+    parser.add_argument("--queries", help="Query lines; default is leave-one-out over the documents")
+    parser.add_argument("--dimensions", default="3072,1536,1024,512,256")
+    parser.add_argument("--dtypes", default="float32,float16,int8")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--skip-chroma", action="store_true", help="Do not measure Chroma build time and disk size")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from backend.embeddings import QuantizedMatrix, normalize_rows, truncate_embeddings
+
+    documents = normalize_rows(_embed(_read_lines(args.texts)) if args.texts else _load_collection(args.collection))
+    queries: Optional[np.ndarray] = normalize_rows(_embed(_read_lines(args.queries))) if args.queries else None
+    leave_one_out = queries is None
+    k = min(args.k, len(documents) - (1 if leave_one_out else 0))
+    print(f"{len(documents)} documents, {len(queries) if queries is not None else len(documents)} queries, k={k}")
+
+    reference_queries = documents if leave_one_out else queries
+    expected = top_k(reference_queries @ documents.T, k, leave_one_out)
+
+    rows = {}
+    for dimensions in (int(value) for value in args.dimensions.split(",")):
+        stored = truncate_embeddings(documents, dimensions)
+        reduced_queries = truncate_embeddings(reference_queries, dimensions)
+        footprint = {} if args.skip_chroma else chroma_footprint(stored)
+        for dtype in args.dtypes.split(","):
+            matrix = QuantizedMatrix(stored, dtype)
+            start = time.perf_counter()
+            found = top_k(matrix.scores(reduced_queries), k, leave_one_out)
+            search_ms = (time.perf_counter() - start) * 1000
+            rows[f"{dimensions} {dtype}"] = {
+                "bytes_per_vector": matrix.nbytes / len(matrix),
+                "memory_ratio": matrix.nbytes / (len(matrix) * REFERENCE_DIMENSIONS * 4),
+                "recall_at_k": recall_at_k(found, expected),
+                "search_ms": search_ms,
+                **footprint,
+            }
+
+    columns = ["bytes_per_vector", "memory_ratio", "recall_at_k", "search_ms"]
+    if not args.skip_chroma:
+        columns += ["chroma_build_ms", "chroma_disk_mb"]
+    print()
+    print(format_table("dims dtype", rows, columns, precision=3))
+    write_json(args.output, {"settings": vars(args), "documents": len(documents), "k": k, "results": rows})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Local stand-ins for every external API the backend calls, so that the full request path can be
+benchmarked and load-tested on a machine without network access.
+
+All services are served by one FastAPI app under a per-service prefix:
+
+    /openai/v1/...        embeddings and chat completions
+    /elevenlabs/v1/...    text-to-speech
+    /weatherapi/v1/...    current weather and timezone
+    /serpapi/search       web search
+    /nominatim/reverse    reverse geocoding
+    /google/geolocation/v1/geolocate
+    /ipapi/json/
+
+Responses are deterministic. Latency and failures can be injected per service:
+
+    python -m benchmarks.fake_services --port 9100 --latency openai=350,elevenlabs=250 --jitter 0.2 \\
+        --failure-rate openai=0.02
+
+Use service_env() to get the environment variables that point the backend at this server.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+from typing import Dict, List, Union
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+SERVICES = ("openai", "elevenlabs", "weatherapi", "serpapi", "nominatim", "google", "ipapi")
+
+# Rough real-world medians, used when no latency is given on the command line
+DEFAULT_LATENCY_MS = {
+    "openai": 400,
+    "elevenlabs": 300,
+    "weatherapi": 120,
+    "serpapi": 600,
+    "nominatim": 150,
+    "google": 100,
+    "ipapi": 80,
+}
+
+
+def service_env(base_url: str) -> Dict[str, str]:
+    """Environment variables that route every outbound call of the backend to the fake server."""
+    return {
+        "OPENAI_BASE_URL": f"{base_url}/openai/v1",
+        "OPENAI_API_KEY": "fake-openai-key",
+        "ELEVEN_LABS_BASE_URL": f"{base_url}/elevenlabs",
+        "ELEVEN_LABS_API_KEY": "fake-elevenlabs-key",
+        "WEATHER_API_BASE_URL": f"{base_url}/weatherapi/v1",
+        "WEATHER_API_KEY": "fake-weather-key",
+        "SERP_API_BASE_URL": f"{base_url}/serpapi",
+        "SERP_API_KEY": "fake-serp-key",
+        "NOMINATIM_BASE_URL": f"{base_url}/nominatim",
+        "GOOGLE_GEOLOCATION_URL": f"{base_url}/google/geolocation/v1/geolocate",
+        "GOOGLE_MAPS_API_KEY": "fake-maps-key",
+        "IP_API_URL": f"{base_url}/ipapi/json/",
+    }
+
+
+class FaultConfig:
+    def __init__(self, latency_ms: Dict[str, float], jitter: float, failure_rate: Dict[str, float], seed: int):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+
+    def delay(self, service: str) -> float:
+        base = self.latency_ms.get(service, 0.0)
+        spread = base * self.jitter
+        return max(0.0, self.random.uniform(base - spread, base + spread)) / 1000
+
+    def should_fail(self, service: str) -> bool:
+        return self.random.random() < self.failure_rate.get(service, 0.0)
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector seeded by the text, so identical texts embed identically."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def fake_chat_reply(messages: List[dict]) -> str:
+    """Mimic the router/answer model: return a tool keyword or a prefixed answer based on the query."""
+    text = str(messages[-1].get("content", "")) if messages else ""
+    query = text.rsplit("Current Query:", 1)[-1].strip().lower()
+
+    if "title (max" in text.lower():
+        ids = re.findall(r"^ID (\d+)$", text, flags=re.MULTILINE)
+        return json.dumps({conversation_id: "Quick Question" for conversation_id in ids})
+    if "summarize the following cluster" in text.lower():
+        return "The user shared several personal reminders."
+    # Weather and time can be asked for together, one tool line each
+    tools = []
+    if "weather" in query or "hot" in query or "cold" in query:
+        tools.append(f"use_weather_tool: {query}")
+    if "time" in query or "date" in query:
+        tools.append(f"use_datetime_tool: {query}")
+    if tools:
+        return "\n".join(tools)
+    if "where am i" in query or "my location" in query:
+        return "use_location_tool"
+    if query.startswith(("who", "what is", "search")):
+        return "use_web_search_tool"
+    if query.startswith(("remind", "remember", "i ", "my ")):
+        return "statement: Got it, I'll remember that."
+    return "question: I'm not sure about that yet."
+
+
+class EmbeddingRequest(BaseModel):
+    input: Union[str, List[str]]
+    model: str = "text-embedding-3-large"
+    dimensions: int = 3072
+
+
+class ChatRequest(BaseModel):
+    model: str
+    messages: List[dict]
+
+
+def create_app(faults: FaultConfig) -> FastAPI:
+    app = FastAPI(title="PerceptoAI fake external services")
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        service = request.url.path.strip("/").split("/", 1)[0]
+        if service in SERVICES:
+            await asyncio.sleep(faults.delay(service))
+            if faults.should_fail(service):
+                if service == "openai":
+                    return JSONResponse(
+                        {"error": {"message": "Rate limit reached (injected)", "type": "requests"}},
+                        status_code=429,
+                        headers={"retry-after": "1"},
+                    )
+                return JSONResponse({"error": "injected failure"}, status_code=503)
+        return await call_next(request)
+
+    @app.post("/openai/v1/embeddings")
+    async def embeddings(body: EmbeddingRequest):
+        inputs = [body.input] if isinstance(body.input, str) else body.input
+        return {
+            "object": "list",
+            "model": body.model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text, body.dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": sum(len(text) // 4 + 1 for text in inputs), "total_tokens": 0},
+        }
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(body: ChatRequest):
+        reply = fake_chat_reply(body.messages)
+        prompt_tokens = sum(len(str(message.get("content", ""))) // 4 + 1 for message in body.messages)
+        system_tokens = sum(
+            len(str(message.get("content", ""))) // 4 + 1 for message in body.messages if message.get("role") == "system"
+        )
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.model,
+            "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": reply}}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(reply) // 4 + 1,
+                "total_tokens": prompt_tokens + len(reply) // 4 + 1,
+                "prompt_tokens_details": {"cached_tokens": system_tokens if system_tokens >= 1024 else 0},
+            },
+        }
+
+    @app.post("/elevenlabs/v1/text-to-speech/{voice_id}")
+    async def text_to_speech(voice_id: str, request: Request):
+        body = await request.json()
+        # Roughly 1 KiB of audio per 15 characters, like a 64 kbps MP3 of spoken text
+        size = max(1024, len(body.get("text", "")) * 70)
+        payload = (b"ID3" + hashlib.sha256(voice_id.encode()).digest()) * (size // 35 + 1)
+        media_type = "audio/ogg" if request.query_params.get("output_format", "").startswith("opus") else "audio/mpeg"
+        return Response(content=payload[:size], media_type=media_type)
+
+    @app.get("/weatherapi/v1/current.json")
+    async def current_weather(q: str = "Cairo"):
+        return {
+            "location": {"name": q.title(), "country": "Fakeland"},
+            "current": {"condition": {"text": "Sunny"}, "temp_c": 24.0, "humidity": 40, "wind_kph": 11.2},
+        }
+
+    @app.get("/weatherapi/v1/timezone.json")
+    async def timezone(q: str = "Cairo"):
+        return {"location": {"name": q.title(), "country": "Fakeland", "localtime": "2025-01-01 12:00"}}
+
+    @app.get("/serpapi/search")
+    async def search(q: str = ""):
+        return {
+            "organic_results": [
+                {"snippet": f"Result {i} about {q}. Second sentence. Third sentence.", "link": f"https://example.com/{i}"}
+                for i in range(3)
+            ]
+        }
+
+    @app.get("/nominatim/reverse")
+    async def reverse(lat: float = 0.0, lon: float = 0.0):
+        return {
+            "display_name": f"Fake Street 1, Fake City ({lat:.2f}, {lon:.2f})",
+            "address": {"city": "Fake City", "state": "Fake State", "country": "Fakeland", "road": "Fake Street"},
+        }
+
+    @app.post("/google/geolocation/v1/geolocate")
+    async def geolocate():
+        return {"location": {"lat": 30.0444, "lng": 31.2357}, "accuracy": 20}
+
+    @app.get("/ipapi/json/")
+    async def ip_lookup():
+        return {"status": "success", "city": "Cairo", "country": "Egypt"}
+
+    return app
+
+
+def _parse_service_map(value: str) -> Dict[str, float]:
+    result = {}
+    for item in filter(None, (value or "").split(",")):
+        name, _, number = item.partition("=")
+        if name not in SERVICES:
+            raise argparse.ArgumentTypeError(f"Unknown service '{name}', expected one of {SERVICES}")
+        result[name] = float(number)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=_parse_service_map, default={}, help="service=ms,... (defaults to realistic medians)")
+    parser.add_argument("--no-latency", action="store_true", help="Answer immediately (overrides --latency)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Uniform jitter as a fraction of the latency")
+    parser.add_argument("--failure-rate", type=_parse_service_map, default={}, help="service=probability,...")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    latency = {} if args.no_latency else {**DEFAULT_LATENCY_MS, **args.latency}
+    faults = FaultConfig(latency, args.jitter, args.failure_rate, args.seed)
+    uvicorn.run(create_app(faults), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
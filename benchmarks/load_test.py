@@ -0,0 +1,118 @@
+"""
+Async load generator for the PerceptoAI backend.
+
+Replays the audio corpus against /process_audio while ramping concurrency up in steps, and
+reports throughput plus p50/p95/p99 latency per endpoint and per stage (the stage breakdown
+comes from the Server-Timing header every response carries).
+
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --concurrency 1,2,4,8 --step-seconds 30
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.corpus import load_audio_corpus
+from benchmarks.stats import format_table, parse_server_timing, summarize, write_json
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.completed = 0
+
+    def record(self, endpoint: str, elapsed_ms: float, response: httpx.Response = None, error: bool = False):
+        if error or response is None or response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return
+        self.completed += 1
+        self.latencies[endpoint].append(elapsed_ms)
+        for name, duration in parse_server_timing(response.headers.get("server-timing")).items():
+            self.stages[name].append(duration)
+
+
+async def _worker(client: httpx.AsyncClient, clips, recorder: Recorder, stop_at: float):
+    for clip in clips:
+        if time.perf_counter() >= stop_at:
+            return
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                "/process_audio",
+                files={"file": (f"{clip.name}.wav", clip.data, "audio/wav")},
+            )
+            recorder.record("POST /process_audio", (time.perf_counter() - start) * 1000, response)
+        except httpx.HTTPError:
+            recorder.record("POST /process_audio", (time.perf_counter() - start) * 1000, error=True)
+
+
+async def run_step(base_url: str, concurrency: int, duration: float, timeout: float) -> dict:
+    """Run one ramp step at a fixed concurrency and return its report."""
+    corpus = load_audio_corpus()
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        stop_at = start + duration
+        # Each worker cycles through the corpus from a different offset
+        workers = [
+            _worker(client, itertools.islice(itertools.cycle(corpus), i, None), recorder, stop_at)
+            for i in range(concurrency)
+        ]
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "throughput_rps": recorder.completed / elapsed if elapsed else 0.0,
+        "errors": dict(recorder.errors),
+        "endpoints": {name: summarize(values) for name, values in recorder.latencies.items()},
+        "stages": {name: summarize(values) for name, values in sorted(recorder.stages.items())},
+    }
+
+
+def print_step(report: dict) -> None:
+    print(
+        f"\n=== concurrency {report['concurrency']}: {report['throughput_rps']:.2f} req/s "
+        f"over {report['duration_s']:.1f}s, errors {sum(report['errors'].values())} ==="
+    )
+    columns = ("count", "p50_ms", "p95_ms", "p99_ms")
+    if report["endpoints"]:
+        print(format_table("endpoint", report["endpoints"], columns))
+    if report["stages"]:
+        print(format_table("stage", report["stages"], columns))
+
+
+async def ramp(base_url: str, levels: List[int], step_seconds: float, timeout: float) -> List[dict]:
+    reports = []
+    for concurrency in levels:
+        report = await run_step(base_url, concurrency, step_seconds, timeout)
+        print_step(report)
+        reports.append(report)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated ramp levels")
+    parser.add_argument("--step-seconds", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    reports = asyncio.run(ramp(args.base_url, levels, args.step_seconds, args.timeout))
+    write_json(args.output, {"base_url": args.base_url, "steps": reports})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+End-to-end offline benchmark: starts the fake external services and the backend (pointed at them,
+with a throwaway data directory), replays the audio corpus with a concurrency ramp and prints the
+report. Needs no network access, only a cached Whisper model, so it can run on a CPU-only CI box.
+
+    python -m benchmarks.run_offline --concurrency 1,2,4 --step-seconds 20 --max-p95-ms 8000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_services import service_env
+from benchmarks.load_test import ramp
+from benchmarks.stats import write_json
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _wait_until_up(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_stack(fake_port: int, app_port: int, fake_args: list, app_args: list, data_dir: str):
+    """Start fake services and the backend; returns (processes, backend_url)."""
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    env = {**os.environ, **service_env(fake_url), "PYTHONPATH": REPO_ROOT}
+
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_services", "--port", str(fake_port), *fake_args],
+        cwd=REPO_ROOT,
+        env=env,
+    )
+    _wait_until_up(f"{fake_url}/ipapi/json/", timeout=30)
+
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning", *app_args],
+        cwd=data_dir,
+        env=env,
+    )
+    backend_url = f"http://127.0.0.1:{app_port}"
+    _wait_until_up(f"{backend_url}/readyz", timeout=300)
+    return [backend, fake], backend_url
+
+
+def stop_stack(processes) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--concurrency", default="1,2,4")
+    parser.add_argument("--step-seconds", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--fake-args", default="", help="Extra arguments for fake_services, e.g. '--failure-rate openai=0.05'")
+    parser.add_argument("--app-args", default="", help="Extra arguments for uvicorn")
+    parser.add_argument("--max-p95-ms", type=float, help="Exit non-zero if any step's p95 exceeds this")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    with tempfile.TemporaryDirectory(prefix="perceptoai-bench-") as data_dir:
+        processes, backend_url = start_stack(
+            args.fake_port, args.app_port, args.fake_args.split(), args.app_args.split(), data_dir
+        )
+        try:
+            reports = asyncio.run(ramp(backend_url, levels, args.step_seconds, args.timeout))
+        finally:
+            stop_stack(processes)
+
+    write_json(args.output, {"base_url": backend_url, "steps": reports})
+
+    if args.max_p95_ms is not None:
+        worst = max(
+            (endpoint["p95_ms"] for report in reports for endpoint in report["endpoints"].values()),
+            default=float("inf"),
+        )
+        if not worst <= args.max_p95_ms:
+            print(f"FAIL: worst p95 {worst:.0f} ms exceeds {args.max_p95_ms:.0f} ms")
+            sys.exit(1)
+        print(f"OK: worst p95 {worst:.0f} ms within {args.max_p95_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Cold-start benchmark: import time of the app module and time until the server is live and ready.
+
+Import time comes from `python -X importtime -c "import main"` (cumulative microseconds per
+module); the slowest top-level imports are listed so regressions from eager heavy imports show
+up. Startup time launches uvicorn against the fake external services and measures the time until
+/healthz (liveness) and /readyz (warmup finished) return 200.
+
+    python -m benchmarks.startup_benchmark --runs 3 --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.fake_services import service_env
+from benchmarks.run_offline import REPO_ROOT, stop_stack
+from benchmarks.stats import format_table, summarize, write_json
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import_time(module: str = "main") -> Tuple[float, List[Tuple[str, float]]]:
+    """Return (total ms, [(top-level module, cumulative ms)]) for importing `module` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    top_level: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        # Top-level imports are indented by exactly one space
+        if indent == 1:
+            top_level[name] = top_level.get(name, 0.0) + cumulative_us / 1000
+
+    return sum(top_level.values()), sorted(top_level.items(), key=lambda item: item[1], reverse=True)
+
+
+def _wait_for(url: str, start: float, timeout: float) -> float:
+    deadline = start + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return (time.perf_counter() - start) * 1000
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} did not return 200 within {timeout:.0f}s")
+
+
+def measure_startup(fake_port: int, app_port: int, timeout: float) -> Dict[str, float]:
+    """Start fake services and the backend; return ms until /healthz and /readyz return 200."""
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    env = {**os.environ, **service_env(fake_url), "PYTHONPATH": REPO_ROOT}
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_services", "--port", str(fake_port)], cwd=REPO_ROOT, env=env
+    )
+    processes = [fake]
+    try:
+        _wait_for(f"{fake_url}/ipapi/json/", time.perf_counter(), 30)
+        with tempfile.TemporaryDirectory(prefix="perceptoai-startup-") as data_dir:
+            start = time.perf_counter()
+            backend = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+                cwd=data_dir,
+                env=env,
+            )
+            processes.insert(0, backend)
+            backend_url = f"http://127.0.0.1:{app_port}"
+            live_ms = _wait_for(f"{backend_url}/healthz", start, timeout)
+            ready_ms = _wait_for(f"{backend_url}/readyz", start, timeout)
+            steps = httpx.get(f"{backend_url}/readyz", timeout=2).json()["steps_ms"]
+            stop_stack(processes)
+            processes = []
+    finally:
+        stop_stack(processes)
+    return {"live_ms": live_ms, "ready_ms": ready_ms, **{f"warmup.{name}_ms": ms for name, ms in steps.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest top-level imports to list")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import time")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    import_totals = []
+    slowest: List[Tuple[str, float]] = []
+    for _ in range(args.runs):
+        total, slowest = measure_import_time(args.module)
+        import_totals.append(total)
+
+    print(format_table("import", {f"import {args.module}": summarize(import_totals)}, ["p50_ms", "max_ms"]))
+    print()
+    print(format_table("module", {name: {"cumulative_ms": ms} for name, ms in slowest[: args.top]}, ["cumulative_ms"]))
+
+    startups = []
+    if not args.skip_server:
+        for run in range(args.runs):
+            print(f"\nStartup run {run + 1}/{args.runs}...")
+            startups.append(measure_startup(args.fake_port, args.app_port, args.timeout))
+        rows = {
+            key: summarize([startup[key] for startup in startups if key in startup])
+            for key in startups[0]
+        }
+        print()
+        print(format_table("startup", rows, ["p50_ms", "max_ms"]))
+
+    write_json(
+        args.output,
+        {"settings": vars(args), "import_ms": import_totals, "slowest_imports": slowest, "startups": startups},
+    )
+
+
+if __name__ == "__main__":
+    main()
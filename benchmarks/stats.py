@@ -0,0 +1,59 @@
+"""
+Small helpers shared by the benchmark scripts: percentiles and report formatting.
+"""
+import json
+from typing import Dict, Iterable, List, Optional
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile (pct in [0, 100]) of an unsorted list."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values_ms: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values_ms),
+        "p50_ms": percentile(values_ms, 50),
+        "p95_ms": percentile(values_ms, 95),
+        "p99_ms": percentile(values_ms, 99),
+        "max_ms": max(values_ms) if values_ms else float("nan"),
+    }
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Parse a Server-Timing header ("name;dur=12.3, other;dur=4") into {name: milliseconds}."""
+    timings: Dict[str, float] = {}
+    if not header:
+        return timings
+    for entry in header.split(","):
+        parts = [part.strip() for part in entry.split(";")]
+        for param in parts[1:]:
+            if param.startswith("dur="):
+                timings[parts[0]] = timings.get(parts[0], 0.0) + float(param[4:])
+    return timings
+
+
+def format_table(title: str, rows: Dict[str, Dict[str, float]], columns: Iterable[str], precision: int = 1) -> str:
+    columns = list(columns)
+    width = max([len(name) for name in rows] + [len(title)])
+    lines = [f"{title:<{width}}  " + "  ".join(f"{column:>10}" for column in columns)]
+    for name, row in rows.items():
+        cells = []
+        for column in columns:
+            value = row.get(column, float("nan"))
+            cells.append(f"{value:>10.{precision}f}" if isinstance(value, float) else f"{value:>10}")
+        lines.append(f"{name:<{width}}  " + "  ".join(cells))
+    return "\n".join(lines)
+
+
+def write_json(path: Optional[str], report: dict) -> None:
+    if path:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {path}")
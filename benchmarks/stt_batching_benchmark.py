@@ -0,0 +1,98 @@
+"""
+Throughput and latency of micro-batched STT as a function of the batching window.
+
+Simulates bursty traffic: clips from data/audio_prompts arrive as a Poisson process at --rate
+clips per second, and each batching window is measured for --seconds. Window 0 with batch
+size 1 is the unbatched baseline.
+
+    python -m benchmarks.stt_batching_benchmark --windows 0,5,10,20,50 --batch-size 8 --rate 6 --p99-bound-ms 3000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from backend.stt import create_stt_engine
+from backend.stt_batching import BatchingTranscriber
+from backend.telemetry import STT_BATCH_SIZE
+from backend.vad import decode_audio, trim_silence
+from benchmarks.corpus import load_audio_corpus
+from benchmarks.stats import format_table, summarize, write_json
+
+
+def _batch_totals() -> tuple:
+    """(clips, batches) observed so far by the process-wide batch size histogram."""
+    samples = {sample.name: sample.value for metric in STT_BATCH_SIZE.collect() for sample in metric.samples}
+    return samples["perceptoai_stt_batch_size_sum"], samples["perceptoai_stt_batch_size_count"]
+
+
+async def run_window(engine, clips, window_ms: float, batch_size: int, rate: float, seconds: float, seed: int) -> dict:
+    transcriber = BatchingTranscriber(engine, max_batch_size=batch_size if window_ms > 0 else 1, max_wait_ms=window_ms)
+    rng = random.Random(seed)
+    latencies = []
+    clips_before, batches_before = _batch_totals()
+
+    async def one(audio):
+        start = time.perf_counter()
+        await transcriber.transcribe(audio)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tasks = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        tasks.append(asyncio.create_task(one(rng.choice(clips))))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    await transcriber.close()
+
+    batched_clips, batches = _batch_totals()
+    batched_clips -= clips_before
+    batches -= batches_before
+    return {
+        "window_ms": window_ms,
+        "clips": len(latencies),
+        "throughput_cps": len(latencies) / elapsed,
+        "throughput_per_core": len(latencies) / elapsed / (engine.cpu_threads or os.cpu_count() or 1),
+        "mean_batch": batched_clips / batches if batches else 0.0,
+        **summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-size", default="base")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--windows", default="0,5,10,20,50", help="Comma-separated max-wait values in ms")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=4.0, help="Mean arrival rate in clips per second")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Duration of each window's run")
+    parser.add_argument("--p99-bound-ms", type=float, help="Mark windows whose p99 exceeds this bound")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    engine = create_stt_engine("whisper", model_size=args.model_size, cpu_threads=args.threads, language=args.language)
+    engine.warmup()
+    clips = [trim_silence(decode_audio(clip.path)) for clip in load_audio_corpus()]
+
+    reports = {}
+    for window in (float(value) for value in args.windows.split(",")):
+        print(f"Window {window:.0f} ms...")
+        report = asyncio.run(run_window(engine, clips, window, args.batch_size, args.rate, args.seconds, args.seed))
+        if args.p99_bound_ms is not None:
+            report["within_bound"] = "yes" if report["p99_ms"] <= args.p99_bound_ms else "NO"
+        reports[f"{window:.0f} ms"] = report
+
+    columns = ["throughput_cps", "throughput_per_core", "mean_batch", "p50_ms", "p99_ms"]
+    if args.p99_bound_ms is not None:
+        columns.append("within_bound")
+    print()
+    print(format_table("window", reports, columns, precision=2))
+    write_json(args.output, {"settings": vars(args), "windows": reports})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Word-error-rate and real-time-factor benchmark for the STT engines over data/audio_prompts/*.wav.
+
+Each engine is given as backend:model_size[:compute_type], e.g.
+
+    python -m benchmarks.stt_benchmark --engines whisper:base faster_whisper:base:int8 faster_whisper:tiny:int8 \\
+        --language en --threads 4 --beam-size 1 --references references.json
+
+references.json maps clip names (file name without extension) to their true transcripts. Without it,
+WER is measured against the first engine's output, i.e. as disagreement with the reference backend.
+RTF is processing time divided by audio duration (lower is faster; below 1 is faster than real time).
+"""
+import argparse
+import json
+import re
+import time
+import wave
+from typing import Dict, List
+
+from backend.stt import create_stt_engine
+from benchmarks.corpus import load_audio_corpus
+from benchmarks.stats import format_table, write_json
+
+
+def normalize(text: str) -> List[str]:
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def clip_duration(path: str) -> float:
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def build_engine(spec: str, beam_size: int, language: str, threads: int):
+    backend, _, rest = spec.partition(":")
+    model_size, _, compute_type = rest.partition(":")
+    options = {"beam_size": beam_size, "language": language, "cpu_threads": threads}
+    if model_size:
+        options["model_size"] = model_size
+    if compute_type:
+        options["compute_type"] = compute_type
+    return create_stt_engine(backend, **options)
+
+
+def benchmark_engine(engine, clips, repeats: int) -> Dict[str, object]:
+    load_start = time.perf_counter()
+    engine.warmup()
+    load_seconds = time.perf_counter() - load_start
+
+    transcripts, processing, audio = {}, 0.0, 0.0
+    for clip in clips:
+        duration = clip_duration(clip.path)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            transcripts[clip.name] = engine.transcribe(clip.path)
+            processing += time.perf_counter() - start
+            audio += duration
+    return {"load_and_warmup_s": load_seconds, "rtf": processing / audio, "transcripts": transcripts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", nargs="+", default=["whisper:base", "faster_whisper:base:int8"])
+    parser.add_argument("--references", help="JSON file mapping clip name to reference transcript")
+    parser.add_argument("--beam-size", type=int, default=1)
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    clips = load_audio_corpus()
+    references = None
+    if args.references:
+        with open(args.references) as f:
+            references = json.load(f)
+
+    results = {}
+    for spec in args.engines:
+        engine = build_engine(spec, args.beam_size, args.language, args.threads)
+        print(f"Benchmarking {engine.describe()}...")
+        results[spec] = benchmark_engine(engine, clips, args.repeats)
+        if references is None:
+            # The first engine becomes the reference for the others
+            references = results[spec]["transcripts"]
+
+    rows = {}
+    for spec, result in results.items():
+        errors = [word_error_rate(references[name], text) for name, text in result["transcripts"].items() if name in references]
+        result["wer"] = sum(errors) / len(errors) if errors else float("nan")
+        rows[spec] = {
+            "wer_%": result["wer"] * 100,
+            "rtf": result["rtf"],
+            "load_s": result["load_and_warmup_s"],
+        }
+
+    print()
+    print(format_table("engine", rows, ("wer_%", "rtf", "load_s"), precision=3))
+    write_json(args.output, {"settings": vars(args), "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Dense query latency: the in-process exact vector index against ChromaEmbeddingRetriever (HNSW).
+
+For every corpus size, the same synthetic unit vectors are loaded into a throwaway persistent
+Chroma collection and into an ExactVectorIndex, and the same queries run through both retrievers
+(the exact one is called through its haystack component, so both return Documents). Reports
+latency percentiles per query and Chroma's recall@k against the exact result.
+
+Synthetic vectors are clustered around a few hundred centroids, closer to real memories than
+uniform noise, at the collection's embedding size (EMBEDDING_DIMENSIONS).
+
+    python -m benchmarks.vector_index_benchmark --sizes 500,2000,10000,50000 --queries 200
+"""
+import argparse
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.stats import format_table, summarize, write_json
+
+
+def synthetic_vectors(count: int, dimensions: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((256, dimensions)).astype(np.float32)
+    vectors = centroids[rng.integers(0, len(centroids), count)] + 0.5 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _time_queries(retriever, queries: np.ndarray, k: int) -> Tuple[List[float], List[List[str]]]:
+    latencies, results = [], []
+    for query in queries:
+        embedding = query.tolist()
+        start = time.perf_counter()
+        documents = retriever.run(query_embedding=embedding, top_k=k)["documents"]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([document.id for document in documents])
+    return latencies, results
+
+
+def run_size(size: int, dimensions: int, queries: np.ndarray, k: int, memmap_dir) -> Dict[str, Dict[str, float]]:
+    import chromadb
+    from haystack_integrations.components.retrievers.chroma import ChromaEmbeddingRetriever
+    from haystack_integrations.document_stores.chroma import ChromaDocumentStore
+
+    from backend.custom_components import ExactEmbeddingRetriever
+    from backend.vector_index import ExactVectorIndex, _index_versions, _indexes, _store_version
+
+    vectors = synthetic_vectors(size, dimensions, seed=size)
+    ids = [str(i) for i in range(size)]
+    contents = [f"memory {i}" for i in range(size)]
+
+    with tempfile.TemporaryDirectory(prefix="perceptoai-vector-index-") as path:
+        collection = chromadb.PersistentClient(path=path).create_collection(name="benchmark")
+        for offset in range(0, size, 1000):
+            collection.add(
+                ids=ids[offset:offset + 1000],
+                embeddings=vectors[offset:offset + 1000].tolist(),
+                documents=contents[offset:offset + 1000],
+            )
+        chroma = ChromaEmbeddingRetriever(document_store=ChromaDocumentStore(collection_name="benchmark", persist_path=path))
+
+        index = ExactVectorIndex(max_documents=size, memmap_dir=memmap_dir)
+        start = time.perf_counter()
+        index.add_many(ids, vectors, contents)
+        build_ms = (time.perf_counter() - start) * 1000
+        # Registered as in sync, so that get_vector_index serves it without looking up a server collection
+        _indexes["benchmark"], _index_versions["benchmark"] = index, _store_version("benchmark")
+        exact = ExactEmbeddingRetriever("benchmark", fallback=chroma)
+
+        # One untimed round each, so that both are measured warm
+        _time_queries(chroma, queries[:5], k)
+        _time_queries(exact, queries[:5], k)
+        chroma_ms, chroma_ids = _time_queries(chroma, queries, k)
+        exact_ms, exact_ids = _time_queries(exact, queries, k)
+        _indexes.pop("benchmark", None)
+
+    recall = sum(len(set(found) & set(expected)) for found, expected in zip(chroma_ids, exact_ids)) / (len(queries) * k)
+    return {
+        f"{size} chroma": {**summarize(chroma_ms), "recall_at_k": recall},
+        f"{size} exact": {**summarize(exact_ms), "recall_at_k": 1.0, "build_ms": build_ms},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="500,2000,10000,50000", help="Corpus sizes (documents)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per size")
+    parser.add_argument("--dimensions", type=int, help="Vector size (default: EMBEDDING_DIMENSIONS or the native 3072)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--memmap-dir", help="Back the exact index with a memory-mapped file in this directory")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from backend.rag_config import EMBEDDING_DIMENSIONS, EMBEDDING_NATIVE_DIMENSIONS
+
+    dimensions = args.dimensions or EMBEDDING_DIMENSIONS or EMBEDDING_NATIVE_DIMENSIONS
+    queries = synthetic_vectors(args.queries, dimensions, seed=0)
+    rows = {}
+    for size in (int(value) for value in args.sizes.split(",")):
+        print(f"{size} documents x {dimensions} dimensions...")
+        rows.update(run_size(size, dimensions, queries, args.k, args.memmap_dir))
+
+    print()
+    print(format_table("size retriever", rows, ["p50_ms", "p95_ms", "p99_ms", "recall_at_k"], precision=3))
+    write_json(args.output, {"settings": vars(args), "dimensions": dimensions, "results": rows})
+
+
+if __name__ == "__main__":
+    main()
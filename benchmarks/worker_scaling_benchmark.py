@@ -0,0 +1,149 @@
+"""
+Throughput scaling of the pre-fork multi-worker mode from 1 to N worker processes.
+
+For each worker count the backend is started with `python main.py` (PERCEPTO_WORKERS=n) against
+the fake external services and a Chroma server, warmed up, and loaded at --per-worker-concurrency
+x n concurrent clients. Reports throughput, speedup over one worker, scaling efficiency, p50/p95
+latency and, on Linux, the proportional set size (PSS) of all server processes, which shows how
+much of the preloaded model memory the workers share copy-on-write.
+
+    python -m benchmarks.worker_scaling_benchmark --workers 1,2,4 --per-worker-concurrency 2 --step-seconds 30
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import httpx
+
+from benchmarks.fake_services import service_env
+from benchmarks.load_test import print_step, run_step
+from benchmarks.run_offline import REPO_ROOT, _wait_until_up, stop_stack
+from benchmarks.stats import format_table, write_json
+
+
+def _process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return pids
+    for child in children:
+        pids.extend(_process_tree(child))
+    return pids
+
+
+def _memory_mb(pid: int) -> dict:
+    """Total RSS and PSS over a process tree, from /proc/<pid>/smaps_rollup (Linux only)."""
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0}
+    for process in _process_tree(pid):
+        try:
+            with open(f"/proc/{process}/smaps_rollup") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in ("Rss", "Pss"):
+                        totals[f"{key.lower()}_mb"] += int(value.split()[0]) / 1024
+        except OSError:
+            return {}
+    return totals
+
+
+def _wait_until_ready(url: str, workers: int, timeout: float) -> None:
+    """Each worker warms up on its own, so require a run of consecutive ready answers."""
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while time.monotonic() < deadline and streak < workers * 3:
+        try:
+            streak = streak + 1 if httpx.get(url, timeout=2).status_code == 200 else 0
+        except httpx.HTTPError:
+            streak = 0
+        time.sleep(0.2)
+    if streak < workers * 3:
+        raise TimeoutError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def run_workers(workers: int, args, env: dict, data_dir: str) -> dict:
+    backend = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "main.py")],
+        cwd=data_dir,
+        env={**env, "PERCEPTO_WORKERS": str(workers), "SERVER_PORT": str(args.app_port)},
+    )
+    backend_url = f"http://127.0.0.1:{args.app_port}"
+    try:
+        _wait_until_ready(f"{backend_url}/readyz", workers, timeout=600)
+        memory = _memory_mb(backend.pid)
+        report = asyncio.run(
+            run_step(backend_url, workers * args.per_worker_concurrency, args.step_seconds, args.timeout)
+        )
+    finally:
+        stop_stack([backend])
+    print_step(report)
+    endpoint = report["endpoints"].get("POST /process_audio", {})
+    return {
+        "workers": workers,
+        "concurrency": report["concurrency"],
+        "throughput_rps": report["throughput_rps"],
+        "p50_ms": endpoint.get("p50_ms", float("nan")),
+        "p95_ms": endpoint.get("p95_ms", float("nan")),
+        "errors": sum(report["errors"].values()),
+        **memory,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--per-worker-concurrency", type=int, default=2)
+    parser.add_argument("--step-seconds", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--chroma-port", type=int, default=9200)
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    chroma_url = f"http://127.0.0.1:{args.chroma_port}"
+    with tempfile.TemporaryDirectory(prefix="perceptoai-scaling-") as data_dir:
+        env = {
+            **os.environ,
+            **service_env(fake_url),
+            "PYTHONPATH": REPO_ROOT,
+            "CHROMA_SERVER_URL": chroma_url,
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(data_dir, "prometheus"),
+        }
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"])
+        fake = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_services", "--port", str(args.fake_port)], cwd=REPO_ROOT, env=env
+        )
+        chroma = subprocess.Popen(
+            ["chroma", "run", "--path", os.path.join(data_dir, "chroma"), "--port", str(args.chroma_port)],
+            cwd=data_dir,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            _wait_until_up(f"{fake_url}/ipapi/json/", timeout=30)
+            _wait_until_up(f"{chroma_url}/api/v2/heartbeat", timeout=60)
+            rows = [run_workers(int(workers), args, env, data_dir) for workers in args.workers.split(",")]
+        finally:
+            stop_stack([chroma, fake])
+
+    baseline = rows[0]["throughput_rps"] / rows[0]["workers"] if rows[0]["throughput_rps"] else float("nan")
+    for row in rows:
+        row["speedup"] = row["throughput_rps"] / rows[0]["throughput_rps"] if rows[0]["throughput_rps"] else float("nan")
+        row["efficiency"] = row["throughput_rps"] / (baseline * row["workers"]) if baseline else float("nan")
+
+    columns = ["throughput_rps", "speedup", "efficiency", "p50_ms", "p95_ms", "errors", "rss_mb", "pss_mb"]
+    print()
+    print(format_table("workers", {f"{row['workers']} workers": row for row in rows}, columns, precision=2))
+    write_json(args.output, {"settings": vars(args), "results": rows})
+
+
+if __name__ == "__main__":
+    main()
@@ -28,7 +28,9 @@ interface ProcessedAudioResponse {
   transcription: string;
   prompt_type: string;
   response: string;
-  audio_response_base64: string;
+  audio_response_base64: string | null;
+  // Set (e.g. 'text_only') when the answer had to be sent without speech
+  degraded?: string;
   voice: string;
   conversation_id: number;
   message_id: number;
@@ -135,9 +137,18 @@ export function ConversationView({ id }: ConversationViewProps) {
           try {
             setIsProcessing(true);
             const processedData = await processAudio(audioBlob, id);
+
+            if (processedData.prompt_type === 'empty') {
+              // No speech was detected in the recording; nothing to show
+              setRawAudioBlob(null);
+              setIsProcessing(false);
+              return;
+            }
             
             queryClient.setQueryData(['messages', id], (oldMessages: Message[] | undefined) => {
-              const audioUrl = `data:audio/mpeg;base64,${processedData.audio_response_base64}`;
+              const audioUrl = processedData.degraded || !processedData.audio_response_base64
+                ? undefined
+                : `data:audio/mpeg;base64,${processedData.audio_response_base64}`;
               
               const newUserMessage: Message = {
                 id: `user-${processedData.message_id}`,
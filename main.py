@@ -1,25 +1,71 @@
-import uvicorn
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Response
-from backend.database import ConversationDatabase
+from dotenv import load_dotenv
+
+# Backend modules read their configuration at import time, so .env must be loaded first
+load_dotenv()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Response, Request, Depends, Header
+from backend.database import get_conversation_database
 from backend.services import (
+    analyze_tone,
     convert_audio_to_text,
     convert_text_to_speech,
-    create_conversation_title,
     save_conversation,
 )
-from backend.rag_pipeline import RAGPipeline
-from backend.summarizer import ConversationSummarizer
-from dotenv import load_dotenv
-from backend.rag_config import USER_NAME, CONVERSATION_COUNT_THRESHOLD
-from typing import Optional
+from backend.config.title_config import TITLE_MODE
+from backend.titles import assign_local_title, run_title_batcher
+from backend.acknowledgments import get_clip, reset_route_listener, set_route_listener
+from backend.audio_store import AUDIO_TTL_SECONDS, audio_id_for, find_audio, iter_file, parse_range
+from backend.config.elevenlabs_voice_config import AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT
+from backend.export import ndjson_chunks, to_stored_time
+from backend.warmup import readiness, run_warmup
+from backend.deadline import DeadlineExceeded, RequestCancelled, cancellation_cause, detached, guard, start_deadline
+from backend.request_graph import RequestGraph
+from backend.config.serving_config import DISCONNECT_POLL_SECONDS, REQUEST_DEADLINE_SECONDS, TTS_MIN_BUDGET_SECONDS
+from backend.telemetry import (
+    REQUESTS_CANCELLED,
+    REQUESTS_DEGRADED,
+    REQUEST_DURATION,
+    METRICS_CONTENT_TYPE,
+    metrics_payload,
+    server_timing_header,
+    setup_telemetry,
+    stage,
+    start_profiler,
+    start_request_timings,
+)
+from backend.rag_config import CONVERSATION_COUNT_THRESHOLD, QUERY_BATCH_CONCURRENCY, QUERY_BATCH_MAX_SIZE
+from backend.tenancy import validate_user_id
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional
 from fastapi import Query
+from pydantic import BaseModel, Field
 import os
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import tempfile
+import asyncio
 import base64
+import io
+import json
+import secrets
+import time
+
+setup_telemetry()
 
-load_dotenv()
-app = FastAPI(title="PerceptoAI RAG Pipeline")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models and open stores in the background; /readyz turns 200 once this is done
+    warmup_task = asyncio.create_task(run_warmup())
+    title_task = asyncio.create_task(run_title_batcher()) if TITLE_MODE == "batch" else None
+    yield
+    warmup_task.cancel()
+    if title_task is not None:
+        title_task.cancel()
+
+
+app = FastAPI(title="PerceptoAI RAG Pipeline", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,91 +76,490 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def stage_timing_middleware(request: Request, call_next):
+    """Collect per-stage timings for the request and expose them as a Server-Timing header."""
+    timings = start_request_timings()
+    profiler = start_profiler()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        path = route.path if route is not None else request.url.path
+        REQUEST_DURATION.labels(method=request.method, path=path, status=str(status_code)).observe(elapsed)
+        if profiler is not None:
+            profiler.stop(f"{request.method} {path}", elapsed * 1000)
+
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(content=metrics_payload(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     return {"message": "PerceptoAI server is running!"}
 
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: models are loaded and stores are open; 503 while warming up or after a failed warmup."""
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+
+def _audio_response(payload: dict, audio_path: str, response_mode: str):
+    """
+    Attach synthesized audio to the response payload:
+    - base64: embedded in the JSON body (legacy)
+    - url: a short-lived ID served by GET /audio/{audio_id}, with Range support
+    - multipart: multipart/mixed with a JSON part followed by the raw audio part
+    """
+    media_type = AUDIO_FORMATS[payload["audio_format"]][2]
+
+    if response_mode == "url":
+        audio_id = audio_id_for(audio_path)
+        payload.update({"audio_id": audio_id, "audio_url": f"/audio/{audio_id}", "audio_media_type": media_type})
+        return payload
+
+    with open(audio_path, "rb") as f:
+        audio_content = f.read()
+    os.unlink(audio_path)
+
+    if response_mode == "multipart":
+        boundary = secrets.token_hex(16)
+        body = b"".join([
+            f"--{boundary}\r\nContent-Type: application/json\r\n\r\n".encode(),
+            json.dumps(payload).encode(),
+            f"\r\n--{boundary}\r\nContent-Type: {media_type}\r\nContent-Length: {len(audio_content)}\r\n\r\n".encode(),
+            audio_content,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        return Response(content=body, media_type=f"multipart/mixed; boundary={boundary}")
+
+    payload["audio_response_base64"] = base64.b64encode(audio_content).decode('utf-8')
+    return payload
+
+
+def _text_only_response(payload: dict, response_mode: str):
+    """
+    A payload without audio, in the same shape as _audio_response gives for the mode: the audio
+    fields are null, and multipart carries only its JSON part.
+    """
+    payload["audio_format"] = None
+    if response_mode == "url":
+        payload.update({"audio_id": None, "audio_url": None, "audio_media_type": None})
+    else:
+        payload["audio_response_base64"] = None
+    if response_mode == "multipart":
+        boundary = secrets.token_hex(16)
+        body = b"".join([
+            f"--{boundary}\r\nContent-Type: application/json\r\n\r\n".encode(),
+            json.dumps(payload).encode(),
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        return Response(content=body, media_type=f"multipart/mixed; boundary={boundary}")
+    return payload
+
+
+def _cancelled_response(cancelled: RequestCancelled) -> JSONResponse:
+    """Abandoned request: 499 (client closed request) after a disconnect, 504 when the deadline passed."""
+    REQUESTS_CANCELLED.labels(reason=cancelled.reason, stage=cancelled.stage).inc()
+    print(f"Request cancelled: {cancelled}")
+    status_code = 504 if isinstance(cancelled, DeadlineExceeded) else 499
+    return JSONResponse({"detail": str(cancelled)}, status_code=status_code)
+
+
+def current_user(
+    x_user_id: Optional[str] = Header(None, description="User whose memory and history the request uses; default user if absent"),
+) -> str:
+    try:
+        return validate_user_id(x_user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _current_voice(user_id: str) -> str:
+    with stage("sqlite_read"):
+        return get_conversation_database(user_id).get_current_voice()
+
+
+def _summarization_threshold(user_id: str) -> int:
+    threshold = get_conversation_database(user_id).get_summarization_threshold()
+    return CONVERSATION_COUNT_THRESHOLD if threshold is None else threshold
+
+
+def _persist_interaction(rag_pipeline, prompt: str, response: dict, conversation_id: Optional[int], background_tasks: BackgroundTasks) -> dict:
+    """
+    Save one exchange, then schedule summarization and, for an untitled conversation, its title.
+    None of it is bound by the request's deadline: once answered, an exchange is always stored.
+    """
+    from backend.summarizer import ConversationSummarizer
+
+    conversations_data = detached(save_conversation)(
+        {
+            "user_input": prompt,
+            "ai_response": response,
+            "embedder": rag_pipeline.embedder,
+            "user_id": rag_pipeline.user_id,
+            "user_name": rag_pipeline.user_name,
+        },
+        conversation_id=conversation_id
+    )
+
+    print(
+        "Number of conversations processed:",
+        conversations_data["conversation_count"],
+    )
+    background_tasks.add_task(
+        detached(ConversationSummarizer(rag_pipeline).process_conversation),
+        conversations_data["conversation_count"],
+        _summarization_threshold(rag_pipeline.user_id),
+    )
+
+    # Local titles are written after the response; TITLE_MODE=batch titles conversations on a timer instead
+    if TITLE_MODE == "local" and conversations_data["conversation_id"] is not None:
+        background_tasks.add_task(
+            detached(assign_local_title),
+            rag_pipeline.user_id,
+            conversations_data["conversation_id"],
+            prompt,
+            response["answer"],
+        )
+    return conversations_data
+
+
 @app.post("/process_audio")
 async def process_audio(
+    request: Request,
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    conversation_id: Optional[int] = Query(None, description="Current conversation ID")
+    conversation_id: Optional[int] = Query(None, description="Current conversation ID"),
+    response_mode: str = Query(
+        "base64", pattern="^(base64|url|multipart)$", description="How the synthesized audio is delivered"
+    ),
+    audio_format: str = Query(DEFAULT_AUDIO_FORMAT, description=f"Output codec, one of {list(AUDIO_FORMATS)}"),
+    deadline_ms: Optional[int] = Query(
+        None, ge=100, le=600000, description="Time budget for the request; defaults to REQUEST_DEADLINE_SECONDS"
+    ),
+    user_id: str = Depends(current_user),
 ):
+    if audio_format not in AUDIO_FORMATS:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid audio format. Allowed formats: {list(AUDIO_FORMATS)}"
+        )
+
+    deadline = start_deadline(deadline_ms / 1000 if deadline_ms else REQUEST_DEADLINE_SECONDS)
     try:
-        rag_pipeline = RAGPipeline(user_name=USER_NAME)
-        conversation_summarizer = ConversationSummarizer(rag_pipeline)
+        from backend.rag_pipeline import get_rag_pipeline
+
+        rag_pipeline = await asyncio.to_thread(get_rag_pipeline, user_id)
 
         with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
             audio_data = await file.read()
             temp_file.write(audio_data)
             temp_file.flush()
 
-        prompt = await convert_audio_to_text(temp_file.name)
-        response = rag_pipeline.process_query(prompt)
-        conversations_db = ConversationDatabase()
-        current_voice = conversations_db.get_current_voice()
-        audio_response = await convert_text_to_speech(
-            response["answer"], prompt, current_voice
-        )
+        # The request as a dependency graph; the voice lookup needs nothing and overlaps STT:
+        #   stt ──┬─> llm ──┬──────────> persist ──┐
+        #         └─> tone ─┼─> tts ───────────────┴─> response
+        #   voice ──────────┘
+        graph = RequestGraph("process_audio")
+        graph.node("stt", lambda: guard(
+            convert_audio_to_text(temp_file.name), request, "stt", DISCONNECT_POLL_SECONDS
+        ))
+        graph.node("voice", lambda: asyncio.to_thread(_current_voice, user_id))
+        try:
+            prompt = await graph.result("stt")
+        except BaseException:
+            graph.cancel()
+            raise
+        if not prompt.strip():
+            # Nothing was said: skip the LLM, TTS and persistence entirely
+            graph.cancel()
+            return _text_only_response({
+                "transcription": "",
+                "prompt_type": "empty",
+                "response": "",
+                "voice": None,
+                "conversation_id": conversation_id,
+                "message_id": None,
+            }, response_mode)
 
-        with open(audio_response, "rb") as f:
-            audio_content = f.read()
-        os.unlink(audio_response)
-        encoded_audio = base64.b64encode(audio_content).decode('utf-8')
-
-        conversations_data = save_conversation(
-            {
-                "user_input": prompt,
-                "ai_response": response,
-                "embedder": rag_pipeline.embedder,
-                "user_name": USER_NAME,
-            },
-            conversation_id=conversation_id
-        )
+        graph.node("llm", lambda: guard(
+            asyncio.to_thread(rag_pipeline.process_query, prompt), request, "pipeline", DISCONNECT_POLL_SECONDS
+        ))
+        graph.node("tone", lambda: asyncio.to_thread(analyze_tone, prompt))
 
-        print(
-            "Number of conversations processed:",
-            conversations_data["conversation_count"],
-        )
-        background_tasks.add_task(
-            conversation_summarizer.process_conversation,
-            conversations_data["conversation_count"],
-            CONVERSATION_COUNT_THRESHOLD,
-        )
-
-        # Check if the conversation needs a title (i.e., if it's a new conversation without one)
-        current_conversation_id = conversations_data["conversation_id"]
-        if current_conversation_id is not None:
-            conversations_db = ConversationDatabase()
-            conversation_details = conversations_db.get_conversation_details(current_conversation_id)
-            if conversation_details and conversation_details["title"] is None:
-                background_tasks.add_task(
-                    create_conversation_title,
-                    current_conversation_id,
-                    prompt,
-                    response["answer"],
+        async def synthesize(response, current_voice, tone):
+            # Out of time for speech: answer with text only rather than not at all
+            if deadline.remaining() < TTS_MIN_BUDGET_SECONDS:
+                return None
+            try:
+                return await guard(
+                    convert_text_to_speech(response["answer"], prompt, current_voice, audio_format, tone=tone),
+                    request,
+                    "tts",
+                    DISCONNECT_POLL_SECONDS,
                 )
-        
+            except DeadlineExceeded:
+                return None
+
+        graph.node("tts", synthesize, "llm", "voice", "tone")
+        graph.node("persist", lambda response: asyncio.to_thread(
+            _persist_interaction, rag_pipeline, prompt, response, conversation_id, background_tasks
+        ), "llm")
+        try:
+            response, current_voice = await graph.result("llm"), await graph.result("voice")
+            audio_response, conversations_data = await graph.result("tts"), await graph.result("persist")
+        except BaseException:
+            graph.cancel()
+            raise
+        finally:
+            graph.log()
+        if audio_response is None:
+            REQUESTS_DEGRADED.labels(mode="text_only").inc()
 
-        return {
+        payload = {
             "transcription": prompt,
             "prompt_type": response["prompt_type"],
             "response": response["answer"],
-            "audio_response_base64": encoded_audio,
             "voice": current_voice,
             "conversation_id": conversations_data["conversation_id"],
             "message_id": conversations_data["message_id"],
+            "audio_format": audio_format,
         }
+        if audio_response is None:
+            payload["degraded"] = "text_only"
+            return _text_only_response(payload, response_mode)
+        return _audio_response(payload, audio_response, response_mode)
+
+    except Exception as exc:
+        cancelled = cancellation_cause(exc)
+        if cancelled is None:
+            raise
+        return _cancelled_response(cancelled)
+
+
+def _stream_event(event: str, **fields) -> bytes:
+    return (json.dumps({"event": event, **fields}) + "\n").encode()
+
+
+def _final_event(task: "asyncio.Task[object]") -> bytes:
+    """The last /process_audio/stream event, from what process_audio returned or raised."""
+    try:
+        result = task.result()
+    except HTTPException as e:
+        return _stream_event("error", status=e.status_code, detail=e.detail)
+    except Exception as e:
+        print(f"ERROR: process_audio stream failed: {e}")
+        return _stream_event("error", status=500, detail="Internal server error")
+    if isinstance(result, JSONResponse):
+        return _stream_event("error", status=result.status_code, detail=json.loads(result.body)["detail"])
+    return _stream_event("response", **result)
+
+
+@app.post("/process_audio/stream")
+async def process_audio_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    conversation_id: Optional[int] = Query(None, description="Current conversation ID"),
+    response_mode: str = Query("base64", pattern="^(base64|url)$", description="How the synthesized answer is delivered"),
+    audio_format: str = Query(DEFAULT_AUDIO_FORMAT, description=f"Output codec, one of {list(AUDIO_FORMATS)}"),
+    deadline_ms: Optional[int] = Query(
+        None, ge=100, le=600000, description="Time budget for the request; defaults to REQUEST_DEADLINE_SECONDS"
+    ),
+    user_id: str = Depends(current_user),
+):
+    """
+    /process_audio as newline-delimited JSON events, so that a slow tool route is not dead air:
+    - {"event": "acknowledgment", "route", "audio_format", "audio_base64"}: sent as soon as the router
+      picks a slow route (ACKNOWLEDGED_ROUTES), with the pre-rendered clip of the user's voice
+    - {"event": "response", ...}: the /process_audio payload, always last
+    - {"event": "error", "status", "detail"}: instead of the response when the request failed
+    """
+    if audio_format not in AUDIO_FORMATS:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid audio format. Allowed formats: {list(AUDIO_FORMATS)}"
+        )
+
+    # The upload is read now: the request continues after this handler has returned
+    upload = UploadFile(io.BytesIO(await file.read()), filename=file.filename)
+    background_tasks = BackgroundTasks()
+    loop = asyncio.get_running_loop()
+    routes: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+    # Called from the pipeline's worker thread; the task below copies the listener with its context
+    token = set_route_listener(lambda route: loop.call_soon_threadsafe(routes.put_nowait, route))
+    try:
+        task = asyncio.create_task(process_audio(
+            request, upload, background_tasks, conversation_id, response_mode, audio_format, deadline_ms, user_id
+        ))
+    finally:
+        reset_route_listener(token)
+    task.add_done_callback(lambda _: routes.put_nowait(None))
+    voice_task = asyncio.create_task(asyncio.to_thread(_current_voice, user_id))
+
+    async def events():
+        try:
+            acknowledged = False
+            while (route := await routes.get()) is not None:
+                clip = get_clip(await voice_task, audio_format)
+                if clip is None or acknowledged:
+                    continue
+                acknowledged = True
+                yield _stream_event(
+                    "acknowledgment", route=route, audio_format=audio_format, audio_base64=base64.b64encode(clip).decode()
+                )
+            yield _final_event(task)
+        finally:
+            # The client went away mid-stream: stop the request too
+            task.cancel()
+            voice_task.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=background_tasks)
+
+
+class QueryRequest(BaseModel):
+    query: str = Field(..., min_length=1, max_length=4000)
+    conversation_id: Optional[int] = None
+    top_k: int = Field(5, ge=1, le=50)
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=QUERY_BATCH_MAX_SIZE)
+    top_k: int = Field(5, ge=1, le=50)
+    # Evaluation runs usually must not write into memory; set to store every exchange, in order
+    persist: bool = False
+    conversation_id: Optional[int] = None
+
+
+@app.post("/query")
+async def query_text(
+    request: QueryRequest, background_tasks: BackgroundTasks, http_request: Request, user_id: str = Depends(current_user)
+):
+    """Text in, text out: the /process_audio flow without speech recognition and synthesis."""
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+
+    from backend.rag_pipeline import get_rag_pipeline
+
+    rag_pipeline = await asyncio.to_thread(get_rag_pipeline, user_id)
+    start_deadline(REQUEST_DEADLINE_SECONDS)
+    try:
+        response = await guard(
+            asyncio.to_thread(rag_pipeline.process_query, request.query, request.top_k),
+            http_request,
+            "pipeline",
+            DISCONNECT_POLL_SECONDS,
+        )
+    except Exception as exc:
+        cancelled = cancellation_cause(exc)
+        if cancelled is None:
+            raise HTTPException(status_code=500, detail=f"Error processing query: {str(exc)}")
+        return _cancelled_response(cancelled)
+    conversations_data = await asyncio.to_thread(
+        _persist_interaction, rag_pipeline, request.query, response, request.conversation_id, background_tasks
+    )
+    return {
+        "query": request.query,
+        "prompt_type": response["prompt_type"],
+        "response": response["answer"],
+        "url": response["url"],
+        "conversation_id": conversations_data["conversation_id"],
+        "message_id": conversations_data["message_id"],
+    }
+
+
+@app.post("/query/batch")
+async def query_batch(request: BatchQueryRequest, background_tasks: BackgroundTasks, user_id: str = Depends(current_user)):
+    """
+    Answer many queries at once. Queries are embedded together in shared API batches and at most
+    QUERY_BATCH_CONCURRENCY of them are in the LLM at a time. A failing query reports its error
+    in its own result instead of failing the batch. Results are in request order.
+    """
+    from backend.rag_pipeline import get_rag_pipeline
+
+    rag_pipeline = await asyncio.to_thread(get_rag_pipeline, user_id)
+    queries = [text.strip() for text in request.queries]
+    try:
+        embeddings = await asyncio.to_thread(rag_pipeline.embed_queries, queries, request.top_k)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error embedding queries: {str(e)}")
+
+    semaphore = asyncio.Semaphore(QUERY_BATCH_CONCURRENCY)
 
-    except HTTPException as http_exc:
-        print(f"ERROR: HTTPException in process_audio: {http_exc.detail}")
+    async def answer(text: str, embedding):
+        if not text:
+            return {"query": text, "error": "Query cannot be empty"}
+        async with semaphore:
+            try:
+                response = await asyncio.to_thread(rag_pipeline.process_query, text, request.top_k, embedding)
+            except Exception as e:
+                return {"query": text, "error": str(e)}
+        return {"query": text, "prompt_type": response["prompt_type"], "response": response["answer"], "url": response["url"]}
+
+    results = await asyncio.gather(*(answer(text, embedding) for text, embedding in zip(queries, embeddings)))
+
+    if request.persist:
+        # Saved after the fact so that messages keep the request order
+        conversation_id = request.conversation_id
+        for result in results:
+            if "error" in result:
+                continue
+            conversations_data = await asyncio.to_thread(
+                _persist_interaction,
+                rag_pipeline,
+                result["query"],
+                {"answer": result["response"], "prompt_type": result["prompt_type"], "url": result["url"]},
+                conversation_id,
+                background_tasks,
+            )
+            conversation_id = conversations_data["conversation_id"]
+            result.update({"conversation_id": conversation_id, "message_id": conversations_data["message_id"]})
+
+    return {"count": len(results), "errors": sum("error" in result for result in results), "results": results}
+
+
+@app.get("/audio/{audio_id}")
+def get_audio(audio_id: str, request: Request):
+    """Serve a synthesized clip by ID with chunked transfer and single-range support."""
+    found = find_audio(audio_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+
+    path, media_type = found
+    size = os.path.getsize(path)
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": f"private, max-age={AUDIO_TTL_SECONDS}"}
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return StreamingResponse(iter_file(path), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+    return StreamingResponse(iter_file(path, start, end), status_code=206, media_type=media_type, headers=headers)
 
 
 @app.post("/conversations")
-async def create_new_conversation():
+async def create_new_conversation(user_id: str = Depends(current_user)):
     try:
-        conversations_db = ConversationDatabase()
+        conversations_db = get_conversation_database(user_id)
         new_conv_id = conversations_db.create_new_conversation()
         return {"conversation_id": new_conv_id, "message": "New conversation created"}
     except Exception as e:
@@ -124,13 +569,13 @@ async def create_new_conversation():
 
 
 @app.get("/voice")
-def get_voice():
-    conversations_db = ConversationDatabase()
+def get_voice(user_id: str = Depends(current_user)):
+    conversations_db = get_conversation_database(user_id)
     return {"voice": conversations_db.get_current_voice()}
 
 
 @app.put("/voice")
-def update_voice(voice: str):
+def update_voice(voice: str, user_id: str = Depends(current_user)):
     if not voice:
         raise HTTPException(status_code=400, detail="Voice cannot be empty")
 
@@ -140,27 +585,100 @@ def update_voice(voice: str):
             status_code=400, detail=f"Invalid voice. Allowed voices: {allowed_voices}"
         )
 
-    conversations_db = ConversationDatabase()
+    conversations_db = get_conversation_database(user_id)
     conversations_db.update_current_voice(voice)
     return {"message": f"Voice updated to {voice}"}
 
 
+@app.get("/summarization_threshold")
+def get_summarization_threshold(user_id: str = Depends(current_user)):
+    threshold = get_conversation_database(user_id).get_summarization_threshold()
+    return {"threshold": CONVERSATION_COUNT_THRESHOLD if threshold is None else threshold, "default": threshold is None}
+
+
+@app.put("/summarization_threshold")
+def update_summarization_threshold(
+    threshold: Optional[int] = Query(None, ge=1, le=10000, description="Interactions between summarizations; omit to use the default"),
+    user_id: str = Depends(current_user),
+):
+    """Set how many interactions of this user trigger summarization of their memory."""
+    get_conversation_database(user_id).update_summarization_threshold(threshold)
+    return {"threshold": CONVERSATION_COUNT_THRESHOLD if threshold is None else threshold, "default": threshold is None}
+
+
 @app.get("/conversations")
-async def get_conversations():
+async def get_conversations(user_id: str = Depends(current_user)):
     try:
-        conversations_db = ConversationDatabase()
+        conversations_db = get_conversation_database(user_id)
         return conversations_db.get_conversations()
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error fetching conversations: {str(e)}"
         )
 
+def _export_response(user_id: str, filename: str, conversation_id: Optional[int], start: Optional[datetime], end: Optional[datetime], gzip: bool):
+    if start is not None and end is not None and to_stored_time(start) >= to_stored_time(end):
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    records = get_conversation_database(user_id).iter_messages(conversation_id, to_stored_time(start), to_stored_time(end))
+    extension = "ndjson.gz" if gzip else "ndjson"
+    return StreamingResponse(
+        ndjson_chunks(records, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
+
+
+@app.get("/search")
+def search_messages(
+    q: str = Query(..., min_length=1, max_length=500, description="Words to search for in past messages"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    conversation_id: Optional[int] = Query(None, description="Restrict the search to one conversation"),
+    user_id: str = Depends(current_user),
+):
+    """Full-text search over message history, best match first, with highlighted snippets."""
+    try:
+        with stage("sqlite_search"):
+            results = get_conversation_database(user_id).search_messages(q, limit=limit, offset=offset, conversation_id=conversation_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching messages: {str(e)}")
+    return {"query": q, "limit": limit, "offset": offset, **results}
+
+
+# Declared before /conversations/{conversation_id} so that "export" is not parsed as an ID
+@app.get("/conversations/export")
+def export_conversations(
+    start: Optional[datetime] = Query(None, description="Only messages at or after this time (ISO 8601)"),
+    end: Optional[datetime] = Query(None, description="Only messages before this time (ISO 8601)"),
+    gzip: bool = Query(False, description="Gzip-compress the NDJSON stream"),
+    user_id: str = Depends(current_user),
+):
+    """Stream every message, one JSON object per line, grouped by conversation."""
+    return _export_response(user_id, "conversations", None, start, end, gzip)
+
+
+@app.get("/conversations/{conversation_id}/export")
+def export_conversation(
+    conversation_id: int,
+    start: Optional[datetime] = Query(None, description="Only messages at or after this time (ISO 8601)"),
+    end: Optional[datetime] = Query(None, description="Only messages before this time (ISO 8601)"),
+    gzip: bool = Query(False, description="Gzip-compress the NDJSON stream"),
+    user_id: str = Depends(current_user),
+):
+    """Stream one conversation's messages, one JSON object per line."""
+    if get_conversation_database(user_id).get_conversation_details(conversation_id) is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return _export_response(user_id, f"conversation_{conversation_id}", conversation_id, start, end, gzip)
+
+
 @app.get("/conversations/{conversation_id}")
 async def get_conversation_messages(
     conversation_id: int,
+    user_id: str = Depends(current_user),
 ):
     try:
-        conversations_db = ConversationDatabase()
+        conversations_db = get_conversation_database(user_id)
         return conversations_db.get_messages_from_conversation(conversation_id)
     except Exception as e:
         raise HTTPException(
@@ -169,4 +687,7 @@ async def get_conversation_messages(
 
 
 if __name__ == "__main__":
-    uvicorn.run(app)
+    from backend.workers import serve
+
+    # One process by default; PERCEPTO_WORKERS=N pre-forks N workers sharing the preloaded models
+    serve("main:app")